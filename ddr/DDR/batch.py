@@ -287,10 +287,7 @@ class Checker():
             model=model,
             recursive=True, force_read=True
         )
-        existing_ids = [
-            identifier.Identifier(path=path)
-            for path in metadata_paths
-        ]
+        existing_ids = identifier.parse_many(metadata_paths, by_model=False)
         new_ids = [rowd['id'] for rowd in rowds]
         already = [i for i in new_ids if i in existing_ids]
         return already
@@ -866,14 +863,15 @@ class Importer():
                 # This will happen with e.g. transcript files when file_id is
                 # actually the Entity/Segment ID and contains no role,
                 # and when sha1 field is blank.
-                if rowd.get('role') and not file_.identifier.parts.get('role'):
-                    file_.identifier.parts['role'] = rowd['role']
+                role = file_.identifier.parts.get('role')
+                if rowd.get('role') and not role:
+                    role = rowd['role']
 
                 try:
                     file_,repo2,log2 = ingest.add_local_file(
                         parent,
                         rowd['basename_orig'],
-                        file_.identifier.parts['role'],
+                        role,
                         rowd,
                         git_name, git_mail, agent,
                         log_path=log_path,
@@ -1193,21 +1191,22 @@ class Updater():
         logging.info(collection)
         
         logging.info('Finding metadata files %s' % cidentifier.path_abs())
-        paths = util.find_meta_files(
+        # objects are saved as the metadata files are found
+        paths = util.iter_meta_files(
             cidentifier.path_abs(),
-            recursive=True, force_read=True,
+            recursive=True,
             testing=True  # otherwise will be excluded if basedir is under /tmp
         )
-        num = len(paths)
-        logging.info('%s paths' % num)
         logging.info('Writing')
+        num = 0
         load_errs = {}
         save_errs = {}
         bad_exits = {}
         statuses = {}
         updated_files = {}
         for n,path in enumerate(paths):
-            logging.info('%s/%s %s' % (n, num, path))
+            num += 1
+            logging.info('%s %s' % (n, path))
             try:
                 o = identifier.Identifier(path).object()
             except:
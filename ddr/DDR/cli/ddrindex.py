@@ -1,7 +1,7 @@
 HELP = """
 ddrindex - publish DDR content to Elasticsearch; debug Elasticsearch
 
-Index Management: create, destroy, alias, mappings, status, reindex
+Index Management: create, destroy, alias, mappings, status, reindex, rebuild
 Publishing:       vocabs, post, postjson, index
 Debugging:        config, get, exists, search
 
@@ -27,6 +27,14 @@ Post repository and organization:
 
 Post an object. Optionally, publish its child objects and/or ignore publication status.
   $ ddrindex publish [--recurse] [--force] /var/www/media/ddr/ddr-testing-123
+Use the bulk API for large collections (much faster):
+  $ ddrindex publish --recurse --bulk [--chunksize 500] /var/www/media/ddr/ddr-testing-123
+Prepare documents using multiple processes (implies --bulk):
+  $ ddrindex publish --recurse --workers 4 /var/www/media/ddr/ddr-testing-123
+Only publish what changed (git) since the collection was last published:
+  $ ddrindex publish --recurse --incremental /var/www/media/ddr/ddr-testing-123
+Don't send documents whose content hasn't changed since they were last sent:
+  $ ddrindex publish --recurse --force --skipunchanged /var/www/media/ddr/ddr-testing-123
 
 MANAGEMENT COMMANDS
 
@@ -45,6 +53,8 @@ Post arbitrary JSON documents:
 
 Search
   $ ddrindex search collection,entity Minidoka
+Stream all matching results (no 10000-hit limit)
+  $ ddrindex search -t file -q Minidoka --all
 
 See if document exists
   $ ddrindex exists collection ddr-testing-123
@@ -60,6 +70,10 @@ Delete existing index
 Reindex
   $ ddrindex reindex --index source --target dest
 
+Rebuild index behind an alias, then switch alias to it
+  $ ddrindex rebuild --alias ddrpublic-dev
+  $ ddrindex rebuild --alias ddrpublic-dev --workers 4 /var/www/media/ddr/ddr-testing-*
+
 Update mappings (or add to a bare index).
   $ ddrindex mappings
 """
@@ -212,6 +226,43 @@ def alias(hosts, index, alias, delete):
             logprint('error', err)
 
 
+@ddrindex.command()
+@click.option('--hosts','-h',
+              default=config.DOCSTORE_HOST, envvar='DOCSTORE_HOST',
+              help='Elasticsearch hosts.')
+@click.option('--alias','-a', required=True, help='Alias to rebuild.')
+@click.option('--vocabs','-V', default=config.VOCABS_PATH,
+              help='Path to ddr-vocab facets (default %s).' % config.VOCABS_PATH)
+@click.option('--narrators','-N', default=config.NARRATORS_PATH,
+              help='Path to narrators.json (default %s).' % config.NARRATORS_PATH)
+@click.option('--chunksize','-c', default=docstore.BULK_CHUNK_SIZE,
+              help='Documents per bulk request (default %s).' % docstore.BULK_CHUNK_SIZE)
+@click.option('--workers','-w', default=1,
+              help='Processes preparing documents (publish).')
+@click.option('--slices','-s', default=1,
+              help='Parallel reindex slices (Elasticsearch 5.1+).')
+@click.argument('paths', nargs=-1)
+def rebuild(hosts, alias, vocabs, narrators, chunksize, workers, slices, paths):
+    """Rebuild index behind alias in a new index, then switch the alias.
+    
+    Publishes the vocabularies, narrators, the repository and organization
+    records, and the collection repositories in PATHS into a new timestamped
+    index, or reindexes the alias' current index if no PATHS.  The alias is
+    only switched if the document counts match.  Doctypes with fewer or more
+    documents than the alias' current index are listed as warnings.
+    """
+    try:
+        index = docstore.Docstore(hosts).rebuild(
+            alias, paths=list(paths), vocabs_path=vocabs,
+            narrators_path=narrators, workers=workers,
+            chunk_size=chunksize, slices=slices
+        )
+    except Exception as err:
+        logprint('error', err)
+        return
+    logprint('debug', '%s -> %s' % (alias, index))
+
+
 @ddrindex.command()
 @click.option('--hosts','-h',
               default=config.DOCSTORE_HOST, envvar='DOCSTORE_HOST',
@@ -238,15 +289,25 @@ def mappings(hosts, index):
 #              help='perform a trial run with no changes made')
 #@click.option('--force', is_flag=True,
 #              help='Forcibly update records whether they need it or not.')
+@click.option('--skipunchanged','-u', is_flag=True,
+              help='Skip terms whose modified timestamp is unchanged.')
 @click.argument('path')
-def vocabs(hosts, index, path):
+def vocabs(hosts, index, skipunchanged, path):
     """Post DDR vocabulary facets and terms.
     
     \b
     Example:
       $ ddrindex vocabs /opt/ddr-local/ddr-vocab/api/0.2/
     """
-    docstore.Docstore(hosts, index).post_vocabs(path=path)
+    results = docstore.Docstore(hosts, index).post_vocabs(
+        path=path, skip_unchanged=skipunchanged
+    )
+    click.echo('{} total, {} skipped, {} successful, {} bad'.format(
+        results['total'], results['skipped'], results['successful'],
+        len(results['bad'])
+    ))
+    for item in results['bad']:
+        click.echo(item)
 
 
 @ddrindex.command()
@@ -280,12 +341,34 @@ def postjson(hosts, index, doctype, object_id, path):
               help='Elasticsearch index.')
 @click.option('--recurse','-r', is_flag=True, help='Publish documents under this one.')
 @click.option('--force','-f', is_flag=True, help='Publish regardless of status.')
+@click.option('--bulk','-b', is_flag=True, help='Use the Elasticsearch bulk API.')
+@click.option('--chunksize','-c', default=docstore.BULK_CHUNK_SIZE,
+              help='Documents per bulk request (default %s).' % docstore.BULK_CHUNK_SIZE)
+@click.option('--workers','-w', default=1,
+              help='Processes preparing documents (implies --bulk).')
+@click.option('--incremental','-I', is_flag=True,
+              help='Only publish files changed since last collection publish (requires --recurse).')
+@click.option('--skipunchanged','-u', is_flag=True,
+              help='Skip documents unchanged since last published (local hash cache).')
+@click.option('--progress','-p', default=0,
+              help='Print progress line every N seconds.')
 @click.argument('path')
-def publish(hosts, index, recurse, force, path):
+def publish(hosts, index, recurse, force, bulk, chunksize, workers, incremental, skipunchanged, progress, path):
     """Post the document and its children to Elasticsearch
+    
+    Prints a JSON summary of timings (per phase, and percentiles of
+    Elasticsearch request latency) at the end.
     """
-    status = docstore.Docstore(hosts, index).post_multi(path, recursive=recurse, force=force)
+    if incremental and not recurse:
+        raise click.UsageError('--incremental requires --recurse.')
+    status = docstore.Docstore(hosts, index).post_multi(
+        path, recursive=recurse, force=force, bulk=bulk, chunk_size=chunksize,
+        workers=workers, incremental=incremental, skip_unchanged=skipunchanged,
+        progress_interval=progress
+    )
+    metrics = status.pop('metrics')
     click.echo(status)
+    click.echo(json.dumps(metrics))
 
 
 @ddrindex.command()
@@ -426,7 +509,8 @@ def status(hosts, index):
 @click.option('--should','-s',  help ='OR arg(s) (e.g. "language:eng,jpn!creators.role:author").')
 @click.option('--mustnot','-n', help='NOT arg(s) (e.g. "language:eng,jpn!creators.role:author").')
 @click.option('--raw','-r', is_flag=True, help='Print raw Elasticsearch DSL and output.')
-def search(hosts, index, doctypes, query, must, should, mustnot, raw):
+@click.option('--all','-a','all_', is_flag=True, help='Stream all results (no size limit).')
+def search(hosts, index, doctypes, query, must, should, mustnot, raw, all_):
     """
     """
     click.echo(search_results(
@@ -436,10 +520,11 @@ def search(hosts, index, doctypes, query, must, should, mustnot, raw):
         must=must,
         should=should,
         mustnot=mustnot,
-        raw=raw
+        raw=raw,
+        all_=all_,
     ))
 
-def search_results(d, doctype, text, must=None, should=None, mustnot=None, raw=False):
+def search_results(d, doctype, text, must=None, should=None, mustnot=None, raw=False, all_=False):
     if doctype:
         if doctype in ['*', 'all', 'all_', '_all']:
             doctypes = []
@@ -469,6 +554,17 @@ def search_results(d, doctype, text, must=None, should=None, mustnot=None, raw=F
     if raw:
         click.echo(format_json(q))
     
+    if all_:
+        # stream hits in constant memory
+        for item in d.iter_search(doctypes=doctypes, query=q, fields=['id','title']):
+            if raw:
+                click.echo(json.dumps(item))
+            else:
+                click.echo('\t'.join([
+                    item['_id'], item['_type'], item['_source'].get('title', '')
+                ]))
+        return ''
+    
     data = d.search(
         doctypes=doctypes,
         query=q,
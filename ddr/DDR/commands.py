@@ -6,7 +6,6 @@ import shutil
 import sys
 
 import envoy
-import git
 
 from DDR import config
 from DDR import storage
@@ -168,6 +167,7 @@ def clone(user_name, user_mail, identifier, dest_path):
     @return: message ('ok' if successful)
     """
     git_url = '{}:{}.git'.format(config.GITOLITE, identifier.id)
+    import git  # GitPython, slow to import
     repo = git.Repo.clone_from(git_url, dest_path)
     logging.debug('    git clone {}'.format(git_url))
     if repo:
@@ -227,6 +227,7 @@ def create(user_name, user_mail, identifier, templates, agent=''):
     if identifier.id in gitolite.collections():
         raise Exception("'%s' already exists -- clone instead." % identifier.id)
     git_url = '{}:{}.git'.format(config.GITOLITE, identifier.id)
+    import git  # GitPython, slow to import
     repo = git.Repo.clone_from(git_url, identifier.path_abs())
     logging.debug('    git clone {}'.format(git_url))
     if repo:
@@ -865,6 +866,7 @@ def annex_pull(collection, file_path_rel):
 def sync_group(groupfile, local_base, local_name, remote_base, remote_name):
     """
     """
+    import git  # GitPython, slow to import
     logging.debug('reading group file: %s' % groupfile)
     repos = read_group_file(groupfile)
     ACCESS_SUFFIX = config.ACCESS_FILE_APPEND + config.ACCESS_FILE_EXTENSION
@@ -54,6 +54,12 @@ LOG_LEVEL = config.get('local', 'log_level')
 
 UTF8_STRICT = config.getboolean('cmdln','utf8_strict')
 
+# JSON decoder for reading objects: 'simplejson' or 'ujson' (see models.json_loads)
+try:
+    JSON_BACKEND = config.get('cmdln','json_backend')
+except:
+    JSON_BACKEND = 'simplejson'
+
 try:
     DEFAULT_TIMEZONE = config.get('cmdln','default_timezone')
 except:
@@ -113,6 +119,41 @@ DOCSTORE_HOST_LOCAL = config.get('local','docstore_host')
 DOCSTORE_INDEX_LOCAL = config.get('local','docstore_index')
 DOCSTORE_HOST = config.get('public','docstore_host')
 DOCSTORE_INDEX = config.get('public','docstore_index')
+try:
+    DOCSTORE_HASH_CACHE = config.get('public','docstore_hash_cache')
+except:
+    DOCSTORE_HASH_CACHE = '/tmp/ddr-docstore'
+# Elasticsearch clients are shared by Docstore instances (see docstore.get_client)
+try:
+    DOCSTORE_KEEPALIVE = config.getboolean('public','docstore_keepalive')
+except:
+    DOCSTORE_KEEPALIVE = True
+try:
+    DOCSTORE_POOL_SIZE = int(config.get('public','docstore_pool_size'))
+except:
+    DOCSTORE_POOL_SIZE = 10
+try:
+    DOCSTORE_MAX_RETRIES = int(config.get('public','docstore_max_retries'))
+except:
+    DOCSTORE_MAX_RETRIES = 3
+try:
+    DOCSTORE_RETRY_ON_TIMEOUT = config.getboolean('public','docstore_retry_on_timeout')
+except:
+    DOCSTORE_RETRY_ON_TIMEOUT = False
+try:
+    DOCSTORE_DEAD_TIMEOUT = int(config.get('public','docstore_dead_timeout'))
+except:
+    DOCSTORE_DEAD_TIMEOUT = 60
+# Seconds facet aggregation results are cached (see docstore.facets_terms)
+try:
+    DOCSTORE_FACET_CACHE_TTL = int(config.get('public','docstore_facet_cache_ttl'))
+except:
+    DOCSTORE_FACET_CACHE_TTL = 300
 
 VOCABS_PATH = config.get('cmdln','vocabs_path')
+# narrators.json; posted by Docstore.rebuild along with vocabs
+try:
+    NARRATORS_PATH = config.get('cmdln','narrators_path')
+except:
+    NARRATORS_PATH = ''
 VOCAB_TERMS_URL = config.get('local', 'vocab_terms_url')
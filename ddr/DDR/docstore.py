@@ -41,18 +41,30 @@ d.publish(PATH, recursive=True, public=True )
 ------------------------------------------------------------------------
 """
 from __future__ import print_function
+from copy import deepcopy
 from datetime import datetime
+import hashlib
+import itertools
 import logging
 logger = logging.getLogger(__name__)
+import math
+import multiprocessing
 import os
+import Queue
+import shutil
+import threading
+import time
 
-from elasticsearch import Elasticsearch, TransportError
+from elasticsearch import Elasticsearch, TransportError, helpers
 import elasticsearch_dsl
 import simplejson as json
 
 from DDR import config
 from DDR import converters
+from DDR import dvcs
 from DDR.identifier import Identifier, MODULES, InvalidInputException
+from DDR.identifier import MalformedPathException
+from DDR.identifier import META_FILENAME_REGEX
 from DDR.identifier import ELASTICSEARCH_CLASSES
 from DDR.identifier import ELASTICSEARCH_CLASSES_BY_MODEL
 from DDR import modules
@@ -61,10 +73,41 @@ from DDR import vocab
 
 MAX_SIZE = 10000
 DEFAULT_PAGE_SIZE = 20
+# Number of documents sent in each Elasticsearch bulk API request.
+BULK_CHUNK_SIZE = 500
 
 SUCCESS_STATUSES = [200, 201]
 STATUS_OK = ['completed']
 PUBLIC_OK = [1,'1']
+# Records the last published commit of each collection (see post_multi).
+# Kept in its own index (see Docstore.publish_state_index) so its fields
+# cannot conflict with those of the repo_models doctypes.
+PUBLISH_STATE_DOCTYPE = 'publishstate'
+PUBLISH_STATE_MAPPINGS = {
+    PUBLISH_STATE_DOCTYPE: {
+        'dynamic': False,
+        'properties': {
+            'id': {'type': 'string', 'index': 'not_analyzed'},
+            'commit': {'type': 'string', 'index': 'not_analyzed'},
+            'published': {'type': 'string', 'index': 'not_analyzed'},
+        }
+    }
+}
+
+# Facet aggregation results by (hosts, index, ...); see Docstore.facets_terms
+FACET_CACHE = {}
+# DocType class and index_* functions for each model; see _indexer_plan
+INDEXER_PLANS = {}
+# (hosts, index, field) whose mappings were checked; see _check_keyword_field
+KEYWORD_FIELDS_CHECKED = set()
+
+# facet_terms order -> terms aggregation order
+FACET_ORDERS = {
+    'term': {'_term': 'asc'},
+    'reverse_term': {'_term': 'desc'},
+    'count': {'_count': 'desc'},
+    'reverse_count': {'_count': 'asc'},
+}
 
 """
 ddr-local
@@ -138,6 +181,174 @@ class EmptyPage(InvalidPage):
     pass
 
 
+class PayloadHashes(object):
+    """On-disk cache of document ID -> hash of the payload last sent to ES.
+    
+    Used to skip documents whose payload has not changed since they were
+    last published.  One cache file per collection per index.
+    NOTE: Cache does not know about changes made to the index by other
+    means; delete the file (or don't skip) if the index has been altered.
+    """
+    path = None
+    hashes = {}
+    
+    def __init__(self, path):
+        self.path = path
+        self.hashes = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                self.hashes = json.loads(f.read())
+    
+    def __repr__(self):
+        return "<%s.%s %s>" % (self.__module__, self.__class__.__name__, self.path)
+    
+    def unchanged(self, document_id, digest):
+        """True if digest matches the one recorded for document_id.
+        """
+        return self.hashes.get(document_id) == digest
+    
+    def set(self, document_id, digest):
+        self.hashes[document_id] = digest
+    
+    def remove(self, document_id):
+        self.hashes.pop(document_id, None)
+    
+    def save(self):
+        dirname = os.path.dirname(self.path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(self.path, 'w') as f:
+            f.write(json.dumps(self.hashes))
+
+
+class PublishMetrics(object):
+    """Per-phase timers, request latencies and throughput for post_multi.
+    
+    Phases:
+    - scan:       listing metadata files
+    - parse:      reading and parsing JSON
+    - identifier: making Identifiers from paths
+    - load:       instantiating objects
+    - build:      building ES documents (index_* functions, payload hash)
+    - send:       Elasticsearch index/bulk requests
+    - verify:     getting documents to compare versions (non-bulk publish)
+    
+    Time spent in worker processes is added up, so with workers > 1
+    load and build may exceed elapsed time.
+    """
+    PHASES = ['scan', 'parse', 'identifier', 'load', 'build', 'send', 'verify']
+    
+    def __init__(self, num=0, interval=0):
+        """
+        @param num: int Total number of documents (for progress lines)
+        @param interval: int Seconds between progress lines (0 for none)
+        """
+        self.num = num
+        self.interval = interval
+        self.started = time.time()
+        self.last_progress = self.started
+        self.documents = 0
+        self.phases = {phase: 0.0 for phase in self.PHASES}
+        self.latencies = []
+        self.lock = threading.Lock()
+    
+    def __repr__(self):
+        return "<%s.%s %s/%s>" % (
+            self.__module__, self.__class__.__name__, self.documents, self.num
+        )
+    
+    def add(self, phase, seconds):
+        """Adds time to a phase.
+        """
+        with self.lock:
+            self.phases[phase] += seconds
+    
+    def request(self, seconds):
+        """Records latency of one Elasticsearch request.
+        """
+        with self.lock:
+            self.phases['send'] += seconds
+            self.latencies.append(seconds)
+    
+    def document(self):
+        """Counts a processed document; prints progress line if it's time.
+        """
+        self.documents += 1
+        now = time.time()
+        if self.interval and (now - self.last_progress >= self.interval):
+            self.last_progress = now
+            print('%s | PROGRESS %s' % (
+                datetime.now(config.TZ), json.dumps(self.progress(now))
+            ))
+    
+    def progress(self, now=None):
+        if not now:
+            now = time.time()
+        elapsed = now - self.started
+        docs_per_sec = 0
+        if elapsed:
+            docs_per_sec = round(self.documents / elapsed, 2)
+        return {
+            'documents': self.documents,
+            'total': self.num,
+            'elapsed': round(elapsed, 3),
+            'docs_per_sec': docs_per_sec,
+        }
+    
+    def summary(self):
+        """
+        @returns: dict
+        """
+        summary = self.progress()
+        summary['phases'] = {
+            phase: round(seconds, 3) for phase,seconds in self.phases.iteritems()
+        }
+        latencies = sorted(self.latencies)
+        summary['requests'] = {
+            'count': len(latencies),
+            'p50': round(_percentile(latencies, 50), 4),
+            'p95': round(_percentile(latencies, 95), 4),
+            'p99': round(_percentile(latencies, 99), 4),
+        }
+        return summary
+
+
+# Elasticsearch clients by (process, hosts, timeout); see get_client
+CLIENTS = {}
+CLIENTS_LOCK = threading.Lock()
+
+def get_client(hosts=config.DOCSTORE_HOST, timeout=config.DOCSTORE_TIMEOUT):
+    """Returns shared Elasticsearch client for hosts,timeout.
+    
+    Each client keeps a pool of persistent (keep-alive) HTTP connections
+    so reusing it saves a TCP setup per Docstore, e.g. when publishing
+    individual objects with post_json.  Clients are not shared across
+    processes.  Set config.DOCSTORE_KEEPALIVE to False to get a new
+    client every time.
+    
+    @param hosts: str or list
+    @param timeout: int
+    @returns: elasticsearch.Elasticsearch
+    """
+    if not config.DOCSTORE_KEEPALIVE:
+        return _make_client(hosts, timeout)
+    key = (os.getpid(), str(hosts), timeout)
+    with CLIENTS_LOCK:
+        if key not in CLIENTS:
+            CLIENTS[key] = _make_client(hosts, timeout)
+        return CLIENTS[key]
+
+def _make_client(hosts, timeout):
+    return Elasticsearch(
+        hosts,
+        timeout=timeout,
+        maxsize=config.DOCSTORE_POOL_SIZE,
+        max_retries=config.DOCSTORE_MAX_RETRIES,
+        retry_on_timeout=config.DOCSTORE_RETRY_ON_TIMEOUT,
+        dead_timeout=config.DOCSTORE_DEAD_TIMEOUT,
+    )
+
+
 class Docstore():
     hosts = None
     indexname = None
@@ -150,7 +361,7 @@ class Docstore():
         if connection:
             self.es = connection
         else:
-            self.es = Elasticsearch(hosts, timeout=config.DOCSTORE_TIMEOUT)
+            self.es = get_client(hosts, timeout=config.DOCSTORE_TIMEOUT)
     
     def __repr__(self):
         return "<%s.%s %s:%s>" % (
@@ -241,19 +452,23 @@ class Docstore():
         logger.debug('creating alias %s -> %s' % (alias, index))
         alias = make_index_name(alias)
         index = make_index_name(index)
-        # delete existing alias
+        # delete existing alias and add new one in a single atomic request
+        # so searches against the alias never fail in between
+        actions = []
         for i,a in self.aliases():
             removed = ''
             if a == alias:
-                self.es.indices.delete_alias(
+                actions.append({'remove': {
                     # NOTE: "i" is probably not the arg "index".  That's what
                     #       we want. We only want the arg "index".
-                    index=i,
-                    name=alias
-                )
+                    'index': i,
+                    'alias': alias,
+                }})
                 removed = ' (removed)'
             print('%s -> %s%s' % (a,i,removed))
-        result = self.es.indices.put_alias(index=index, name=alias, body='')
+        actions.append({'add': {'index': index, 'alias': alias}})
+        result = self.es.indices.update_aliases(body={'actions': actions})
+        Docstore(self.hosts, alias, connection=self.es).invalidate_facets()
         logger.debug(result)
         logger.debug('DONE')
         return result
@@ -288,12 +503,15 @@ class Docstore():
             }
         status = self.es.indices.create(index=index, body=body)
         logger.debug(status)
-        statuses = self.init_mappings()
+        statuses = self.init_mappings(index)
         logger.debug('DONE')
      
     def delete_index(self, index=None):
         """Delete the specified index.
         
+        Also removes the index's publish state and its cache of published
+        payload hashes.
+        
         @returns: JSON dict with status code and response
         """
         if not index:
@@ -303,21 +521,45 @@ class Docstore():
             status = self.es.indices.delete(index=index)
         else:
             status = '{"status":500, "message":"Index does not exist"}'
+        state_index = self.publish_state_index(index)
+        if self.index_exists(state_index):
+            self.es.indices.delete(index=state_index)
+        shutil.rmtree(self._hash_cache_dir(index), ignore_errors=True)
         logger.debug(status)
         return status
     
-    def init_mappings(self):
+    def _hash_cache_dir(self, index=None):
+        if not index:
+            index = self.indexname
+        return os.path.join(
+            config.DOCSTORE_HASH_CACHE, make_index_name(str(self.hosts)), index
+        )
+    
+    def payload_hashes(self, collection_id):
+        """Cache of published payload hashes for the collection in this index.
+        
+        @param collection_id: str
+        @returns: PayloadHashes
+        """
+        return PayloadHashes(
+            os.path.join(self._hash_cache_dir(), '%s.json' % collection_id)
+        )
+    
+    def init_mappings(self, index=None):
         """Initializes mappings for Elasticsearch objects
         
         Mappings for objects in (ddr-defs)repo_models.elastic.ELASTICSEARCH_CLASSES
         
+        @param index: str Name of index (default self.indexname)
         @returns: JSON dict with status code and response
         """
+        if not index:
+            index = self.indexname
         logger.debug('registering doc types')
         statuses = []
         for class_ in ELASTICSEARCH_CLASSES['all']:
             logger.debug('- %s' % class_['doctype'])
-            status = class_['class'].init(index=self.indexname, using=self.es)
+            status = class_['class'].init(index=index, using=self.es)
             statuses.append( {'doctype':class_['doctype'], 'status':status} )
         return statuses
     
@@ -338,9 +580,12 @@ class Docstore():
             for class_ in ELASTICSEARCH_CLASSES['all']
         }
     
-    def post_vocabs(self, path=config.VOCABS_PATH):
+    def post_vocabs(self, path=config.VOCABS_PATH, skip_unchanged=False, chunk_size=BULK_CHUNK_SIZE):
         """Posts ddr-vocab facets,terms to ES.
         
+        All facet and term documents are built first and then sent using
+        the bulk API.
+        
         curl -XPUT 'http://localhost:9200/meta/facet/format' -d '{ ... }'
         >>> elasticsearch.post_facets(
             '192.168.56.120:9200', 'meta',
@@ -348,7 +593,10 @@ class Docstore():
             )
         
         @param path: Absolute path to dir containing facet files.
-        @returns: JSON dict with status code and response
+        @param skip_unchanged: boolean Don't send terms whose "modified"
+            timestamp matches the one already in the index.
+        @param chunk_size: int Number of documents per bulk request.
+        @returns: dict total, skipped, successful, bad
         """
         logger.debug('index_facets(%s, %s)' % (self.indexname, path))
         vocabs = vocab.get_vocabs_all(path)
@@ -356,9 +604,16 @@ class Docstore():
         # get classes from ddr-defs
         Facet = ELASTICSEARCH_CLASSES_BY_MODEL['facet']
         FacetTerm = ELASTICSEARCH_CLASSES_BY_MODEL['facetterm']
+        term_fields = FacetTerm._doc_type.mapping.to_dict()[
+            FacetTerm._doc_type.name]['properties'].keys()
         
-        # push facet data
-        statuses = []
+        published = {}
+        if skip_unchanged:
+            published = self._terms_modified(FacetTerm._doc_type.name)
+        
+        # build facet and term documents
+        actions = []
+        skipped = 0
         for v in vocabs.keys():
             facet = Facet()
             facet.meta.id = vocabs[v]['id']
@@ -366,8 +621,7 @@ class Docstore():
             title = vocabs[v]['title']
             description = vocabs[v]['description']
             logging.debug(facet)
-            status = facet.save(using=self.es, index=self.indexname)
-            statuses.append(status)
+            actions.append(_bulk_action(facet, self.indexname))
             
             for t in vocabs[v]['terms']:
                 term = FacetTerm()
@@ -377,31 +631,55 @@ class Docstore():
                 ])
                 term.meta.id = term_id
                 term.id = term_id
-                for field in FacetTerm._doc_type.mapping.to_dict()[
-                        FacetTerm._doc_type.name]['properties'].keys():
+                for field in term_fields:
                     if t.get(field):
                         setattr(term, field, t[field])
+                if skip_unchanged and t.get('modified') \
+                        and (published.get(term_id) == t['modified']):
+                    skipped += 1
+                    continue
                 logging.debug(term)
-                status = term.save(using=self.es, index=self.indexname)
-                statuses.append(status)
-                
-        return statuses
+                actions.append(_bulk_action(term, self.indexname))
+        
+        # push facet data
+        results = {
+            'total': len(actions) + skipped,
+            'skipped': skipped,
+            'successful': 0,
+            'bad': [],
+        }
+        for ok,item in helpers.streaming_bulk(
+                self.es, actions, chunk_size=chunk_size, raise_on_error=False):
+            op_type,document_id,status = _bulk_status(item)
+            if status in ['created', 'updated']:
+                results['successful'] += 1
+            else:
+                results['bad'].append(item)
+        return results
+    
+    def _terms_modified(self, doc_type):
+        """Modified timestamps of vocabulary terms in the index.
+        
+        @param doc_type: str
+        @returns: dict {term_id: modified}
+        """
+        hits = helpers.scan(
+            self.es,
+            index=self.indexname,
+            doc_type=doc_type,
+            query={'query': {'match_all': {}}},
+            _source_include='modified',
+        )
+        return {
+            hit['_id']: hit.get('_source', {}).get('modified')
+            for hit in hits
+        }
     
     def facet_terms(self, facet, order='term', all_terms=True, model=None):
         """Gets list of terms for the facet.
         
-        $ curl -XGET 'http://192.168.56.101:9200/ddr/entity/_search?format=yaml' -d '{
-          "fields": ["id"],
-          "query": { "match_all": {} },
-          "facets": {
-            "genre_facet_result": {
-              "terms": {
-                "order": "count",
-                "field": "genre"
-              }
-            }
-          }
-        }'
+        See facets_terms, which gets several facets in one request.
+        
         Sample results:
             {
               u'_type': u'terms',
@@ -424,25 +702,73 @@ class Docstore():
         
         @param facet: Name of field
         @param order: term, count, reverse_term, reverse_count
+        @param all_terms: boolean Include terms with no documents
+        @param model: (optional) Type of object ('collection', 'entity', 'file')
+        @returns dict (see above)
+        """
+        return self.facets_terms(
+            [facet], order=order, all_terms=all_terms, model=model
+        )[facet]
+    
+    def facets_terms(self, facets, order='term', all_terms=True, model=None):
+        """Gets lists of terms for several facets using one aggregation request.
+        
+        Results are cached in-process for config.DOCSTORE_FACET_CACHE_TTL
+        seconds and the cache for the index is cleared when post_multi or
+        create_alias changes it (in this process).  Callers get copies so
+        modifying results does not change the cache.
+        
+        $ curl -XGET 'http://192.168.56.101:9200/ddr/entity/_search' -d '{
+          "size": 0,
+          "aggs": {
+            "genre": {"terms": {"field": "genre", "size": 10000, "order": {"_term": "asc"}}},
+            "genre_missing": {"missing": {"field": "genre"}}
+          }
+        }'
+        
+        @param facets: list Names of fields
+        @param order: term, count, reverse_term, reverse_count
+        @param all_terms: boolean Include terms with no documents
         @param model: (optional) Type of object ('collection', 'entity', 'file')
-        @returns raw output of facet query
-        """
-        payload = {
-            "fields": ["id"],
-            "query": { "match_all": {} },
-            "facets": {
-                "results": {
-                    "terms": {
-                        "size": MAX_SIZE,
-                        "order": order,
-                        "all_terms": all_terms,
-                        "field": facet
-                    }
+        @returns dict {facet: results (see facet_terms)}
+        """
+        key = (str(self.hosts), self.indexname, tuple(facets), order, all_terms, model)
+        cached = FACET_CACHE.get(key)
+        if cached and (time.time() - cached[0] < config.DOCSTORE_FACET_CACHE_TTL):
+            return deepcopy(cached[1])
+        
+        aggs = {}
+        for facet in facets:
+            aggs[facet] = {
+                'terms': {
+                    'field': facet,
+                    'size': MAX_SIZE,
+                    'order': FACET_ORDERS[order],
+                    'min_doc_count': 0 if all_terms else 1,
                 }
             }
+            aggs['%s_missing' % facet] = {'missing': {'field': facet}}
+        results = self.es.search(
+            index=self.indexname,
+            doc_type=model,
+            body={'size': 0, 'aggs': aggs},
+        )
+        facets_terms = {
+            facet: _facet_results(
+                results['aggregations'][facet],
+                results['aggregations']['%s_missing' % facet],
+            )
+            for facet in facets
         }
-        results = self.es.search(index=self.indexname, doc_type=model, body=payload)
-        return results['facets']['results']
+        FACET_CACHE[key] = (time.time(), deepcopy(facets_terms))
+        return facets_terms
+    
+    def invalidate_facets(self):
+        """Clears cached facet results for this index (see facets_terms).
+        """
+        for key in FACET_CACHE.keys():
+            if key[:2] == (str(self.hosts), self.indexname):
+                FACET_CACHE.pop(key, None)
 
     def _repo_org(self, path, doctype, remove=False):
         # get and validate file
@@ -489,11 +815,12 @@ class Docstore():
         """Add/update or remove narrators metadata.
         
         @param path: str Absolute path to narrators.json
-        @returns: dict
+        @returns: dict {'total', 'successful', 'bad'} for published narrators
         """
         DOC_TYPE = 'narrator'
         with open(path, 'r') as f:
             data = json.loads(f.read())
+        results = {'total': 0, 'successful': 0, 'bad': []}
         for document in data['narrators']:
             has_published = document.get('has_published', '')
             if has_published.isdigit():
@@ -501,10 +828,16 @@ class Docstore():
             if has_published:
                 result = self.post_json(DOC_TYPE, document['id'], json.dumps(document))
                 logging.debug(document['id'], result)
+                results['total'] += 1
+                if _indexed(result):
+                    results['successful'] += 1
+                else:
+                    results['bad'].append(document['id'])
             else:
                 logging.debug('%s not published' % document['id'])
                 if self.get(DOC_TYPE, document['id'], fields=[]):
                     self.delete(document['id'])
+        return results
     
     def post_json(self, doc_type, document_id, json_text):
         """POST the specified JSON document as-is.
@@ -521,7 +854,7 @@ class Docstore():
             index=self.indexname, doc_type=doc_type, id=document_id, body=json_text
         )
 
-    def post(self, document, public_fields=[], additional_fields={}, parents={}, force=False):
+    def post(self, document, public_fields=[], additional_fields={}, parents={}, force=False, hashes=None, metrics=None):
         """Add a new document to an index or update an existing one.
         
         This function can produce ElasticSearch documents in two formats:
@@ -543,6 +876,8 @@ class Docstore():
         @param additional_fields: dict
         @param parents: dict Basic metadata for parent documents.
         @param force: boolean Bypass status and public checks.
+        @param hashes: PayloadHashes Skip if payload unchanged since last post.
+        @param metrics: PublishMetrics (optional)
         @returns: JSON dict with status code and response
         """
         logger.debug('post(%s, %s, %s)' % (
@@ -558,131 +893,228 @@ class Docstore():
         if not publishable:
             return {'status':403, 'response':'object not publishable'}
 
-        # instantiate appropriate subclass of ESObject / DocType
-        # TODO Devil's advocate: why are we doing this? We already have the object.
-        ES_Class = ELASTICSEARCH_CLASSES_BY_MODEL[document.identifier.model]
-        d = ES_Class()
-        fields_module = document.identifier.fields_module()
-        d.meta.id = document.identifier.id
-        for fieldname in doctype_fields(ES_Class):
-            
-            # index_* for complex fields
-            if hasattr(fields_module, 'index_%s' % fieldname):
-                field_data = modules.Module(fields_module).function(
-                    'index_%s' % fieldname,
-                    getattr(document, fieldname),
-                )
-            
-            # everything else
-            else:
-                try:
-                    field_data = getattr(document, fieldname)
-                except AttributeError as err:
-                    field_data = None
-            
-            if field_data:
-                setattr(d, fieldname, field_data)
+        started = time.time()
+        d = _make_doctype(document)
         
-        # Add parts of id (e.g. repo, org, cid) to document as separate fields.
-        for key in ['repo', 'org', 'cid', 'eid', 'sid', 'role', 'sha1']:
-            setattr(d, key, document.identifier.parts.get(key, ''))
-        
-        d.collection_id = document.identifier.collection_id()
-        if d.collection_id and (d.collection_id != document.identifier.id):
-            # we don't want file-role (a stub) as parent
-            d.parent_id = document.identifier.parent_id(stubs=0)
-        else:
-            # but we do want repository,organization (both stubs)
-            d.parent_id = document.identifier.parent_id(stubs=1)
+        if hashes is not None:
+            digest = _payload_hash(d.to_dict())
+            if hashes.unchanged(d.meta.id, digest):
+                return {'status':304, 'response':'unchanged'}
         
         logger.debug('saving')
+        sent = time.time()
         status = d.save(using=self.es, index=self.indexname)
+        if metrics:
+            metrics.add('build', sent - started)
+            metrics.request(time.time() - sent)
         logger.debug(str(status))
+        if hashes is not None:
+            hashes.set(d.meta.id, digest)
         return status
     
-    def post_multi(self, path, recursive=False, force=False):
+    def post_multi(self, path, recursive=False, force=False, bulk=False, chunk_size=BULK_CHUNK_SIZE, workers=1, incremental=False, skip_unchanged=False, progress_interval=0):
         """Publish (index) specified document and (optionally) its children.
         
-        After receiving a list of metadata files, index() iterates through the
-        list several times.  The first pass weeds out paths to objects that can
-        not be published (e.g. object or its parent is unpublished).
+        After receiving a list of metadata files, a single streaming pass
+        (_scan_publishable) reads each file once and weeds out paths to objects
+        that can not be published (e.g. object or its parent is unpublished).
+        The parsed data is reused when the objects are instantiated.
         
-        In the final pass, a list of public/publishable fields is chosen based
-        on the model.  Additional fields not in the model (e.g. parent ID, parent
+        Then a list of public/publishable fields is chosen based on the model.
+        Additional fields not in the model (e.g. parent ID, parent
         organization/collection/entity ID) are packaged.  Then everything is sent
-        off to post().
+        off to post() or to the bulk API.
+        
+        When a collection is published recursively the repository's HEAD commit
+        is recorded in the index (see published_commit) if there were no errors.
+        In incremental mode only metadata files added or modified since that
+        commit are published, and documents for deleted files are removed.
+        If a collection or entity changed, all its descendants are published
+        since they inherit its public/status values.
+        
+        Previously published documents that are no longer publishable are
+        removed afterwards in a single bulk request (see reconcile).  For full
+        collection publishes this includes anything in the index under the
+        collection that was not just published.
         
         @param path: Absolute path to directory containing object metadata files.
         @param recursive: Whether or not to recurse into subdirectories.
         @param force: boolean Just publish the damn collection already.
-        @returns: number successful,list of paths that didn't work out
+        @param bulk: boolean Send documents using the Elasticsearch bulk API.
+        @param chunk_size: int Number of documents per bulk request.
+        @param workers: int Number of processes preparing documents (implies bulk).
+        @param incremental: boolean Only publish files changed since last publish.
+        @param skip_unchanged: boolean Don't send documents whose payload hash
+            is unchanged since they were last sent (see PayloadHashes).
+        @param progress_interval: int Print a progress line every N seconds.
+        @returns: dict: numbers of documents, list of paths that didn't work
+            out, and 'metrics' (see PublishMetrics.summary)
         """
         logger.debug('index(%s, %s, %s, %s)' % (self.indexname, path, recursive, force))
         
+        metrics = PublishMetrics(interval=progress_interval)
         publicfields = _public_fields()
         
+        # Recursive collection publishes record the commit that was published
+        # so the next publish can be incremental.
+        collection_id = None
+        commit = None
+        if recursive and _is_collection_dir(path):
+            collection_id = Identifier(path=path).id
+            commit = dvcs.repository(path).head.commit.hexsha
+        
+        changes = None
+        if incremental and not collection_id:
+            logger.warning(
+                'Incremental publish needs a collection and recursive=True; '
+                'publishing all of %s' % path
+            )
+        elif incremental:
+            published = self.published_commit(collection_id)
+            if published:
+                changes = _changed_since(path, published)
+            else:
+                logger.info('%s has no published commit; full publish' % collection_id)
+        
+        ancestors = []
+        deleted = []
+        started = time.time()
         # process a single file if requested
         if os.path.isfile(path):
             paths = [path]
+        elif changes:
+            paths,deleted = changes
+            ancestors = _ancestor_paths(path, paths)
+        else:
+            paths = None
+        if paths is not None:
+            num = len(paths)
+            # Collections and entities come first so their public,status
+            # values are known by the time their children (which inherit
+            # them) come up.
+            paths = _parents_first(paths)
+        else:
+            # Publishing starts while the rest of the tree is scanned.
+            # The walk is top-down so parents already come before children.
+            num = None
+            paths = _timed(util.iter_meta_files(path, recursive), 'scan', metrics)
+        metrics.num = num
+        metrics.add('scan', time.time() - started)
+        
+        # Parse each file once and determine if it is publishable.
+        paths = _scan_publishable(paths, ancestors, force=force, metrics=metrics)
+        # note which IDs are published and which are not for reconcile()
+        publish_ids = set()
+        skip_ids = {}
+        paths = _note_ids(paths, publish_ids, skip_ids)
+        
+        hashes = None
+        if skip_unchanged:
+            try:
+                hashes = self.payload_hashes(Identifier(path=path).collection_id())
+            except Exception as err:
+                logger.error('No payload hash cache for %s: %s' % (path, err))
+        
+        if bulk or (workers > 1):
+            results = self._post_bulk(
+                paths, num, chunk_size=chunk_size, workers=workers, hashes=hashes,
+                metrics=metrics
+            )
         else:
-            # files listed first, then entities, then collections
-            paths = util.find_meta_files(path, recursive, files_first=1)
+            results = self._post_each(paths, num, hashes=hashes, metrics=metrics)
         
-        # Store value of public,status for each collection,entity.
-        # Values will be used by entities and files to inherit these values
-        # from their parent.
-        parents = _parents_status(paths)
+        # Remove documents that should no longer be published.
+        # A full collection publish knows every ID that should be in the index
+        # so anything else under the collection is stale.  Partial publishes
+        # only remove the unpublishable and deleted items they encountered.
+        stale = _deleted_ids(deleted)
+        stale.update(skip_ids)
+        if collection_id and (changes is None):
+            stale.update(self._stale_ids(collection_id, publish_ids))
+        results['deleted'] = self.reconcile(stale, hashes=hashes, metrics=metrics)
         
-        # Determine if paths are publishable or not
-        paths = _publishable(paths, parents, force=force)
+        if hashes is not None:
+            hashes.save()
+        
+        if collection_id and not results['bad']:
+            self.set_published_commit(collection_id, commit)
+        self.invalidate_facets()
+        if metrics.num is None:
+            metrics.num = metrics.documents
+        results['metrics'] = metrics.summary()
+        return results
+    
+    def _post_each(self, paths, num, hashes=None, metrics=None):
+        """Publish path dicts one document at a time.
         
+        @param paths: iterable of dicts from _scan_publishable()
+        @param num: int Number of paths (for progress output; None if unknown).
+        @param hashes: PayloadHashes (optional)
+        @param metrics: PublishMetrics (optional)
+        @returns: dict
+        """
+        if not metrics:
+            metrics = PublishMetrics(num)
+        total = 0
         skipped = 0
+        unchanged = 0
         successful = 0
         bad_paths = []
         
-        num = len(paths)
         for n,path in enumerate(paths):
+            total += 1
+            metrics.document()
             oi = path.get('identifier')
             # TODO write logs instead of print
             print('%s | %s/%s %s %s %s' % (
-                datetime.now(config.TZ), n+1, num, path['action'], oi.id, path['note'])
+                datetime.now(config.TZ), n+1, num or '?', path['action'],
+                getattr(oi, 'id', None), path['note'])
             )
             
+            if path['action'] == 'ERROR':
+                bad_paths.append(path)
+                continue
             if not oi:
                 path['note'] = 'No identifier'
                 bad_paths.append(path)
                 continue
-            document = oi.object()
+            # unpublishable items are removed by reconcile()
+            if path['action'] == 'SKIP':
+                skipped += 1
+                continue
+            started = time.time()
+            document = _load_document(path)
+            metrics.add('load', time.time() - started)
             if not document:
                 path['note'] = 'No document'
                 bad_paths.append(path)
                 continue
             
             # see if document exists
+            started = time.time()
             existing_v = None
             d = self.get(oi.model, oi.id)
             if d:
                 existing_v = d.meta.version
+            metrics.add('verify', time.time() - started)
             
             # post document
             if path['action'] == 'POST':
-                created = self.post(document, parents=parents, force=force)
-            # delete previously published items now marked incomplete/private
-            elif existing_v and (path['action'] == 'SKIP'):
-                print('%s | %s/%s DELETE' % (datetime.now(config.TZ), n+1, num))
-                self.delete(oi.id)
-            
-            if path['action'] == 'SKIP':
-                skipped += 1
-                continue
+                # publishability was already decided by _scan_publishable
+                created = self.post(document, force=True, hashes=hashes, metrics=metrics)
+                if created == {'status':304, 'response':'unchanged'}:
+                    unchanged += 1
+                    continue
             
             # version is incremented with each updated
+            started = time.time()
             posted_v = None
             # for e.g. segment the ES doc_type will be 'entity' but oi.model is 'segment'
             es_model = ELASTICSEARCH_CLASSES_BY_MODEL[oi.model]._doc_type.name
             d = self.get(es_model, oi.id)
             if d:
                 posted_v = d.meta.version
+            metrics.add('verify', time.time() - started)
 
             # success: created, or version number incremented
             status = 'ERROR - unspecified'
@@ -698,7 +1130,284 @@ class Docstore():
                 print(status)
             
         logger.debug('INDEXING COMPLETED')
-        return {'total':len(paths), 'skipped':skipped, 'successful':successful, 'bad':bad_paths}
+        return {
+            'total':total, 'skipped':skipped, 'unchanged':unchanged,
+            'successful':successful, 'bad':bad_paths
+        }
+    
+    def _post_bulk(self, paths, num, chunk_size=BULK_CHUNK_SIZE, workers=1, hashes=None, metrics=None):
+        """Publish list of path dicts via the Elasticsearch bulk API.
+        
+        Documents are built and streamed to ES in chunks; created/updated
+        status comes from the bulk response rather than from GETting each
+        document before and after posting.  Paths marked SKIP are only
+        counted; stale documents are removed afterwards by reconcile().
+        
+        Loading objects and building payloads is CPU-bound so it is done by
+        a pool of worker processes (if workers > 1), while a separate sender
+        thread ships finished documents to Elasticsearch.
+        
+        @param paths: iterable of dicts from _scan_publishable()
+        @param num: int Number of paths (for progress output; None if unknown).
+        @param chunk_size: int Number of documents per bulk request.
+        @param workers: int Number of processes preparing documents.
+        @param hashes: PayloadHashes Skip documents whose payload is unchanged.
+        @param metrics: PublishMetrics (optional)
+        @returns: dict
+        """
+        logger.debug('_post_bulk(%s, %s, %s)' % (self.indexname, chunk_size, workers))
+        if not metrics:
+            metrics = PublishMetrics(num)
+        results = {
+            'total': 0,
+            'skipped': 0,
+            'unchanged': 0,
+            'successful': 0,
+            'created': 0,
+            'updated': 0,
+            'deleted': 0,
+            'bad': [],
+        }
+        ids_paths = {}
+        # Bounded so preparation can't get too far ahead of the sender.
+        queue = Queue.Queue(maxsize=chunk_size * 2)
+        failures = []
+        
+        def actions():
+            while True:
+                action = queue.get()
+                if action is None:
+                    break
+                yield action
+        
+        def send():
+            try:
+                for ok,item in self._bulk(actions(), chunk_size, metrics):
+                    op_type,document_id,status = _bulk_status(item)
+                    if status in ['created', 'updated']:
+                        results[status] += 1
+                        results['successful'] += 1
+                        if hashes is not None:
+                            hashes.set(document_id, ids_paths[document_id]['hash'])
+                    elif status == 'error':
+                        path = ids_paths.get(document_id, {'path': None, 'identifier': None})
+                        path['note'] = 'ERROR: %s' % item[op_type].get('error')
+                        results['bad'].append(path)
+                        print('%s | ERROR %s %s' % (
+                            datetime.now(config.TZ), document_id, path['note'])
+                        )
+            except Exception as err:
+                failures.append(err)
+                # keep draining so the producer never blocks
+                for action in actions():
+                    pass
+        
+        sender = threading.Thread(target=send)
+        sender.start()
+        try:
+            prepared = _prepare_bulk_actions(paths, self.indexname, workers)
+            for n,(path,action) in enumerate(prepared):
+                results['total'] += 1
+                metrics.document()
+                for phase,seconds in path.pop('timings', {}).iteritems():
+                    metrics.add(phase, seconds)
+                oi = path.get('identifier')
+                # TODO write logs instead of print
+                print('%s | %s/%s %s %s %s' % (
+                    datetime.now(config.TZ), n+1, num or '?', path['action'],
+                    getattr(oi, 'id', None), path['note'])
+                )
+                if path['action'] == 'SKIP':
+                    results['skipped'] += 1
+                    continue
+                if not action:
+                    results['bad'].append(path)
+                    continue
+                if (hashes is not None) and hashes.unchanged(oi.id, path['hash']):
+                    results['unchanged'] += 1
+                    continue
+                ids_paths[oi.id] = path
+                queue.put(action)
+        finally:
+            queue.put(None)
+            sender.join()
+        if failures:
+            raise failures[0]
+        
+        logger.debug('INDEXING COMPLETED')
+        return results
+    
+    def _bulk(self, actions, chunk_size=BULK_CHUNK_SIZE, metrics=None):
+        """Sends actions to the bulk API one request at a time.
+        
+        Like helpers.streaming_bulk (errors are returned, not raised) but
+        times each request.
+        
+        @param actions: iterable of bulk API action dicts
+        @param chunk_size: int Number of documents per bulk request.
+        @param metrics: PublishMetrics (optional)
+        @returns: generator of (ok, item)
+        """
+        actions = iter(actions)
+        while True:
+            chunk = list(itertools.islice(actions, chunk_size))
+            if not chunk:
+                break
+            started = time.time()
+            items = list(helpers.streaming_bulk(
+                self.es, chunk, chunk_size=chunk_size, raise_on_error=False
+            ))
+            if metrics:
+                metrics.request(time.time() - started)
+            for item in items:
+                yield item
+    
+    def _stale_ids(self, collection_id, publish_ids):
+        """Scroll index for documents under collection that aren't in publish_ids.
+        
+        Raises an Exception if collection_id is analyzed in the index's
+        mappings, since the term query would then silently match nothing.
+        
+        @param collection_id: str
+        @param publish_ids: set IDs of documents that should be published
+        @returns: dict {document_id: doc_type}
+        """
+        self._check_keyword_field('collection_id')
+        stale = {}
+        hits = helpers.scan(
+            self.es,
+            index=self.indexname,
+            doc_type=','.join([c['doctype'] for c in ELASTICSEARCH_CLASSES['all']]),
+            query={
+                'query': {'term': {'collection_id': collection_id}},
+                '_source': False,
+            },
+        )
+        for hit in hits:
+            document_id = hit['_id']
+            if document_id not in publish_ids:
+                stale[document_id] = hit['_type']
+        return stale
+    
+    def _check_keyword_field(self, field):
+        """Raises Exception if field is analyzed in any doctype that maps it.
+        
+        Term queries only match fields that are not analyzed (ES 2.x
+        not_analyzed strings, ES 5+ keywords).  Checked once per index.
+        
+        @param field: str
+        """
+        key = (str(self.hosts), self.indexname, field)
+        if key in KEYWORD_FIELDS_CHECKED:
+            return
+        mappings = self.es.indices.get_field_mapping(
+            index=self.indexname,
+            doc_type=','.join([c['doctype'] for c in ELASTICSEARCH_CLASSES['all']]),
+            fields=field,
+        )
+        analyzed = []
+        for index,data in mappings.iteritems():
+            for doctype,fields in data.get('mappings', {}).iteritems():
+                mapping = fields.get(field, {}).get('mapping', {}).get(field, {})
+                if (mapping.get('type') == 'text') \
+                or ((mapping.get('type') == 'string') \
+                    and (mapping.get('index') != 'not_analyzed')):
+                    analyzed.append('%s/%s' % (index, doctype))
+        if analyzed:
+            raise Exception(
+                '%s is analyzed in %s; it must be not_analyzed (see repo_models).' % (
+                    field, ', '.join(sorted(analyzed))
+            ))
+        KEYWORD_FIELDS_CHECKED.add(key)
+    
+    def reconcile(self, stale, hashes=None, metrics=None):
+        """Remove unpublishable/deleted documents using a single bulk request.
+        
+        Documents that are not in the index are ignored.
+        
+        @param stale: dict {document_id: doc_type}
+        @param hashes: PayloadHashes (optional)
+        @param metrics: PublishMetrics (optional)
+        @returns: int Number of documents deleted
+        """
+        actions = []
+        for document_id,doc_type in sorted(stale.iteritems()):
+            actions.append({
+                '_op_type': 'delete',
+                '_index': self.indexname,
+                '_type': doc_type,
+                '_id': document_id,
+            })
+        deleted = 0
+        for ok,item in self._bulk(actions, metrics=metrics):
+            op_type,document_id,status = _bulk_status(item)
+            if status == 'deleted':
+                deleted += 1
+                print('%s | DELETE %s' % (datetime.now(config.TZ), document_id))
+            if hashes is not None:
+                hashes.remove(document_id)
+        return deleted
+    
+    def publish_state_index(self, index=None):
+        """Name of the index holding publish state for the specified index.
+        
+        @param index: str Name of index (default self.indexname)
+        @returns: str
+        """
+        if not index:
+            index = self.indexname
+        return '%s-%s' % (index, PUBLISH_STATE_DOCTYPE)
+    
+    def init_publish_state(self, index=None):
+        """Creates publish state index with explicit mappings if not present.
+        
+        @param index: str Name of index (default self.indexname)
+        @returns: JSON dict with status code and response, or None
+        """
+        state_index = self.publish_state_index(index)
+        if self.index_exists(state_index):
+            return None
+        logger.debug('creating publish state index: %s' % state_index)
+        return self.es.indices.create(
+            index=state_index,
+            body={'settings': {}, 'mappings': PUBLISH_STATE_MAPPINGS}
+        )
+    
+    def published_commit(self, collection_id):
+        """Commit of the collection repo at its last complete publish, if any.
+        
+        @param collection_id: str
+        @returns: str commit hash or None
+        """
+        try:
+            document = self.es.get(
+                index=self.publish_state_index(), doc_type=PUBLISH_STATE_DOCTYPE,
+                id=collection_id
+            )
+        except TransportError:
+            return None
+        return document['_source'].get('commit')
+    
+    def set_published_commit(self, collection_id, commit):
+        """Record commit of the collection repo that was just published.
+        
+        @param collection_id: str
+        @param commit: str commit hash
+        @returns: dict
+        """
+        logger.debug('set_published_commit(%s, %s)' % (collection_id, commit))
+        self.init_publish_state()
+        return self.es.index(
+            index=self.publish_state_index(), doc_type=PUBLISH_STATE_DOCTYPE,
+            id=collection_id,
+            body={
+                'id': collection_id,
+                'commit': commit,
+                'published': datetime.now(config.TZ).strftime(
+                    config.ELASTICSEARCH_DATETIME_FORMAT
+                ),
+            }
+        )
      
     def exists(self, model, document_id):
         """
@@ -806,11 +1515,82 @@ class Docstore():
         )
         return results
     
-    def reindex(self, source, dest):
+    def iter_search(self, doctypes=[], query={}, sort=[], fields=[], size=BULK_CHUNK_SIZE, scroll='5m'):
+        """Executes a query, yields all hits without loading them into memory.
+        
+        Uses the scroll API so there is no MAX_SIZE limit; hits are fetched
+        from ES size at a time.  Hits are in index order unless sort is given.
+        
+        >>> for hit in docstore.Docstore().iter_search(doctypes=['file'], query=q):
+        ...     print(hit['_id'])
+        
+        @param doctypes: list Type of object ('collection', 'entity', 'file')
+        @param query: dict The search definition using Elasticsearch Query DSL
+        @param sort: list of (fieldname,direction) tuples
+        @param fields: str
+        @param size: int Number of hits per scroll request (per shard)
+        @param scroll: str How long ES should keep the scroll context alive
+        @returns: generator of raw hit dicts
+        """
+        logger.debug('iter_search(index=%s, doctypes=%s, query=%s, sort=%s, fields=%s, size=%s' % (
+            self.indexname, doctypes, query, sort, fields, size
+        ))
+        if not query:
+            raise Exception("Can't do an empty search. Give me something to work with here.")
+        
+        _clean_dict(sort)
+        sort_cleaned = _clean_sort(sort)
+        kwargs = {}
+        if sort_cleaned:
+            kwargs['sort'] = sort_cleaned
+        if fields:
+            kwargs['_source_include'] = ','.join(fields)
+        return helpers.scan(
+            self.es,
+            query=query,
+            scroll=scroll,
+            preserve_order=bool(sort_cleaned),
+            index=self.indexname,
+            doc_type=','.join(doctypes),
+            size=size,
+            **kwargs
+        )
+    
+    def search_page(self, doctypes=[], query={}, sort=[], fields=[], thispage=1, page_size=25):
+        """Executes a query, returns only the requested page and the total.
+        
+        Replacement for search() + massage_query_results() when results are
+        displayed with a paginator: ES only returns page_size hits and the
+        result is padded with placeholders on demand rather than in memory.
+        
+        @param doctypes: list Type of object ('collection', 'entity', 'file')
+        @param query: dict The search definition using Elasticsearch Query DSL
+        @param sort: list of (fieldname,direction) tuples
+        @param fields: str
+        @param thispage: Value of GET['page'] or 1
+        @param page_size: Number of objects per page
+        @returns: PaginatedResults
+        """
+        try:
+            number = max(int(thispage), 1)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        results = self.search(
+            doctypes=doctypes, query=query, sort=sort, fields=fields,
+            from_=(number - 1) * page_size, size=page_size,
+        )
+        return massage_page_results(results, thispage, page_size)
+    
+    def reindex(self, source, dest, chunk_size=BULK_CHUNK_SIZE, slices=1):
         """Copy documents from one index to another.
         
+        On 2.3+ clusters this starts a reindex task and returns immediately;
+        see wait_for_task.
+        
         @param source: str Name of source index.
         @param dest: str Name of destination index.
+        @param chunk_size: int Documents per batch.
+        @param slices: int Number of parallel slices (ES 5.1+).
         @returns: number successful,list of paths that didn't work out
         """
         logger.debug('reindex(%s, %s)' % (source, dest))
@@ -831,9 +1611,12 @@ class Docstore():
         if version >= '2.3':
             logger.debug('new API')
             body = {
-                "source": {"index": source},
+                "source": {"index": source, "size": chunk_size},
                 "dest": {"index": dest}
             }
+            params = {}
+            if slices > 1:
+                params['slices'] = slices
             results = self.es.reindex(
                 body=json.dumps(body),
                 refresh=None,
@@ -841,21 +1624,270 @@ class Docstore():
                 timeout='1m',
                 wait_for_active_shards=1,
                 wait_for_completion=False,
+                params=params,
             )
         else:
             logger.debug('pre-2.3 legacy API')
-            from elasticsearch import helpers
             results = helpers.reindex(
                 self.es, source, dest,
                 #query=None,
                 #target_client=None,
-                #chunk_size=500,
+                chunk_size=chunk_size,
                 #scroll=5m,
                 #scan_kwargs={},
                 #bulk_kwargs={}
             )
         return results
+    
+    def task_status(self, task_id):
+        """Status of a (reindex) task.
+        
+        @param task_id: str
+        @returns: (completed, status) where status is the task's status dict
+        """
+        response = self.es.tasks.list(task_id=task_id)
+        # ES 5+
+        if 'completed' in response:
+            return response['completed'], response.get('task', {}).get('status', {})
+        # ES 2.x lists running tasks by node
+        for node in response.get('nodes', {}).values():
+            task = node.get('tasks', {}).get(task_id)
+            if task:
+                return False, task.get('status', {})
+        return True, {}
+    
+    def wait_for_task(self, task_id, interval=5):
+        """Polls task until it completes, printing progress.
+        
+        @param task_id: str
+        @param interval: int Seconds between polls.
+        @returns: dict Final task status
+        """
+        while True:
+            completed,status = self.task_status(task_id)
+            print('%s | %s %s' % (
+                datetime.now(config.TZ), task_id, _task_progress(status)
+            ))
+            if completed:
+                return status
+            time.sleep(interval)
+    
+    def doc_count(self, index=None):
+        """Number of DDR documents (see ELASTICSEARCH_CLASSES) in the index.
+        
+        @param index: str
+        @returns: int
+        """
+        if not index:
+            index = self.indexname
+        return self.es.count(
+            index=index,
+            doc_type=','.join([c['doctype'] for c in ELASTICSEARCH_CLASSES['all']]),
+        )['count']
+    
+    def doc_counts(self, index=None):
+        """Number of documents of each DDR doctype in the index.
+        
+        @param index: str
+        @returns: dict {doctype: count}
+        """
+        if not index:
+            index = self.indexname
+        return {
+            c['doctype']: self.es.count(index=index, doc_type=c['doctype'])['count']
+            for c in ELASTICSEARCH_CLASSES['all']
+        }
+    
+    def rebuild(self, alias, paths=[], vocabs_path=config.VOCABS_PATH, narrators_path=config.NARRATORS_PATH, workers=1, chunk_size=BULK_CHUNK_SIZE, slices=1, interval=5):
+        """Rebuilds the index behind an alias without interrupting searches.
+        
+        Creates a new timestamped index and either publishes the collection
+        repositories in paths into it or (if no paths) reindexes the alias'
+        current target into it.  When publishing, the vocabulary facets and
+        terms, narrators, and the collections' repository and organization
+        documents are posted as well.
+        The document count of the new index is checked against the number
+        published or the old index, and counts for each doctype are compared
+        with the alias' current index (a warning is printed for each that
+        differs, e.g. collections missing from paths).  Then the alias is
+        switched to the new index in one atomic request.
+        The old index is left in place; delete it when satisfied.
+        
+        @param alias: str Name of the alias
+        @param paths: list Absolute paths to collection repositories
+        @param vocabs_path: str Absolute path to ddr-vocab facets (publish)
+        @param narrators_path: str Absolute path to narrators.json (publish)
+        @param workers: int Processes preparing documents (publish)
+        @param chunk_size: int Documents per bulk request / reindex batch
+        @param slices: int Number of parallel reindex slices (ES 5.1+)
+        @param interval: int Seconds between reindex progress checks
+        @returns: str Name of the new index
+        """
+        alias = make_index_name(alias)
+        source = self.target_index(alias)
+        dest = make_index_name('%s-%s' % (
+            alias, datetime.now(config.TZ).strftime('%Y%m%d%H%M%S')
+        ))
+        if not (paths or source):
+            raise Exception('Alias "%s" has no index to reindex from.' % alias)
+        if paths:
+            if not (vocabs_path and os.path.exists(vocabs_path)):
+                raise Exception('Vocabularies not found: "%s". Alias not changed.' % vocabs_path)
+            if not (narrators_path and os.path.exists(narrators_path)):
+                raise Exception('Narrators not found: "%s". Alias not changed.' % narrators_path)
+            repo_org_paths = _repo_org_paths(paths)
+        
+        print('%s | creating %s' % (datetime.now(config.TZ), dest))
+        ds = Docstore(self.hosts, dest, connection=self.es)
+        ds.create_index()
+        
+        if paths:
+            print('%s | posting vocabularies' % datetime.now(config.TZ))
+            results = ds.post_vocabs(path=vocabs_path, chunk_size=chunk_size)
+            if results['bad']:
+                raise Exception('%s vocabulary documents could not be published. Alias not changed.' % (
+                    len(results['bad'])
+                ))
+            expected = results['successful']
+            print('%s | posting narrators' % datetime.now(config.TZ))
+            results = ds.narrators(narrators_path)
+            if results['bad']:
+                raise Exception('%s narrators could not be published. Alias not changed.' % (
+                    len(results['bad'])
+                ))
+            expected += results['successful']
+            for model,path in repo_org_paths:
+                print('%s | %s %s' % (datetime.now(config.TZ), model, path))
+                if not _indexed(ds._repo_org(path, model)):
+                    raise Exception('%s could not be published. Alias not changed.' % path)
+                expected += 1
+            for path in paths:
+                results = ds.post_multi(
+                    path, recursive=True, bulk=True,
+                    chunk_size=chunk_size, workers=workers
+                )
+                if results['bad']:
+                    raise Exception('%s: %s documents could not be published. Alias not changed.' % (
+                        path, len(results['bad'])
+                    ))
+                expected += results['successful']
+        else:
+            print('%s | reindexing %s -> %s' % (datetime.now(config.TZ), source, dest))
+            results = self.reindex(source, dest, chunk_size=chunk_size, slices=slices)
+            if isinstance(results, basestring):
+                raise Exception(results)
+            if isinstance(results, dict) and results.get('task'):
+                self.wait_for_task(results['task'], interval=interval)
+            expected = self.doc_count(source)
+        
+        self.es.indices.refresh(index=dest)
+        count = self.doc_count(dest)
+        print('%s | %s documents, expected %s' % (datetime.now(config.TZ), count, expected))
+        if count != expected:
+            raise Exception('%s has %s documents, expected %s. Alias not changed.' % (
+                dest, count, expected
+            ))
+        if source:
+            old_counts = self.doc_counts(source)
+            new_counts = self.doc_counts(dest)
+            for doctype in sorted(old_counts):
+                if new_counts[doctype] != old_counts[doctype]:
+                    message = '%s has %s %s documents, %s has %s' % (
+                        dest, new_counts[doctype], doctype,
+                        source, old_counts[doctype]
+                    )
+                    logger.warning(message)
+                    print('%s | WARNING %s' % (datetime.now(config.TZ), message))
+        self.create_alias(alias, dest)
+        return dest
+
 
+def _indexed(result):
+    """Whether an Elasticsearch index API response reports success.
+    
+    >>> _indexed({'_id': 'ddr', '_shards': {'total': 2, 'successful': 1, 'failed': 0}})
+    True
+    >>> _indexed({'_id': 'ddr', '_shards': {'total': 2, 'successful': 0, 'failed': 2}})
+    False
+    
+    @param result: dict
+    @returns: boolean
+    """
+    if not (result and result.get('_id')):
+        return False
+    shards = result.get('_shards', {})
+    return not shards.get('failed') or bool(shards.get('successful'))
+
+def _repo_org_paths(paths):
+    """Repository and organization .json files above collection repositories
+    
+    Raises an Exception if any are missing.
+    
+    @param paths: list Absolute paths to collection repositories
+    @returns: list of (model, path) without duplicates, repositories first
+    """
+    found = []
+    for path in paths:
+        for oi in reversed(Identifier(path=path).lineage(stubs=True)):
+            if oi.model in ['repository', 'organization']:
+                json_path = oi.path_abs('json')
+                if not os.path.exists(json_path):
+                    raise Exception('%s not found. Alias not changed.' % json_path)
+                if (oi.model,json_path) not in found:
+                    found.append((oi.model,json_path))
+    return found
+
+def _facet_results(terms, missing):
+    """Formats terms aggregation like results of the old facets API.
+    
+    @param terms: dict terms aggregation results
+    @param missing: dict missing aggregation results
+    @returns: dict
+    """
+    buckets = [
+        {'term': bucket['key'], 'count': bucket['doc_count']}
+        for bucket in terms['buckets']
+    ]
+    other = terms.get('sum_other_doc_count', 0)
+    return {
+        '_type': 'terms',
+        'missing': missing['doc_count'],
+        # occurrences of all terms, as with the facets API
+        'total': sum([bucket['count'] for bucket in buckets]) + other,
+        'other': other,
+        'terms': buckets,
+    }
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of sorted list of values.
+    
+    >>> _percentile([1,2,3,4,5,6,7,8,9,10], 95)
+    10
+    
+    @param values: list Sorted values
+    @param percent: int
+    @returns: value or 0 if no values
+    """
+    if not values:
+        return 0
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[max(rank, 1) - 1]
+
+def _task_progress(status):
+    """Formats reindex task status as "DONE/TOTAL (PERCENT%)".
+    
+    >>> _task_progress({'total': 200, 'created': 40, 'updated': 10, 'deleted': 0})
+    '50/200 (25%)'
+    
+    @param status: dict
+    @returns: str
+    """
+    total = status.get('total', 0)
+    done = sum([status.get(key, 0) for key in ['created', 'updated', 'deleted']])
+    percent = 0
+    if total:
+        percent = done * 100 / total
+    return '%s/%s (%s%%)' % (done, total, percent)
 
 def make_index_name(text):
     """Takes input text and generates a legal Elasticsearch index name.
@@ -905,6 +1937,197 @@ def doctype_fields(es_class):
     """
     return es_class._doc_type.mapping.to_dict()[es_class._doc_type.name]['properties'].keys()
 
+def _indexer_plan(identifier):
+    """DocType class and (fieldname, index_* function or None) list for model.
+    
+    Looking up the DocType fields and index_* functions for every field of
+    every document is slow, so it is done once per model and cached in
+    INDEXER_PLANS.
+    
+    @param identifier: Identifier
+    @returns: (ES_Class, [(fieldname, function), ...])
+    """
+    model = identifier.model
+    if model not in INDEXER_PLANS:
+        ES_Class = ELASTICSEARCH_CLASSES_BY_MODEL[model]
+        fields_module = identifier.fields_module()
+        plan = []
+        for fieldname in doctype_fields(ES_Class):
+            function = getattr(fields_module, 'index_%s' % fieldname, None)
+            if not callable(function):
+                function = None
+            plan.append((fieldname, function))
+        INDEXER_PLANS[model] = (ES_Class, plan)
+    return INDEXER_PLANS[model]
+
+def _make_doctype(document):
+    """Builds Elasticsearch DocType object for the document (does not save).
+    
+    @param document: Collection,Entity,File The object to post.
+    @returns: elasticsearch_dsl.DocType
+    """
+    # instantiate appropriate subclass of ESObject / DocType
+    # TODO Devil's advocate: why are we doing this? We already have the object.
+    ES_Class,plan = _indexer_plan(document.identifier)
+    d = ES_Class()
+    d.meta.id = document.identifier.id
+    for fieldname,function in plan:
+    
+        # index_* for complex fields
+        if function:
+            field_data = function(getattr(document, fieldname))
+    
+        # everything else
+        else:
+            try:
+                field_data = getattr(document, fieldname)
+            except AttributeError as err:
+                field_data = None
+    
+        if field_data:
+            setattr(d, fieldname, field_data)
+    
+    # Add parts of id (e.g. repo, org, cid) to document as separate fields.
+    for key in ['repo', 'org', 'cid', 'eid', 'sid', 'role', 'sha1']:
+        setattr(d, key, document.identifier.parts.get(key, ''))
+    
+    d.collection_id = document.identifier.collection_id()
+    if d.collection_id and (d.collection_id != document.identifier.id):
+        # we don't want file-role (a stub) as parent
+        d.parent_id = document.identifier.parent_id(stubs=0)
+    else:
+        # but we do want repository,organization (both stubs)
+        d.parent_id = document.identifier.parent_id(stubs=1)
+    
+    return d
+
+def _bulk_action(d, indexname):
+    """Wraps DocType object in an Elasticsearch bulk API index action.
+    
+    @param d: elasticsearch_dsl.DocType
+    @param indexname: str
+    @returns: dict
+    """
+    return {
+        '_op_type': 'index',
+        '_index': indexname,
+        '_type': d._doc_type.name,
+        '_id': d.meta.id,
+        '_source': d.to_dict(),
+    }
+
+def _prepare_bulk_action(args):
+    """Loads object and builds its bulk API action.
+    
+    Module-level function so it can be run in a multiprocessing.Pool.
+    
+    @param args: tuple (path dict from _scan_publishable(), indexname)
+    @returns: (path, action) where action is None if it couldn't be built
+        or the path is not publishable
+    """
+    path,indexname = args
+    oi = path.get('identifier')
+    # metadata file could not be read (see _scan_publishable)
+    if path['action'] == 'ERROR':
+        return path,None
+    if not oi:
+        path['note'] = 'No identifier'
+        return path,None
+    # unpublishable items are removed by Docstore.reconcile
+    if path['action'] == 'SKIP':
+        path.pop('data', None)
+        return path,None
+    # timings are returned with the path since this may run in another process
+    path['timings'] = {}
+    started = time.time()
+    try:
+        document = _load_document(path)
+    except Exception as err:
+        path['note'] = 'Could not load document: %s' % err
+        return path,None
+    path['timings']['load'] = time.time() - started
+    if not document:
+        path['note'] = 'No document'
+        return path,None
+    started = time.time()
+    try:
+        d = _make_doctype(document)
+        d.full_clean()
+    except Exception as err:
+        path['note'] = 'Could not build document: %s' % err
+        return path,None
+    action = _bulk_action(d, indexname)
+    path['hash'] = _payload_hash(action['_source'])
+    path['timings']['build'] = time.time() - started
+    return path,action
+
+def _prepare_bulk_actions(paths, indexname, workers=1):
+    """Yields (path, action) tuples in order, optionally using worker processes.
+    
+    @param paths: iterable of dicts from _scan_publishable()
+    @param indexname: str
+    @param workers: int Number of processes; if 1 work is done in this process.
+    """
+    args = ((path, indexname) for path in paths)
+    if workers > 1:
+        pool = multiprocessing.Pool(workers)
+        try:
+            # Pool.imap consumes its input as fast as it can, so feed it in
+            # batches to keep the scan from running too far ahead.
+            while True:
+                batch = list(itertools.islice(args, workers * 100))
+                if not batch:
+                    break
+                for result in pool.imap(_prepare_bulk_action, batch, chunksize=10):
+                    yield result
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for arg in args:
+            yield _prepare_bulk_action(arg)
+
+def _payload_hash(data):
+    """SHA1 hash of document payload, independent of dict ordering.
+    
+    @param data: dict
+    @returns: str
+    """
+    return hashlib.sha1(
+        json.dumps(data, sort_keys=True, default=str)
+    ).hexdigest()
+
+def _bulk_status(item):
+    """Interprets one item from an Elasticsearch bulk API response.
+    
+    >>> _bulk_status({'index': {'_id': 'ddr-test-123', 'status': 201}})
+    ('index', 'ddr-test-123', 'created')
+    >>> _bulk_status({'index': {'_id': 'ddr-test-123', 'status': 200}})
+    ('index', 'ddr-test-123', 'updated')
+    >>> _bulk_status({'delete': {'_id': 'ddr-test-123', 'status': 404}})
+    ('delete', 'ddr-test-123', 'notfound')
+    
+    @param item: dict
+    @returns: (op_type, document_id, status) where status is one of
+    'created', 'updated', 'deleted', 'notfound', 'error'
+    """
+    op_type,info = item.items()[0]
+    document_id = info.get('_id')
+    code = info.get('status')
+    if info.get('error'):
+        if (op_type == 'delete') and (code == 404):
+            return op_type,document_id,'notfound'
+        return op_type,document_id,'error'
+    if op_type == 'delete':
+        if code == 404:
+            return op_type,document_id,'notfound'
+        return op_type,document_id,'deleted'
+    if code == 201:
+        return op_type,document_id,'created'
+    elif code == 200:
+        return op_type,document_id,'updated'
+    return op_type,document_id,'error'
+
 def _filter_payload(data, public_fields):
     """If requested, removes non-public fields from document before sending to ElasticSearch.
     
@@ -1075,11 +2298,6 @@ def massage_query_results(results, thispage, page_size):
     @param page_size: Number of objects per page
     @returns: list of hit dicts, with empty "hits" fore and aft of current page
     """
-    def unlistify(o, fieldname):
-        if o.get(fieldname, None):
-            if isinstance(o[fieldname], list):
-                o[fieldname] = o[fieldname][0]
-    
     objects = []
     if results and results['hits']:
         total = results['hits']['total']
@@ -1090,23 +2308,106 @@ def massage_query_results(results, thispage, page_size):
                  'id': hit['_id'],
                  'placeholder': True}
             if (n >= bottom) and (n < top):
-                # if we tell ES only return certain fields, object is in 'fields'
-                if hit.get('fields', None):
-                    o = hit['fields']
-                elif hit.get('_source', None):
-                    o = hit['_source']
-                # copy ES results info to individual object source
-                o['index'] = hit['_index']
-                o['type'] = hit['_type']
-                o['model'] = hit['_type']
-                o['id'] = hit['_id']
-                # ElasticSearch wraps field values in lists
-                # when you use a 'fields' array in a query
-                for fieldname in all_list_fields():
-                    unlistify(o, fieldname)
+                o = _hit_object(hit)
             objects.append(o)
     return objects
 
+def massage_page_results(results, thispage, page_size):
+    """Takes ES query for a single page; pads results for paginator.
+    
+    The "BETTER" approach from massage_query_results: results contains only
+    the hits for thispage (see Docstore.search_page) and the placeholders
+    before and after them are made on demand by PaginatedResults.
+    
+    @param results: ElasticSearch result set (non-empty, no errors)
+    @param thispage: Value of GET['page'] or 1
+    @param page_size: Number of objects per page
+    @returns: PaginatedResults
+    """
+    objects = []
+    total = 0
+    bottom = 0
+    if results and results['hits']:
+        total = results['hits']['total']
+        if total:
+            bottom,top,num_pages = _page_bottom_top(total, thispage, page_size)
+        objects = [_hit_object(hit) for hit in results['hits']['hits']]
+    return PaginatedResults(objects, total, bottom)
+
+def _hit_object(hit):
+    """Makes facsimile of original object from ES hit.
+    
+    @param hit: dict
+    @returns: dict
+    """
+    def unlistify(o, fieldname):
+        if o.get(fieldname, None):
+            if isinstance(o[fieldname], list):
+                o[fieldname] = o[fieldname][0]
+    
+    o = {}
+    # if we tell ES only return certain fields, object is in 'fields'
+    if hit.get('fields', None):
+        o = hit['fields']
+    elif hit.get('_source', None):
+        o = hit['_source']
+    # copy ES results info to individual object source
+    o['index'] = hit['_index']
+    o['type'] = hit['_type']
+    o['model'] = hit['_type']
+    o['id'] = hit['_id']
+    # ElasticSearch wraps field values in lists
+    # when you use a 'fields' array in a query
+    for fieldname in all_list_fields():
+        unlistify(o, fieldname)
+    return o
+
+class PaginatedResults(object):
+    """List-like stand-in for the output of massage_query_results.
+    
+    Has the length of the entire result set but only holds the objects for
+    one page; other positions are placeholders made on demand.
+    Works with Django Paginator, which uses len()/count() and slicing.
+    """
+    
+    def __init__(self, objects, total, bottom):
+        """
+        @param objects: list Objects for the current page
+        @param total: int Number of hits in the entire result set
+        @param bottom: int Position of first object in result set
+        """
+        self.objects = objects
+        self.total = total
+        self.bottom = bottom
+    
+    def __repr__(self):
+        return "<%s.%s %s-%s/%s>" % (
+            self.__module__, self.__class__.__name__,
+            self.bottom, self.bottom + len(self.objects), self.total
+        )
+    
+    def __len__(self):
+        return self.total
+    
+    def count(self):
+        return self.total
+    
+    def __iter__(self):
+        for n in range(self.total):
+            yield self[n]
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[n] for n in range(*key.indices(self.total))]
+        if key < 0:
+            key += self.total
+        if (key < 0) or (key >= self.total):
+            raise IndexError('PaginatedResults index out of range')
+        n = key - self.bottom
+        if (n >= 0) and (n < len(self.objects)):
+            return self.objects[n]
+        return {'n':key, 'id':None, 'placeholder':True}
+
 def _clean_sort( sort ):
     """Take list of [a,b] lists, return comma-separated list of a:b pairs
     
@@ -1190,6 +2491,147 @@ def _file_parent_ids(identifier):
         identifier.collection_id(),
     ]
 
+def _note_ids(paths, publish_ids, skip_ids):
+    """Passes path dicts through, noting which IDs are to be published or not.
+    
+    @param paths: iterable of dicts from _scan_publishable()
+    @param publish_ids: set IDs to be published are added to this
+    @param skip_ids: dict IDs to be removed are added to this, with doc_type
+    @returns: generator of dicts
+    """
+    for path in paths:
+        oi = path.get('identifier')
+        if oi:
+            if path['action'] == 'SKIP':
+                skip_ids[oi.id] = ELASTICSEARCH_CLASSES_BY_MODEL[oi.model]._doc_type.name
+            else:
+                # includes unreadable files (ERROR) so their existing
+                # documents are not removed as stale
+                publish_ids.add(oi.id)
+        yield path
+
+def _deleted_ids(paths):
+    """IDs and doc_types of documents for (deleted) metadata files.
+    
+    @param paths: list of absolute paths
+    @returns: dict {document_id: doc_type}
+    """
+    ids = {}
+    for path in paths:
+        try:
+            oi = Identifier(path=path)
+        except MalformedPathException:
+            continue
+        ids[oi.id] = ELASTICSEARCH_CLASSES_BY_MODEL[oi.model]._doc_type.name
+    return ids
+
+def _is_collection_dir(path):
+    """True if path is a collection repository directory.
+    """
+    return os.path.isdir(path) \
+        and os.path.exists(os.path.join(path, 'collection.json'))
+
+def _is_meta_file(path):
+    """True if path is a metadata file for one of the models.
+    """
+    if not path.endswith('.json'):
+        return False
+    for model in META_FILENAME_REGEX.iterkeys():
+        if util.path_matches_model(path, model):
+            return True
+    return False
+
+def _changed_since(collection_path, commit):
+    """Lists metadata files added/modified or deleted since commit.
+    
+    Descendants of changed collections and entities are included since
+    they inherit public/status from them.
+    
+    @param collection_path: str Absolute path to collection repo
+    @param commit: str Commit hash
+    @returns: (paths, deleted_paths) or None if commit could not be compared
+    """
+    repo = dvcs.repository(collection_path)
+    try:
+        changes = dvcs.list_changed_since(repo, commit)
+    except Exception as err:
+        logger.error('Could not compare to %s; full publish required: %s' % (commit, err))
+        return None
+    paths = []
+    deleted = []
+    seen = set()
+    for status,path_rel in changes:
+        path = os.path.join(collection_path, path_rel)
+        if not _is_meta_file(path):
+            continue
+        if status == 'D':
+            deleted.append(path)
+            continue
+        if os.path.basename(path) in ['collection.json', 'entity.json']:
+            descendants = util.find_meta_files(
+                os.path.dirname(path), recursive=True, force_read=True
+            )
+        else:
+            descendants = [path]
+        for p in descendants:
+            if p not in seen:
+                seen.add(p)
+                paths.append(p)
+    return paths,deleted
+
+def _ancestor_paths(collection_path, paths):
+    """Lists collection.json and entity.json files above the given paths.
+    
+    Used to get the public/status values that the paths inherit.
+    
+    @param collection_path: str Absolute path to collection repo
+    @param paths: list of absolute paths
+    @returns: list of absolute paths
+    """
+    collection_path = os.path.normpath(collection_path)
+    paths_set = set(paths)
+    ancestors = []
+    dirs_seen = set()
+    for path in paths:
+        d = os.path.dirname(path)
+        while (len(d) >= len(collection_path)) and (d not in dirs_seen):
+            dirs_seen.add(d)
+            for filename in ['entity.json', 'collection.json']:
+                candidate = os.path.join(d, filename)
+                if (candidate not in paths_set) and os.path.exists(candidate):
+                    ancestors.append(candidate)
+            d = os.path.dirname(d)
+    return ancestors
+
+def _publish_decision(identifier, parents, force=False):
+    """Decides whether object can be published based on its parents' status.
+    
+    @param identifier: Identifier
+    @param parents: dict of public,status values for parent objects, by ID
+    @param force: boolean Just publish the damn collection already.
+    @returns: (action, note)
+    """
+    if force:
+        return 'POST',''
+    
+    # see if item incomplete or nonpublic
+    
+    # see if item's parents are incomplete or nonpublic
+    # TODO Bad! Bad! Generalize this...
+    UNPUBLISHABLE = []
+    for parent_id in _file_parent_ids(identifier):
+        parent = parents.get(parent_id, {})
+        for x in parent.itervalues():
+            if (x not in STATUS_OK) and (x not in PUBLIC_OK):
+                if parent_id not in UNPUBLISHABLE:
+                    UNPUBLISHABLE.append(parent_id)
+    if UNPUBLISHABLE:
+        return 'SKIP','parent unpublishable'
+    
+    if identifier.model:
+        return 'POST',''
+    return 'UNSPECIFIED',''
+
 def _publishable(paths, parents, force=False):
     """Determines which paths represent publishable paths and which do not.
     
@@ -1206,35 +2648,120 @@ def _publishable(paths, parents, force=False):
             'action': 'UNSPECIFIED',
             'note': '',
         }
-        
-        if force:
-            d['action'] = 'POST'
-            path_dicts.append(d)
-            continue
-        
-        # see if item incomplete or nonpublic
-        
-        # see if item's parents are incomplete or nonpublic
-        # TODO Bad! Bad! Generalize this...
-        UNPUBLISHABLE = []
-        for parent_id in _file_parent_ids(d['identifier']):
-            parent = parents.get(parent_id, {})
-            for x in parent.itervalues():
-                if (x not in STATUS_OK) and (x not in PUBLIC_OK):
-                    if parent_id not in UNPUBLISHABLE:
-                        UNPUBLISHABLE.append(parent_id)
-        if UNPUBLISHABLE:
-            d['action'] = 'SKIP'
-            d['note'] = 'parent unpublishable'
-            path_dicts.append(d)
-            continue
-        
-        if path and d['identifier'].model:
-            d['action'] = 'POST'
+        d['action'],d['note'] = _publish_decision(d['identifier'], parents, force)
         path_dicts.append(d)
-    
     return path_dicts
 
+def _timed(iterable, phase, metrics):
+    """Adds time spent producing each item of iterable to a phase.
+    
+    @param iterable: e.g. generator from util.iter_meta_files
+    @param phase: str
+    @param metrics: PublishMetrics
+    @returns: generator
+    """
+    iterator = iter(iterable)
+    while True:
+        started = time.time()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            metrics.add(phase, time.time() - started)
+            return
+        metrics.add(phase, time.time() - started)
+        yield item
+
+def _parents_first(paths):
+    """Orders paths collections, entities, then files.
+    
+    Order within each group is preserved so e.g. entities above
+    segments stay above them.
+    
+    @param paths: list
+    @returns: list
+    """
+    ranks = {'collection.json': 0, 'entity.json': 1}
+    return sorted(paths, key=lambda path: ranks.get(os.path.basename(path), 2))
+
+def _scan_publishable(paths, ancestors=[], force=False, metrics=None):
+    """Parses each metadata file once and decides whether it is publishable.
+    
+    Replaces _parents_status + _publishable, which between them (and the
+    eventual object load) read each collection and entity file several
+    times. Paths must be ordered parents-first (see _parents_first).
+    
+    @param paths: list of absolute paths to metadata files, parents first
+    @param ancestors: list Parents of paths, read for status but not yielded
+    @param force: boolean Just publish the damn collection already.
+    @param metrics: PublishMetrics (optional)
+    @returns: generator of dicts: path, identifier, data, action, note
+    
+    Files that can't be read, parsed, or identified are yielded with
+    action 'ERROR' (and data None) so the rest can still be published.
+    """
+    if not metrics:
+        metrics = PublishMetrics()
+    parents = {}
+    
+    def status(identifier, data):
+        # store values of public,status for a collection or entity
+        if os.path.basename(identifier.path_abs('json')) in ['collection.json', 'entity.json']:
+            p = {'public':None, 'status':None,}
+            for field in data:
+                fname = field.keys()[0]
+                if fname in p.keys():
+                    p[fname] = field[fname]
+            parents[identifier.id] = p
+    
+    for path in ancestors:
+        try:
+            with open(path, 'r') as f:
+                data = json.loads(f.read())
+            status(Identifier(path=path), data)
+        except Exception as err:
+            logger.error('Could not read %s: %s' % (path, err))
+    
+    for path in paths:
+        identifier = None
+        try:
+            started = time.time()
+            identifier = Identifier(path=path)
+            identified = time.time()
+            with open(path, 'r') as f:
+                data = json.loads(f.read())
+            metrics.add('identifier', identified - started)
+            metrics.add('parse', time.time() - identified)
+            status(identifier, data)
+        except Exception as err:
+            yield {
+                'path': path,
+                'identifier': identifier,
+                'data': None,
+                'action': 'ERROR',
+                'note': 'Could not read metadata: %s' % err,
+            }
+            continue
+        action,note = _publish_decision(identifier, parents, force)
+        yield {
+            'path': path,
+            'identifier': identifier,
+            'data': data,
+            'action': action,
+            'note': note,
+        }
+
+def _load_document(path):
+    """Instantiates the object for a path dict, reusing already-parsed data.
+    
+    @param path: dict from _scan_publishable()
+    @returns: Collection, Entity, File
+    """
+    oi = path['identifier']
+    data = path.pop('data', None)
+    if data is not None:
+        return oi.object_class().from_json(path['path'], identifier=oi, json_data=data)
+    return oi.object()
+
 def _has_access_file( identifier ):
     """Determines whether the path has a corresponding access file.
     
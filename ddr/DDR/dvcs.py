@@ -9,7 +9,6 @@ import socket
 
 from dateutil import parser
 import envoy
-import git
 import requests
 import simplejson as json
 
@@ -22,6 +21,7 @@ def repository(path, user_name=None, user_mail=None):
     @param collection_path: Absolute path to collection repo.
     @return: GitPython repo object
     """
+    import git  # GitPython, slow to import
     repo = git.Repo(path, search_parent_directories=True)
     if user_name and user_mail:
         git_set_configs(repo, user_name, user_mail)
@@ -70,6 +70,7 @@ def latest_commit(path):
     
     @param path: Absolute path to repo or file within.
     """
+    import git  # GitPython, slow to import
     repo = git.Repo(path, search_parent_directories=True)
     if os.path.isfile(path):
         return repo.git.log('--pretty=format:%H %d %ad', '--date=iso', '-1', path)
@@ -99,6 +100,7 @@ def earliest_commit(path, parsed=False):
         fmt = '{"commit":"%H","branch":"%d","ts":"%ad"}'
     else:
         fmt = "%H %d %ad"
+    import git  # GitPython, slow to import
     repo = git.Repo(path, search_parent_directories=True)
     if os.path.isfile(path):
         text = repo.git.log('--pretty=format:%s' % fmt, '--date=iso', path).splitlines()[-1]
@@ -244,6 +246,38 @@ def list_committed(repo, commit):
     entry = repo.git.log('-1', '--stat', commit.hexsha)
     return _parse_list_committed(entry)
 
+def _parse_diff_name_status( diff ):
+    """Parses output of "git diff --name-status".
+    
+    @param diff: str
+    @returns: list of (status, path) tuples
+    """
+    changes = []
+    for line in diff.strip().split('\n'):
+        if line.strip():
+            status,path = line.split('\t')[:2]
+            changes.append( (status.strip()[0], path.strip()) )
+    return changes
+
+def list_changed_since(repo, commit):
+    """Returns list of files changed since the specified commit
+    
+    Compares the working tree to the commit so uncommitted modifications
+    are included.  Untracked files are listed as added.  Renames are
+    listed as a delete plus an add.
+    
+    @param repo: A Gitpython Repo object
+    @param commit: str Commit hash
+    @return: list of (status, path) tuples; status is 'A', 'M', or 'D'.
+    """
+    stdout = repo.git.diff('--name-status', '--no-renames', commit)
+    changes = _parse_diff_name_status(stdout)
+    untracked = repo.git.ls_files('--others', '--exclude-standard')
+    for path in untracked.strip().split('\n'):
+        if path.strip():
+            changes.append( ('A', path.strip()) )
+    return changes
+
 def _parse_list_conflicted( ls_unmerged ):
     files = []
     for line in ls_unmerged.strip().split('\n'):
@@ -680,6 +714,7 @@ def is_clone(path1, path2, n=5):
     @returns 1 (is a clone), 0 (not a clone), or -1 (unknown)
     """
     if is_local(path2):
+        import git  # GitPython, slow to import
         def get(path):
             try:
                 repo = git.Repo(path, search_parent_directories=True)
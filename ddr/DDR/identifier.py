@@ -5,6 +5,7 @@ import importlib
 import os
 import re
 import string
+import threading
 from urlparse import urlparse
 
 
@@ -413,24 +414,234 @@ class Definitions():
         }
 
 
+# Python 2.7 sre can't compile regexes with more than 100 groups
+PATTERN_MATCHER_MAX_GROUPS = 99
+
+class PatternMatcher(object):
+    """Matches text against a list of (regex, memo, model) patterns at once.
+    
+    Looping through a patterns list means a failed match for most of the
+    models before the right one is found (e.g. file paths are tried
+    against the repository, organization, collection, ... patterns first).
+    PatternMatcher joins the patterns into a single alternation regex
+    (as few as the sre group limit allows), so classifying a string is
+    usually one match.  Alternatives are tried in list order so the
+    result is the same as for the patterns list.
+    
+    Named groups can't appear more than once in a regex, so in the
+    combined regex they are made into plain groups and the groupdict
+    is rebuilt from group numbers.  Patterns with backreferences or
+    flags are matched separately.
+    
+    >>> m = PatternMatcher(PATH_PATTERNS)
+    >>> m.match('/var/www/media/ddr/ddr-test-123/collection.json')
+    ('collection', '', {'repo': 'ddr', 'org': 'test', 'cid': '123', ...})
+    """
+    
+    def __init__(self, patterns, max_groups=PATTERN_MATCHER_MAX_GROUPS):
+        """
+        @param patterns: list of (regex, memo, model) tuples
+        @param max_groups: int Max number of groups per combined regex
+        """
+        self.patterns = patterns
+        self.chunks = []
+        chunk = []
+        ngroups = 0
+        for tpl in patterns:
+            regex = tpl[0]
+            if isinstance(regex, basestring):
+                regex = re.compile(regex)
+            if not self._combinable(regex):
+                if chunk:
+                    self.chunks.append(self._combine(chunk))
+                    chunk = []; ngroups = 0
+                self.chunks.append(self._single(regex, tpl))
+                continue
+            if chunk and (ngroups + regex.groups + 1 > max_groups):
+                self.chunks.append(self._combine(chunk))
+                chunk = []; ngroups = 0
+            chunk.append((regex, tpl))
+            ngroups += regex.groups + 1
+        if chunk:
+            self.chunks.append(self._combine(chunk))
+    
+    def __repr__(self):
+        return "<%s.%s %s patterns, %s regexes>" % (
+            self.__module__, self.__class__.__name__,
+            len(self.patterns), len(self.chunks)
+        )
+    
+    @staticmethod
+    def _combinable(regex):
+        return not (
+            (regex.flags & ~re.UNICODE)
+            or ('(?P=' in regex.pattern)
+            or re.search(r'\\[1-9]', regex.pattern)
+        )
+    
+    @staticmethod
+    def _fields(regex, offset):
+        """List of (name, index) for named groups, shifted by offset.
+        """
+        return sorted(
+            [(name, index + offset) for name,index in regex.groupindex.iteritems()],
+            key=lambda x: x[1]
+        )
+    
+    @staticmethod
+    def _single(regex, tpl):
+        # (regex, {lastindex: (memo, model, fields)})
+        return (regex, {None: (tpl[1], tpl[2], PatternMatcher._fields(regex, 0))})
+    
+    @staticmethod
+    def _combine(chunk):
+        if len(chunk) == 1:
+            return PatternMatcher._single(*chunk[0])
+        alternatives = []
+        entries = {}
+        offset = 0
+        for regex,tpl in chunk:
+            # wrapping group, closed after all the pattern's own groups,
+            # so it is match.lastindex if this alternative matched
+            wrapper = offset + 1
+            entries[wrapper] = (tpl[1], tpl[2], PatternMatcher._fields(regex, wrapper))
+            alternatives.append(
+                '(%s)' % re.sub(r'\(\?P<\w+>', '(', regex.pattern)
+            )
+            offset = wrapper + regex.groups
+        return (re.compile('|'.join(alternatives)), entries)
+    
+    def match(self, text):
+        """Split ID, path, or URL into model and tokens
+        
+        @param text: str
+        @returns: (model, memo, groupdict) or (None, None, None)
+        """
+        for regex,entries in self.chunks:
+            m = regex.match(text)
+            if m:
+                if None in entries:
+                    memo,model,fields = entries[None]
+                else:
+                    memo,model,fields = entries[m.lastindex]
+                groups = m.groups()
+                return model,memo,{
+                    name: groups[index - 1] for name,index in fields
+                }
+        return None,None,None
+
+
+class Lazy(object):
+    """Dict or list that is made the first time it is used.
+    
+    Some definitions require importing all the repo_models modules or
+    repo_models.elastic (and thus elasticsearch_dsl), which makes
+    importing DDR.identifier slow.  Most scripts never use them.
+    Lazy wraps a function that returns the real value, calls it on first
+    use, and passes indexing, iteration, and attribute access through.
+    
+    >>> MODULES = Lazy(lambda: Definitions.import_modules(...))
+    >>> MODULES['collection']
+    <module 'repo_models.collection' ...>
+    
+    Use Lazy.value() if you need the real object (e.g. isinstance).
+    """
+    
+    def __init__(self, function):
+        self._function = function
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+    
+    def __repr__(self):
+        if self._loaded:
+            return repr(self._value)
+        return "<%s.%s %s (not loaded)>" % (
+            self.__module__, self.__class__.__name__, self._function.__name__
+        )
+    
+    def value(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._function()
+                    self._loaded = True
+        return self._value
+    
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.value(), name)
+    
+    def __getitem__(self, key):
+        return self.value()[key]
+    
+    def __iter__(self):
+        return iter(self.value())
+    
+    def __len__(self):
+        return len(self.value())
+    
+    def __contains__(self, item):
+        return item in self.value()
+    
+    def __nonzero__(self):
+        return bool(self.value())
+    
+    def __eq__(self, other):
+        if isinstance(other, Lazy):
+            other = other.value()
+        return self.value() == other
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+def _elastic_definitions(name):
+    try:
+        module = importlib.import_module('repo_models.elastic')
+    except ImportError:
+        raise Exception(
+            'Could not import Elasticsearch definitions! ' \
+            'May indicate problem in definitions module or dependency (e.g. elasticsearch_dsl).'
+        )
+    return getattr(module, name)
+
+def _elasticsearch_classes():
+    return _elastic_definitions('ELASTICSEARCH_CLASSES')
+
+def _elasticsearch_list_fields():
+    return _elastic_definitions('ELASTICSEARCH_LIST_FIELDS')
+
+def _elasticsearch_classes_by_model():
+    return {
+        dt['doctype']: dt['class']
+        for dt in ELASTICSEARCH_CLASSES['all']
+    }
+
+def _modules():
+    return Definitions.import_modules(IDENTIFIERS, Definitions.modules(IDENTIFIERS))
+
+def _model_repo_models():
+    return Definitions.models_modules(MODULES)
+
+
 try:
     from repo_models.identifier import IDENTIFIERS
-    from repo_models.elastic import ELASTICSEARCH_CLASSES
-    from repo_models.elastic import ELASTICSEARCH_LIST_FIELDS
 except ImportError:
     raise Exception(
         'Could not import Identifier definitions! ' \
         'May indicate problem in definitions module or dependency (e.g. lxml).'
     )
 
+# These import repo_models modules and/or elasticsearch_dsl, so wait until used
+ELASTICSEARCH_CLASSES = Lazy(_elasticsearch_classes)
+ELASTICSEARCH_LIST_FIELDS = Lazy(_elasticsearch_list_fields)
+ELASTICSEARCH_CLASSES_BY_MODEL = Lazy(_elasticsearch_classes_by_model)
+MODULES = Lazy(_modules)
+MODEL_REPO_MODELS = Lazy(_model_repo_models)
+
 MODELS = Definitions.models(IDENTIFIERS)
-MODULES = Definitions.import_modules(IDENTIFIERS, Definitions.modules(IDENTIFIERS))
 MODEL_CLASSES = Definitions.model_classes(IDENTIFIERS)
-ELASTICSEARCH_CLASSES_BY_MODEL = {
-    dt['doctype']: dt['class']
-    for dt in ELASTICSEARCH_CLASSES['all']
-}
-MODEL_REPO_MODELS = Definitions.models_modules(MODULES)
 COLLECTION_MODELS = Definitions.collection_models(IDENTIFIERS)
 CONTAINERS = Definitions.containers(IDENTIFIERS)
 PARENTS = Definitions.models_parents(IDENTIFIERS)
@@ -457,6 +668,9 @@ MODELS_IDPARTS = Definitions.models_idparts(IDENTIFIERS)
 ID_PATTERNS = Definitions.id_patterns(IDENTIFIERS)
 PATH_PATTERNS = Definitions.path_patterns(IDENTIFIERS)
 URL_PATTERNS = Definitions.url_patterns(IDENTIFIERS)
+ID_MATCHER = PatternMatcher(ID_PATTERNS)
+PATH_MATCHER = PatternMatcher(PATH_PATTERNS)
+URL_MATCHER = PatternMatcher(URL_PATTERNS)
 ID_TEMPLATES = Definitions.id_templates(IDENTIFIERS)
 PATH_TEMPLATES = Definitions.path_templates(IDENTIFIERS)
 URL_TEMPLATES = Definitions.url_templates(IDENTIFIERS)
@@ -499,9 +713,11 @@ def identify_object(text, patterns):
     
     @param i: Identifier object
     @param text: str Text string to look for
-    @param patterns: list Patterns in which to look
+    @param patterns: PatternMatcher, or list Patterns in which to look
     @returns: dict groupdict resulting from successful regex match
     """
+    if isinstance(patterns, PatternMatcher):
+        return patterns.match(text)
     model = None
     memo = None
     groupdict = None
@@ -534,6 +750,130 @@ def identify_filepath(path):
     elif 'transcript' in path: ftype = 'transcript'
     return ftype
 
+# Shared tuples of IdParts keys; see IdParts.__init__
+IDPARTS_KEYS = {}
+
+class IdParts(object):
+    """Read-only ordered mapping of ID components, e.g. Identifier.parts
+    
+    Stores keys and values as tuples instead of an OrderedDict, which
+    keeps a dict plus a linked list of entries per instance.  Identifiers
+    of the same model have the same keys so the keys tuple is shared.
+    
+    >>> parts = IdParts([('repo','ddr'), ('org','test'), ('cid',123)])
+    >>> parts['cid']
+    123
+    >>> parts.items()
+    [('repo', 'ddr'), ('org', 'test'), ('cid', 123)]
+    >>> parts == OrderedDict([('repo','ddr'), ('org','test'), ('cid',123)])
+    True
+    
+    Use OrderedDict(parts) to get a modifiable copy.
+    """
+    __slots__ = ('_keys', '_values')
+    
+    def __init__(self, items=[]):
+        """
+        @param items: list of (key, value) tuples, or a dict/IdParts
+        """
+        if hasattr(items, 'items'):
+            items = items.items()
+        items = list(items)
+        keys = tuple([key for key,val in items])
+        object.__setattr__(self, '_keys', IDPARTS_KEYS.setdefault(keys, keys))
+        object.__setattr__(self, '_values', tuple([val for key,val in items]))
+    
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, self.items())
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is read-only" % self.__class__.__name__)
+    
+    def __reduce__(self):
+        return (self.__class__, (self.items(),))
+    
+    def __getitem__(self, key):
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        raise TypeError("%s is read-only" % self.__class__.__name__)
+    
+    def __delitem__(self, key):
+        raise TypeError("%s is read-only" % self.__class__.__name__)
+    
+    def __contains__(self, key):
+        return key in self._keys
+    
+    def __iter__(self):
+        return iter(self._keys)
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def __eq__(self, other):
+        if isinstance(other, IdParts):
+            return (self._keys == other._keys) and (self._values == other._values)
+        if isinstance(other, OrderedDict):
+            return self.items() == other.items()
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+    
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+    
+    def __hash__(self):
+        return hash((self._keys, self._values))
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def keys(self):
+        return list(self._keys)
+    
+    def values(self):
+        return list(self._values)
+    
+    def items(self):
+        return zip(self._keys, self._values)
+    
+    def iterkeys(self):
+        return iter(self._keys)
+    
+    def itervalues(self):
+        return iter(self._values)
+    
+    def iteritems(self):
+        return iter(self.items())
+
+# Normalized base paths, shared by all Identifiers; see normalize_basepath
+BASEPATHS = {}
+
+def normalize_basepath(path):
+    """os.path.normpath for base paths, computed once per distinct path.
+    
+    Most Identifiers share one of a few base paths so the normalized
+    string is kept and the same str object is used for all of them.
+    
+    @param path: str
+    @returns: str
+    """
+    try:
+        return BASEPATHS[path]
+    except KeyError:
+        normalized = os.path.normpath(path)
+        BASEPATHS[path] = BASEPATHS.setdefault(normalized, normalized)
+        return BASEPATHS[path]
+
 def set_idparts(i, groupdict, components=ID_COMPONENTS, types=COMPONENT_TYPES):
     """Sets keys,values of groupdict as attributes of identifier.
     
@@ -545,25 +885,110 @@ def set_idparts(i, groupdict, components=ID_COMPONENTS, types=COMPONENT_TYPES):
     @param components: list [optional]
     @param types: dict
     """
-    i.basepath = groupdict.get('basepath', None)
-    if i.basepath:
-        i.basepath = os.path.normpath(i.basepath)
-    # list of object ID components
-    id_components = [
-        (key, groupdict[key])
+    basepath = groupdict.get('basepath', None)
+    if basepath:
+        basepath = normalize_basepath(basepath)
+    i.basepath = basepath
+    # list of object ID components, set to their assigned type
+    i.parts = IdParts([
+        (key, types[key](groupdict[key]))
         for key in components
         if groupdict.get(key)
-    ]
-    i.parts = OrderedDict(id_components)
-    id_components.insert(0, ('model',i.model))
-    i.idparts = OrderedDict(id_components)
-    # set ID parts to their assigned type
-    for key,val in i.parts.items():
-        i.parts[key] = types[key](val)
+    ])
 
 class IdentifierFormatException(Exception):
     pass
 
+class TemplateFormatter(object):
+    """Formats the first of a list of templates for which all fields are present.
+    
+    Template fields are parsed once.  The template to use depends only on
+    which ID components are present, so the choice is remembered for each
+    set of keys (Identifiers of a model share the same IdParts keys) and
+    later calls make a single str.format call without trying templates
+    and catching KeyErrors.
+    
+    >>> f = TemplateFormatter(['{repo}-{org}-{cid}-{eid}', '{repo}-{org}-{cid}'])
+    >>> f.format(IdParts([('repo','ddr'), ('org','test'), ('cid',123)]))
+    'ddr-test-123'
+    """
+    
+    def __init__(self, templates):
+        """
+        @param templates: list of str templates, in order of preference
+        """
+        if isinstance(templates, basestring):
+            templates = [templates]
+        self.templates = [
+            (
+                template,
+                frozenset([
+                    re.split(r'[.\[]', name)[0]
+                    for name in _field_names(template)
+                    if name is not None
+                ])
+            )
+            for template in templates
+        ]
+        self.chosen = {}
+    
+    def __repr__(self):
+        return "<%s.%s %s>" % (
+            self.__module__, self.__class__.__name__,
+            [template for template,fields in self.templates]
+        )
+    
+    def template(self, keys):
+        """First template whose fields are all in keys.
+        
+        @param keys: tuple of field names
+        @returns: str template or None
+        """
+        try:
+            return self.chosen[keys]
+        except KeyError:
+            pass
+        available = set(keys)
+        chosen = None
+        for template,fields in self.templates:
+            if fields.issubset(available):
+                chosen = template
+                break
+        self.chosen[keys] = chosen
+        return chosen
+    
+    def format(self, parts, **kwargs):
+        """
+        @param parts: IdParts or dict of ID components
+        @param kwargs: Additional fields e.g. basepath
+        @returns: str or None if no template fits
+        """
+        if isinstance(parts, IdParts):
+            keys = parts._keys
+        else:
+            keys = tuple(parts.keys())
+        if kwargs:
+            keys = keys + tuple(sorted(kwargs.keys()))
+        template = self.template(keys)
+        if template is None:
+            return None
+        if kwargs:
+            fields = dict(parts.items())
+            fields.update(kwargs)
+            return template.format(**fields)
+        return template.format(**parts)
+
+def _formatters(templates):
+    """Makes a TemplateFormatter for each list of templates in a (nested) dict.
+    
+    @param templates: dict e.g. ID_TEMPLATES, PATH_TEMPLATES, URL_TEMPLATES
+    @returns: dict with same keys
+    """
+    return {
+        key: _formatters(val) if isinstance(val, dict) else TemplateFormatter(val)
+        for key,val in templates.iteritems()
+    }
+
 def format_id(i, model, templates=ID_TEMPLATES):
     """Format ID for the requested model using ID_TEMPLATES.
     
@@ -574,13 +999,15 @@ def format_id(i, model, templates=ID_TEMPLATES):
     @param templates: [optional] dict of str templates keyed to models
     @returns: str
     """
-    for template in templates[model]:
-        # first one that works is the ID (probably)
-        try:
-            return template.format(**i.parts)
-        except KeyError:
-            pass
-    raise IdentifierFormatException('Could not format ID for %s' % i.parts)
+    if templates is ID_TEMPLATES:
+        formatter = ID_FORMATTERS[model]
+    else:
+        formatter = TemplateFormatter(templates[model])
+    # first one that works is the ID (probably)
+    text = formatter.format(i.parts)
+    if text is None:
+        raise IdentifierFormatException('Could not format ID for %s' % i.parts)
+    return text
 
 def format_path(i, model, path_type, templates=PATH_TEMPLATES):
     """Format absolute or relative path using PATH_TEMPLATES.
@@ -594,15 +1021,15 @@ def format_path(i, model, path_type, templates=PATH_TEMPLATES):
     if path_type and (path_type == 'abs') and (not i.basepath):
         raise MissingBasepathException('%s basepath not set.'% i)
     key = '-'.join([model, path_type])
-    for template in templates[key]:
-        kwargs = {key: val for key,val in i.parts.items()}
-        kwargs['basepath'] = i.basepath
-        # TODO put in try/except, first one that works is the path
-        try:
-            return template.format(**kwargs)
-        except KeyError:
-            pass
-    raise IdentifierFormatException('Could not format path for %s' % i.parts)
+    if templates is PATH_TEMPLATES:
+        formatter = PATH_FORMATTERS[key]
+    else:
+        formatter = TemplateFormatter(templates[key])
+    # first one that works is the path
+    path = formatter.format(i.parts, basepath=i.basepath)
+    if path is None:
+        raise IdentifierFormatException('Could not format path for %s' % i.parts)
+    return path
 
 def format_url(i, model, url_type, templates=URL_TEMPLATES):
     """Format URL using URL_TEMPLATES.
@@ -613,13 +1040,15 @@ def format_url(i, model, url_type, templates=URL_TEMPLATES):
     @param templates: [optional] dict of str templates keyed to models
     @returns: str
     """
-    for template in templates[url_type][model]:
-        # TODO put in try/except, first one that works is the URL
-        try:
-            return template.format(**i.parts)
-        except KeyError:
-            pass
-    raise IdentifierFormatException('Could not format URL for %s' % i.parts)
+    if templates is URL_TEMPLATES:
+        formatter = URL_FORMATTERS[url_type][model]
+    else:
+        formatter = TemplateFormatter(templates[url_type][model])
+    # first one that works is the URL
+    url = formatter.format(i.parts)
+    if url is None:
+        raise IdentifierFormatException('Could not format URL for %s' % i.parts)
+    return url
 
 def matches_pattern(text, patterns):
     """True if text matches one of patterns
@@ -627,16 +1056,14 @@ def matches_pattern(text, patterns):
     Used for telling what kind of pattern (id, path, url) an arg is.
     
     @param text: str
+    @param patterns: PatternMatcher, or list Patterns in which to look
     @returns: dict of idparts including model
     """
-    for tpl in patterns:
-        pattern = tpl[0]
-        model = tpl[-1]
-        m = re.match(pattern, text)
-        if m:
-            idparts = {k:v for k,v in m.groupdict().iteritems()}
-            idparts['model'] = model
-            return idparts
+    model,memo,groupdict = identify_object(text, patterns)
+    if model:
+        idparts = {k:v for k,v in groupdict.iteritems()}
+        idparts['model'] = model
+        return idparts
     return {}
 
 def _is_id(text):
@@ -644,21 +1071,21 @@ def _is_id(text):
     @param text: str
     @returns: dict of idparts including model
     """
-    return matches_pattern(text, ID_PATTERNS)
+    return matches_pattern(text, ID_MATCHER)
 
 def _is_path(text):
     """
     @param text: str
     @returns: dict of idparts including model
     """
-    return matches_pattern(text, PATH_PATTERNS)
+    return matches_pattern(text, PATH_MATCHER)
 
 def _is_url(text):
     """
     @param text: str
     @returns: dict of idparts including model
     """
-    return matches_pattern(text, URL_PATTERNS)
+    return matches_pattern(text, URL_MATCHER)
 
 def _is_abspath(text):
     if isinstance(text, basestring) and os.path.isabs(text):
@@ -718,6 +1145,10 @@ def _field_names(template):
     """
     return [v[1] for v in string.Formatter().parse(template)]
 
+ID_FORMATTERS = _formatters(ID_TEMPLATES)
+PATH_FORMATTERS = _formatters(PATH_TEMPLATES)
+URL_FORMATTERS = _formatters(URL_TEMPLATES)
+
 def first_id(model, i):
     """Returns first child Identifier in series
     
@@ -761,7 +1192,7 @@ def max_id(model, identifiers):
     # construct new Identifier with max_component
     # seems better to pick the matching one from identifiers list
     # but currently no way to make ID from parts outside of constructor
-    parts = identifiers[0].idparts
+    parts = OrderedDict(identifiers[0].idparts)
     parts[component] = max_component
     return Identifier(parts=parts)
 
@@ -844,13 +1275,143 @@ KWARG_KEYS = [
     'base_path',
 ]
 
+# Max number of Identifiers kept in IDENTIFIER_CACHE
+IDENTIFIER_CACHE_SIZE = 10000
+
+class IdentifierCache(object):
+    """LRU cache of Identifier instances, with hit/miss stats.
+    
+    >>> IDENTIFIER_CACHE.stats()
+    {'hits': 12, 'misses': 3, 'size': 3, 'maxsize': 10000}
+    """
+    
+    def __init__(self, maxsize=IDENTIFIER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def __repr__(self):
+        return "<%s.%s %s/%s>" % (
+            self.__module__, self.__class__.__name__, len(self.data), self.maxsize
+        )
+    
+    def get(self, key):
+        """Returns cached Identifier (marking it most-recently used) or None.
+        """
+        with self.lock:
+            try:
+                value = self.data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self.data[key] = value
+            self.hits += 1
+            return value
+    
+    def set(self, key, value):
+        """Adds Identifier, removing least-recently used if full.
+        """
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = value
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+    
+    def clear(self):
+        with self.lock:
+            self.data = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self):
+        """
+        @returns: dict hits, misses, size, maxsize
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+        }
+
+IDENTIFIER_CACHE = IdentifierCache()
+
+def _cache_key(cls, args, kwargs):
+    """IDENTIFIER_CACHE key for Identifier constructor args.
+    
+    Key is the class plus each method (positional arg or keyword) and its
+    raw input, including base_path.  Dicts of parts are turned into sorted
+    tuples.
+    
+    @param cls: Identifier or subclass
+    @param args: list
+    @param kwargs: dict
+    @returns: tuple or None if args are not hashable
+    """
+    def hashable(value):
+        if isinstance(value, dict):
+            return tuple(sorted(value.items()))
+        return value
+    key = (
+        cls,
+        tuple([hashable(arg) for arg in args]),
+        tuple(sorted([(k, hashable(v)) for k,v in kwargs.iteritems()])),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+class InternedIdentifier(type):
+    """Metaclass that makes Identifiers shared, immutable instances.
+    
+    Identifiers are made over and over for the same IDs and paths, and
+    parsing the input with identify_object is slow.  Instances are kept in
+    IDENTIFIER_CACHE keyed by their constructor args and the cached
+    instance is returned for the same args.  Since they are shared,
+    cached Identifiers can't be modified.
+    
+    Classes can opt out by setting interned = False.
+    """
+    
+    def __call__(cls, *args, **kwargs):
+        if not cls.interned:
+            return type.__call__(cls, *args, **kwargs)
+        key = _cache_key(cls, args, kwargs)
+        if key is None:
+            return type.__call__(cls, *args, **kwargs)
+        i = IDENTIFIER_CACHE.get(key)
+        if i is None:
+            i = type.__call__(cls, *args, **kwargs)
+            object.__setattr__(i, '_frozen', True)
+            IDENTIFIER_CACHE.set(key, i)
+        return i
+
 class Identifier(object):
-    raw = None
-    method = None
-    model = None
-    parts = OrderedDict()
-    basepath = None
-    id = None
+    """Object ID, path, URL, and ID components
+    
+    Identifiers are held for every object in a collection (e.g. when
+    publishing or importing), so attributes are kept in __slots__
+    and parts is a tuple-backed IdParts rather than an OrderedDict.
+    Subclasses that don't declare __slots__ get a __dict__ as usual.
+    
+    Parent, lineage, and collection ID are computed the first time they
+    are requested and kept in CACHED_SLOTS; see Identifier._cached.
+    """
+    __metaclass__ = InternedIdentifier
+    __slots__ = (
+        'raw', 'method', 'model', 'parts', 'basepath', 'id', '_frozen',
+        '_parent', '_parent_stubs', '_lineage', '_lineage_stubs', '_collection_id',
+        '_paths_abs',
+    )
+    CACHED_SLOTS = (
+        '_parent', '_parent_stubs', '_lineage', '_lineage_stubs', '_collection_id',
+        '_paths_abs',
+    )
+    interned = True
     
     @staticmethod
     def wellformed(idtype, text, models=MODELS):
@@ -889,6 +1450,9 @@ class Identifier(object):
         """
         NOTE: You will get faster performance with kwargs
         """
+        for name in Identifier.__slots__:
+            object.__setattr__(self, name, None)
+        object.__setattr__(self, '_frozen', False)
         blargs = _parse_args_kwargs(KWARG_KEYS, args, kwargs)
         if blargs['id']: self._from_id(blargs['id'], blargs['base_path'])
         elif blargs['parts']: self._from_idparts(blargs['parts'], blargs['base_path'])
@@ -910,11 +1474,11 @@ class Identifier(object):
         if base_path and not os.path.isabs(base_path):
             raise BadPathException('Base path is not absolute: %s' % base_path)
         if base_path:
-            base_path = os.path.normpath(base_path)
+            base_path = normalize_basepath(base_path)
         self.method = 'id'
         self.raw = object_id
         self.id = object_id
-        model,memo,groupdict = identify_object(object_id, ID_PATTERNS)
+        model,memo,groupdict = identify_object(object_id, ID_MATCHER)
         if not groupdict:
             raise MalformedIDException('Malformed ID: "%s"' % object_id)
         self.model = model
@@ -936,18 +1500,15 @@ class Identifier(object):
         if base_path and not os.path.isabs(base_path):
             raise BadPathException('Base path is not absolute: %s' % base_path)
         if base_path:
-            base_path = os.path.normpath(base_path)
+            base_path = normalize_basepath(base_path)
         self.method = 'parts'
         self.raw = idparts
         self.model = idparts['model']
-        id_components = [
+        self.parts = IdParts([
             (key, idparts[key])
             for key in ID_COMPONENTS
             if idparts.get(key)
-        ]
-        self.parts = OrderedDict(id_components)
-        id_components.insert(0, ('model', self.model))
-        self.idparts = OrderedDict(id_components)
+        ])
         self.id = format_id(self, self.model)
         if base_path and not self.basepath:
             self.basepath = base_path
@@ -967,10 +1528,10 @@ class Identifier(object):
         if not os.path.isabs(path_abs):
             raise BadPathException('Path is not absolute: %s' % path_abs)
         if base_path:
-            base_path = os.path.normpath(base_path)
+            base_path = normalize_basepath(base_path)
         self.method = 'path'
         self.raw = path_abs
-        model,memo,groupdict = identify_object(path_abs, PATH_PATTERNS)
+        model,memo,groupdict = identify_object(path_abs, PATH_MATCHER)
         if not groupdict:
             raise MalformedPathException('Malformed path: "%s"' % path_abs)
         self.model = model
@@ -996,12 +1557,12 @@ class Identifier(object):
         if base_path and not os.path.isabs(base_path):
             raise BadPathException('Base path is not absolute: %s' % base_path)
         if base_path:
-            base_path = os.path.normpath(base_path)
+            base_path = normalize_basepath(base_path)
         self.method = 'url'
         self.raw = url
         urlpath = urlparse(url).path  # ignore domain and queries
         urlpath = os.path.normpath(urlpath)
-        model,memo,groupdict = identify_object(urlpath, URL_PATTERNS)
+        model,memo,groupdict = identify_object(urlpath, URL_MATCHER)
         if not groupdict:
             raise MalformedURLException('Malformed URL: "%s"' % url)
         self.model = model
@@ -1013,6 +1574,55 @@ class Identifier(object):
     def __repr__(self):
         return "<%s.%s %s:%s>" % (self.__module__, self.__class__.__name__, self.model, self.id)
     
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(
+                "Identifiers are shared and can't be modified (%s.%s)" % (self.id, name)
+            )
+        object.__setattr__(self, name, value)
+    
+    def __getstate__(self):
+        state = {
+            name: getattr(self, name)
+            for name in Identifier.__slots__
+            if name not in Identifier.CACHED_SLOTS
+        }
+        state.update(getattr(self, '__dict__', {}))
+        return state
+    
+    def __setstate__(self, state):
+        for name in Identifier.CACHED_SLOTS:
+            object.__setattr__(self, name, None)
+        for name,value in state.iteritems():
+            object.__setattr__(self, name, value)
+    
+    def _cached(self, name, function, *args):
+        """Returns function(*args), computing it only the first time.
+        
+        Value is kept in slot as a 1-tuple (None means not computed yet)
+        so that None results are cached too.  Works on frozen Identifiers.
+        
+        @param name: str Name of slot in CACHED_SLOTS
+        @param function: function
+        @returns: Result of function
+        """
+        cached = getattr(self, name)
+        if cached is None:
+            cached = (function(*args),)
+            object.__setattr__(self, name, cached)
+        return cached[0]
+    
+    @property
+    def idparts(self):
+        """Model and ID components
+        
+        @returns: OrderedDict (a new copy each time)
+        """
+        idparts = OrderedDict([('model', self.model)])
+        for key,val in self.parts.iteritems():
+            idparts[key] = val
+        return idparts
+    
     def _key(self):
         """Key for Pythonic object sorting.
         Integer components are returned as ints, enabling natural sorting.
@@ -1076,7 +1686,7 @@ class Identifier(object):
         """
         if not self.model in COLLECTION_MODELS:
             raise Exception('%s objects do not have collection IDs' % self.model.capitalize())
-        return format_id(self, 'collection')
+        return self._cached('_collection_id', format_id, self, 'collection')
     
     def collection_path(self):
         """Absolute path of the collection to which the Identifier belongs, if any.
@@ -1130,6 +1740,11 @@ class Identifier(object):
         
         @param stub: boolean An archival object not just a Stub
         """
+        if stubs:
+            return self._cached('_parent_stubs', self._find_parent, stubs)
+        return self._cached('_parent', self._find_parent, stubs)
+    
+    def _find_parent(self, stubs=False):
         parent_parts = self._parent_parts()
         for model in self._parent_models(stubs):
             idparts = parent_parts
@@ -1145,12 +1760,17 @@ class Identifier(object):
         
         @param stubs: boolean Whether or not to include Stub objects.
         """
+        if stubs:
+            return list(self._cached('_lineage_stubs', self._find_lineage, stubs))
+        return list(self._cached('_lineage', self._find_lineage, stubs))
+    
+    def _find_lineage(self, stubs=False):
         i = self
         identifiers = [i]
         while(i.parent(stubs=stubs)):
             i = i.parent(stubs=stubs)
             identifiers.append(i)
-        return identifiers
+        return tuple(identifiers)
     
     def child_models(self, stubs=False):
         if stubs:
@@ -1178,9 +1798,24 @@ class Identifier(object):
     def path_abs(self, append=None):
         """Return absolute path to object with optional file appended.
         
+        Paths are remembered for each value of append.
+        
         @param append: str File descriptor. Must be present in ADDITIONAL_PATHS!
         @returns: str
         """
+        paths = self._paths_abs
+        if paths is None:
+            paths = {}
+            object.__setattr__(self, '_paths_abs', paths)
+        try:
+            return paths[append]
+        except KeyError:
+            pass
+        path = self._path_abs(append)
+        paths[append] = path
+        return path
+    
+    def _path_abs(self, append=None):
         if not self.basepath:
             raise MissingBasepathException('%s basepath not set.'% self)
         path = format_path(self, self.model, 'abs')
@@ -1229,3 +1864,52 @@ class Identifier(object):
         @returns: str
         """
         return format_url(self, self.model, url_type)
+
+
+def parse_many(paths_or_ids, base_path=None, by_model=True):
+    """Makes Identifiers for a list of paths and/or IDs, grouped by model.
+    
+    Unlike Identifier(text), which tests each text against the ID, URL,
+    and path patterns before parsing it, absolute paths are parsed only
+    as paths and everything else as IDs (or URLs if not an ID), so each
+    text is matched once.  base_path is checked and normalized once for
+    the whole list.  Identifiers come from/go into IDENTIFIER_CACHE.
+    
+    >>> identifier.parse_many(util.find_meta_files('/var/www/media/ddr/ddr-test-123'))
+    OrderedDict([
+        ('collection', [<Identifier collection:ddr-test-123>]),
+        ('entity', [<Identifier entity:ddr-test-123-1>, ...]),
+        ('file', [<Identifier file:ddr-test-123-1-master-a1b2c3d4e5>, ...]),
+    ])
+    
+    @param paths_or_ids: list of absolute paths, IDs, or URLs
+    @param base_path: str Absolute path to Store's parent dir
+    @param by_model: boolean If False, return list in same order as paths_or_ids
+    @returns: OrderedDict {model: [Identifier, ...]}, in order of appearance
+    """
+    if base_path:
+        if not os.path.isabs(base_path):
+            raise BadPathException('Base path is not absolute: %s' % base_path)
+        base_path = normalize_basepath(base_path)
+    grouped = OrderedDict()
+    identifiers = []
+    for text in paths_or_ids:
+        if os.path.isabs(text):
+            try:
+                i = Identifier(path=text, base_path=base_path)
+            except MalformedPathException:
+                i = Identifier(url=text, base_path=base_path)
+        else:
+            try:
+                i = Identifier(id=text, base_path=base_path)
+            except MalformedIDException:
+                i = Identifier(url=text, base_path=base_path)
+        if not by_model:
+            identifiers.append(i)
+            continue
+        if i.model not in grouped:
+            grouped[i.model] = []
+        grouped[i.model].append(i)
+    if not by_model:
+        return identifiers
+    return grouped
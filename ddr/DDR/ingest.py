@@ -10,7 +10,7 @@ from DDR import config
 from DDR import dvcs
 from DDR import fileio
 from DDR import identifier
-from DDR import imaging
+from DDR import manifest
 from DDR import util
 
 
@@ -158,6 +158,7 @@ def copy_to_workdir(src_path, tmp_path, tmp_path_renamed, log):
         log.crash('File rename failed: %s -> %s' % (tmp_path, tmp_path_renamed))
 
 def make_access_file(src_path, access_dest_path, log):
+    from DDR import imaging  # imports libxmp
     log.ok('| %s' % access_dest_path)
     try:
         data = imaging.thumbnail(
@@ -364,6 +365,7 @@ def add_local_file(entity, src_path, role, data, git_name, git_mail, agent='', l
     md5,sha1,sha256 = checksums(src_path, log)
     
     log.ok('| extracting XMP data')
+    from DDR import imaging  # imports libxmp
     xmp = imaging.extract_xmp(src_path)
     
     log.ok('Identifier')
@@ -475,6 +477,7 @@ def add_local_file(entity, src_path, role, data, git_name, git_mail, agent='', l
     # entity metadata will only be written if everything else was moved
     log.ok('Writing entity.json')
     entity.write_json()
+    manifest.update(file_.collection_path, [file_.json_path, entity.json_path])
     
     log.ok('Staging files')
     git_files = [
@@ -570,6 +573,7 @@ def add_external_file(entity, data, git_name, git_mail, agent='', log_path=None,
     
     log.ok('Writing entity metadata')
     entity.write_json()
+    manifest.update(file_.collection_path, [file_.json_path, entity.json_path])
     
     log.ok('Staging files')
     git_files = [
@@ -0,0 +1,399 @@
+"""
+manifest - per-collection index of metadata files
+
+Listing a collection's metadata files with util.find_meta_files means
+walking the whole directory tree, which for large collections is slow
+and is repeated for every Collection.identifiers() call.  A Manifest
+keeps an index of (path, model, id, mtime, size, git blob sha) for each
+.json file plus the mtime of each directory that was scanned.
+
+Refreshing the index only rescans directories whose mtime has changed
+(i.e. files or subdirectories were added, removed or renamed).  Files
+edited in place do not change their directory's mtime, so each listed
+file is also stat()ed and re-hashed if its mtime or size has changed;
+an unchanged collection costs one stat() per directory and metadata
+file, with no reads.  Objects written by Entity.save, File.save and
+ingest.add_local_file update their entries directly via
+manifest.update().
+
+The manifest is an append-only journal, so updates are cheap.  Each
+line is tab-separated:
+
+    D  reldir   mtime                         directory scanned
+    F  relpath  model  id  mtime  size  sha1  metadata file
+    X  relpath                                file removed
+
+Later lines supersede earlier ones; save() compacts the journal.  The
+manifest is stored in the collection's git directory so it is never
+committed; a .git file (worktree, submodule) is followed to the real git
+directory.  Collections that are not git repositories have no manifest
+file: the Manifest can still be built in memory but is not saved.
+
+EXAMPLE
+
+    from DDR import manifest
+    m = manifest.Manifest('/var/www/media/ddr/ddr-testing-123')
+    m.refresh()
+    m.paths(model='entity')
+    m.identifiers(model='file')
+
+"""
+
+from collections import namedtuple
+import hashlib
+import logging
+logger = logging.getLogger(__name__)
+import os
+import subprocess
+
+from DDR import identifier
+from DDR import util
+
+MANIFEST_FILENAME = '.metadata_manifest'
+MANIFEST_HEADER = '# DDR metadata manifest v1'
+
+Entry = namedtuple('Entry', ['model', 'id', 'mtime', 'size', 'sha1'])
+
+
+def git_dir(collection_path):
+    """Git directory of a repository, following a .git file if present
+    
+    @param collection_path: str Absolute path to collection repository
+    @returns: str Absolute path or None if not a git repository
+    """
+    gitdir = os.path.join(collection_path, '.git')
+    if os.path.isdir(gitdir):
+        return gitdir
+    if os.path.isfile(gitdir):
+        # worktrees and submodules: "gitdir: PATH"
+        with open(gitdir, 'r') as f:
+            line = f.readline().strip()
+        if line.startswith('gitdir:'):
+            gitdir = os.path.normpath(os.path.join(
+                collection_path, line[len('gitdir:'):].strip()
+            ))
+            if os.path.isdir(gitdir):
+                return gitdir
+    return None
+
+def git_blob_sha1(data):
+    """Same hash that git hash-object gives a file's contents
+
+    @param data: str File contents
+    @returns: str
+    """
+    return hashlib.sha1('blob %d\0%s' % (len(data), data)).hexdigest()
+
+
+class Manifest(object):
+    collection_path = None
+    gitdir = None
+    path = None
+    excludes = None
+    dirs = None
+    entries = None
+
+    def __init__(self, collection_path, testing=False):
+        """
+        @param collection_path: str Absolute path to collection repository
+        @param testing: boolean Allow 'tmp' in paths.
+        """
+        self.collection_path = os.path.normpath(collection_path)
+        self.gitdir = git_dir(self.collection_path)
+        # not saved unless there is a git directory to keep it in
+        if self.gitdir:
+            self.path = os.path.join(self.gitdir, MANIFEST_FILENAME)
+        # same as util.find_meta_files
+        self.excludes = ['.git', '*~', MANIFEST_FILENAME]
+        if not testing:
+            self.excludes.append('tmp')
+        self.dirs = {}
+        self.entries = {}
+
+    def __repr__(self):
+        return "<%s.%s '%s' (%s)>" % (
+            self.__module__, self.__class__.__name__,
+            self.collection_path, len(self.entries)
+        )
+
+    def exists(self):
+        return bool(self.path) and os.path.exists(self.path)
+
+    def _abs(self, relpath):
+        if relpath:
+            return os.path.join(self.collection_path, relpath)
+        return self.collection_path
+
+    # reading/writing ---------------------------------------------------
+
+    def load(self):
+        """Replays the manifest journal; returns True if manifest exists.
+
+        Unreadable lines (e.g. from an interrupted write) are skipped;
+        the affected files will be picked up by refresh().
+        """
+        self.dirs = {}
+        self.entries = {}
+        if not self.exists():
+            return False
+        with open(self.path, 'r') as f:
+            for line in f:
+                self._apply(line.rstrip('\n').split('\t'))
+        return True
+
+    def _apply(self, fields):
+        try:
+            if fields[0] == 'F':
+                model,oid,mtime,size,sha1 = fields[2:]
+                self.entries[fields[1]] = Entry(
+                    model, oid, float(mtime), int(size), sha1
+                )
+            elif fields[0] == 'D':
+                self.dirs[fields[1]] = float(fields[2])
+            elif fields[0] == 'X':
+                self.entries.pop(fields[1], None)
+        except (ValueError, IndexError):
+            logger.debug('bad manifest line: %s' % fields)
+
+    def _lines(self, relpaths):
+        for relpath in relpaths:
+            entry = self.entries.get(relpath)
+            if entry:
+                yield '\t'.join([
+                    'F', relpath, entry.model, entry.id,
+                    repr(entry.mtime), str(entry.size), entry.sha1
+                ])
+            else:
+                yield '\t'.join(['X', relpath])
+
+    def save(self):
+        """Writes compacted manifest; replaces existing file atomically.
+
+        Failures (e.g. read-only checkout) are logged and the in-memory
+        manifest is left as is.
+
+        @returns: boolean True if written
+        """
+        if not self.path:
+            return False
+        tmp = '%s.tmp' % self.path
+        try:
+            with open(tmp, 'w') as f:
+                f.write('%s\n' % MANIFEST_HEADER)
+                for reldir in sorted(self.dirs):
+                    f.write('D\t%s\t%r\n' % (reldir, self.dirs[reldir]))
+                for line in self._lines(sorted(self.entries)):
+                    f.write('%s\n' % line)
+            os.rename(tmp, self.path)
+        except (IOError, OSError) as err:
+            logger.warning('Could not write manifest %s: %s' % (self.path, err))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+        return True
+
+    def _append(self, relpaths):
+        if not self.path:
+            return False
+        try:
+            with open(self.path, 'a') as f:
+                for line in self._lines(relpaths):
+                    f.write('%s\n' % line)
+        except (IOError, OSError) as err:
+            logger.warning('Could not write manifest %s: %s' % (self.path, err))
+            return False
+        return True
+
+    # building ----------------------------------------------------------
+
+    def _entry(self, relpath, sha1s={}):
+        """Stats and identifies file; uses sha1 from git index if given.
+        """
+        path = self._abs(relpath)
+        st = os.stat(path)
+        try:
+            oi = identifier.Identifier(path=path)
+            model,oid = oi.model,oi.id
+        except Exception:
+            # still listed, as with util.find_meta_files
+            model,oid = '',''
+        sha1 = sha1s.get(relpath)
+        if not sha1:
+            with open(path, 'rb') as f:
+                sha1 = git_blob_sha1(f.read())
+        return Entry(model, oid, st.st_mtime, st.st_size, sha1)
+
+    def _git_sha1s(self):
+        """Blob hashes of unmodified files in git index, from git ls-files
+
+        Saves hashing every file when rebuilding a committed collection.
+        Returns an empty dict if not a repository or git is unavailable.
+        """
+        if not self.gitdir:
+            return {}
+        try:
+            modified = set(util.git_ls_files(self.collection_path, '-m'))
+            sha1s = {}
+            # <mode> SP <object> SP <stage> TAB <file>
+            for line in util.git_ls_files(self.collection_path, '-s'):
+                info,relpath = line.split('\t', 1)
+                if relpath.endswith('.json') and (relpath not in modified):
+                    sha1s[relpath] = info.split(' ')[1]
+            return sha1s
+        except (OSError, subprocess.CalledProcessError) as err:
+            logger.debug('git ls-files failed: %s' % err)
+            return {}
+
+    def _scan(self, reldir):
+        """Lists relative paths of .json files and subdirectories
+        """
+        files,dirs = util._scan_directory(self._abs(reldir), self.excludes)
+        rel = lambda path: os.path.relpath(path, self.collection_path)
+        return [rel(path) for path in files], [rel(path) for path in dirs]
+
+    def rebuild(self):
+        """Scans entire collection and writes new manifest.
+
+        @returns: Manifest
+        """
+        self.dirs = {}
+        self.entries = {}
+        if not util._excluded(self.collection_path, self.excludes):
+            sha1s = self._git_sha1s()
+            stack = ['']
+            while stack:
+                reldir = stack.pop()
+                self.dirs[reldir] = os.stat(self._abs(reldir)).st_mtime
+                files,dirs = self._scan(reldir)
+                for relpath in files:
+                    self.entries[relpath] = self._entry(relpath, sha1s)
+                stack.extend(dirs)
+        self.save()
+        return self
+
+    def refresh(self):
+        """Loads manifest, rescans changed directories and re-hashes changed files.
+
+        Builds manifest if it does not exist.  Changes are saved.
+
+        @returns: Manifest
+        """
+        if not self.load():
+            return self.rebuild()
+        if util._excluded(self.collection_path, self.excludes):
+            return self
+        by_dir = {}
+        for relpath in self.entries:
+            by_dir.setdefault(os.path.dirname(relpath), []).append(relpath)
+        subdirs = {}
+        for reldir in self.dirs:
+            if reldir:
+                subdirs.setdefault(os.path.dirname(reldir), []).append(reldir)
+
+        changed = False
+        queue = sorted(self.dirs)
+        while queue:
+            reldir = queue.pop()
+            try:
+                mtime = os.stat(self._abs(reldir)).st_mtime
+            except OSError:
+                mtime = None
+            if (mtime is not None) and (self.dirs.get(reldir) == mtime):
+                continue
+            changed = True
+            if mtime is None:
+                self._forget(reldir)
+                continue
+            files,dirs = self._scan(reldir)
+            # files added/removed in this directory
+            for relpath in set(by_dir.get(reldir, [])).difference(files):
+                self.entries.pop(relpath, None)
+            for relpath in files:
+                if relpath not in self.entries:
+                    self.entries[relpath] = self._entry(relpath)
+            # removed subdirectories are dropped along with their contents
+            for subdir in set(subdirs.get(reldir, [])).difference(dirs):
+                self._forget(subdir)
+            # new subdirectories are scanned
+            queue.extend([d for d in dirs if d not in self.dirs])
+            self.dirs[reldir] = mtime
+        # files modified in place
+        for relpath,entry in self.entries.items():
+            try:
+                st = os.stat(self._abs(relpath))
+            except OSError:
+                self.entries.pop(relpath)
+                changed = True
+                continue
+            if (st.st_mtime != entry.mtime) or (st.st_size != entry.size):
+                self.entries[relpath] = self._entry(relpath)
+                changed = True
+        if changed:
+            self.save()
+        return self
+
+    def _forget(self, reldir):
+        """Drops directory and everything below it
+        """
+        prefix = '%s/' % reldir
+        for d in [d for d in self.dirs if (d == reldir) or d.startswith(prefix)]:
+            self.dirs.pop(d)
+        for relpath in [p for p in self.entries if p.startswith(prefix)]:
+            self.entries.pop(relpath)
+
+    def update(self, paths):
+        """Records changes to the specified files.
+
+        Files that no longer exist are removed from the manifest.
+        Changes are appended to the journal.
+
+        @param paths: list of absolute paths to .json files
+        """
+        relpaths = []
+        for path in paths:
+            relpath = os.path.relpath(path, self.collection_path)
+            if relpath.startswith('..') or not relpath.endswith('.json'):
+                continue
+            if os.path.exists(path):
+                self.entries[relpath] = self._entry(relpath)
+            else:
+                self.entries.pop(relpath, None)
+            relpaths.append(relpath)
+        if relpaths:
+            self._append(relpaths)
+
+    # listing -----------------------------------------------------------
+
+    def paths(self, model=None):
+        """Absolute paths to metadata files, as from util.find_meta_files
+
+        @param model: str Restrict to the named model ('collection','entity','file').
+        @returns: list of paths
+        """
+        relpaths = sorted(self.entries, key=util.walk_sort_key)
+        if model:
+            regex = identifier.META_FILENAME_REGEX[model]
+            relpaths = [p for p in relpaths if regex.search(p)]
+        return [self._abs(relpath) for relpath in relpaths]
+
+    def identifiers(self, model=None):
+        """Identifiers for metadata files
+
+        @param model: str Restrict to the named model ('collection','entity','file').
+        @returns: list of Identifiers, in same order as paths()
+        """
+        return identifier.parse_many(self.paths(model), by_model=False)
+
+
+def update(collection_path, paths):
+    """Updates a collection's manifest after its metadata files are written.
+
+    Does nothing if the collection has no manifest yet; one will be built
+    the next time it is needed.
+
+    @param collection_path: str Absolute path to collection repository
+    @param paths: list of absolute paths to .json files
+    """
+    m = Manifest(collection_path)
+    if m.load():
+        m.update(paths)
@@ -33,6 +33,7 @@ yet must be editable in the editor UI.
 * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
 """
 
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
 import logging
@@ -54,17 +55,26 @@ from DDR import commands
 from DDR import config
 from DDR.control import CollectionControlFile, EntityControlFile
 from DDR import converters
-from DDR import docstore
 from DDR import dvcs
 from DDR import fileio
-from DDR.identifier import Identifier, MODULES, VALID_COMPONENTS
-from DDR import imaging
+from DDR.identifier import Identifier, MODULES, VALID_COMPONENTS, parse_many
 from DDR import ingest
 from DDR import inheritance
 from DDR import locking
+from DDR import manifest
 from DDR import modules
 from DDR import util
 
+# faster JSON decoder for reading objects; opt-in (see config.JSON_BACKEND)
+ujson = None
+if config.JSON_BACKEND == 'ujson':
+    try:
+        import ujson
+        ujson.loads('[]', precise_float=True)
+    except (ImportError, TypeError) as err:
+        logger.warning('Using simplejson; ujson unusable: %s' % err)
+        ujson = None
+
 MODULE_PATH = os.path.dirname(os.path.abspath(__file__))
 TEMPLATE_PATH = os.path.join(config.INSTALL_PATH, 'ddr', 'DDR', 'templates')
 GITIGNORE_TEMPLATE = os.path.join(TEMPLATE_PATH, 'gitignore.tpl')
@@ -248,6 +258,65 @@ def load_json_lite(json_path, model, object_id):
         document.append( {'id':object_id} )
     return document
 
+def json_loads(json_text):
+    """Parses JSON text with ujson if configured, otherwise simplejson.
+    
+    Falls back to simplejson for anything ujson can't handle (e.g. very
+    large numbers, or releases without precise_float) so errors are the
+    same with either decoder.  Note that ujson returns unicode for all
+    strings, where simplejson returns str for ASCII strings.
+    
+    @param json_text: str
+    @returns: list of dicts (or whatever the text contains)
+    """
+    if ujson:
+        try:
+            return ujson.loads(json_text, precise_float=True)
+        except (ValueError, OverflowError, TypeError):
+            pass
+    return json.loads(json_text)
+
+def json_fields(json_data):
+    """Maps field names to values from list-of-dicts metadata, in order.
+    
+    Each field is a dict whose (first) key is the field name.  If a name
+    appears more than once the last value wins.  The object_metadata
+    dict is included under its first key, as with the rest.
+    
+    @param json_data: list of dicts
+    @returns: OrderedDict
+    """
+    fields = OrderedDict()
+    for field in json_data:
+        if hasattr(field, 'keys'):
+            for name in field:
+                fields[name] = field[name]
+                break
+    return fields
+
+# jsonload_* dispatch tables by module (see _jsonload_table)
+JSONLOAD_TABLES = {}
+
+def _jsonload_table(module):
+    """List of (fieldname, jsonload_* function or None, default) for module.FIELDS
+    
+    Built once per module object, instead of looking up jsonload_*
+    functions (with dir(module)) for every field of every object.
+    Modules are table keys so a reloaded module gets a new table.
+    """
+    table = JSONLOAD_TABLES.get(module)
+    if table is None:
+        table = [
+            (
+                mf['name'],
+                getattr(module, 'jsonload_%s' % mf['name'], None),
+                mf.get('default',None),
+            )
+            for mf in module.FIELDS
+        ]
+        JSONLOAD_TABLES[module] = table
+    return table
+
 def load_json(document, module, json_text):
     """Populates object from JSON-formatted text; applies jsonload_{field} functions.
     
@@ -257,33 +326,32 @@ def load_json(document, module, json_text):
     
     @param document: Collection/Entity/File object.
     @param module: collection/entity/file module from 'ddr' repo.
-    @param json_text: JSON-formatted text
+    @param json_text: JSON-formatted text, or list of dicts if already parsed.
     @returns: dict
     """
-    json_data = json.loads(json_text)
+    if isinstance(json_text, basestring):
+        json_data = json_loads(json_text)
+    else:
+        json_data = json_text
     # software and commit metadata
     for field in json_data:
         if is_object_metadata(field):
             setattr(document, 'object_metadata', field)
             break
-    # field values from JSON
-    for mf in module.FIELDS:
-        for f in json_data:
-            if hasattr(f, 'keys') and (f.keys()[0] == mf['name']):
-                fieldname = f.keys()[0]
-                # run jsonload_* functions on field data if present
-                field_data = modules.Module(module).function(
-                    'jsonload_%s' % fieldname,
-                    f.values()[0]
-                )
-                if isinstance(field_data, basestring):
-                    field_data = field_data.strip()
-                setattr(document, fieldname, field_data)
-    # Fill in missing fields with default values from module.FIELDS.
-    # Note: should not replace fields that are just empty.
-    for mf in module.FIELDS:
-        if not hasattr(document, mf['name']):
-            setattr(document, mf['name'], mf.get('default',None))
+    fields = json_fields(json_data)
+    for fieldname,jsonload,default in _jsonload_table(module):
+        if fieldname in fields:
+            # run jsonload_* functions on field data if present
+            field_data = fields[fieldname]
+            if jsonload:
+                field_data = jsonload(field_data)
+            if isinstance(field_data, basestring):
+                field_data = field_data.strip()
+            setattr(document, fieldname, field_data)
+        # Fill in missing fields with default values from module.FIELDS.
+        # Note: should not replace fields that are just empty.
+        elif not hasattr(document, fieldname):
+            setattr(document, fieldname, default)
     # Add timeszone to fields if not present
     apply_timezone(document, module)
     return json_data
@@ -352,12 +420,13 @@ def dump_json(obj, module, template=False,
             data.append(item)
     return data
 
-def from_json(model, json_path, identifier):
+def from_json(model, json_path, identifier, json_data=None):
     """Read the specified JSON file and properly instantiate object.
     
     @param model: LocalCollection, LocalEntity, or File
     @param json_path: absolute path to the object's .json file
     @param identifier: [optional] Identifier
+    @param json_data: [optional] Contents of json_path (text or parsed) if already read.
     @returns: object
     """
     document = None
@@ -373,7 +442,9 @@ def from_json(model, json_path, identifier):
         # object_id is in object directory
         document = model(os.path.dirname(json_path), identifier=identifier)
     document_id = document.id  # save this just in case
-    document.load_json(fileio.read_text(json_path))
+    if json_data is None:
+        json_data = fileio.read_text(json_path)
+    document.load_json(json_data)
     if not document.id:
         # id gets overwritten if document.json is blank
         document.id = document_id
@@ -767,14 +838,15 @@ class Collection( object ):
         return exit,status,updated_files
     
     @staticmethod
-    def from_json(path_abs, identifier=None):
+    def from_json(path_abs, identifier=None, json_data=None):
         """Instantiates a Collection object from specified collection.json.
         
         @param path_abs: Absolute path to .json file.
         @param identifier: [optional] Identifier
+        @param json_data: [optional] Contents of .json file if already read.
         @returns: Collection
         """
-        return from_json(Collection, path_abs, identifier)
+        return from_json(Collection, path_abs, identifier, json_data)
     
     @staticmethod
     def from_identifier(identifier):
@@ -843,22 +915,34 @@ class Collection( object ):
         """
         return signature_abs(self, self.identifier.basepath)
     
-    def identifiers(self, model=None, force_read=False):
+    def identifiers(self, model=None, force_read=False, source=None, untracked=False):
         """Lists Identifiers for all or subset of Collection's descendents.
         
         >>> c = Collection.from_json('/tmp/ddr-testing-123')
         >>> c.descendants()
         [<Entity ddr-testing-123-1>, <Entity ddr-testing-123-2>, ...]
         
+        Uses the collection's manifest (see DDR.manifest), which is
+        refreshed first, unless force_read or source is specified or the
+        collection is not a git repository.
+        
         @param model: str Restrict list to model.
-        @returns: list of Identifiers
-        """
-        return [
-            Identifier(path)
-            for path in util.find_meta_files(
-                self.path, recursive=1, model=model, force_read=force_read
-            )
-        ]
+        @param force_read: boolean Scan the filesystem instead of using manifest.
+        @param source: str 'fs' or 'git' (see util.find_meta_files).
+        @param untracked: boolean Include untracked files (source='git' only).
+        @returns: list of Identifiers, in path order (see util.find_meta_files)
+        """
+        if not (force_read or source):
+            m = manifest.Manifest(self.path)
+            if m.path:
+                return m.refresh().identifiers(model)
+        return parse_many(
+            util.find_meta_files(
+                self.path, recursive=1, model=model, force_read=True,
+                source=source or 'fs', untracked=untracked
+            ),
+            by_model=False
+        )
     
     def labels_values(self):
         """Apply display_{field} functions to prep object data for the UI.
@@ -960,6 +1044,7 @@ class Collection( object ):
     def post_json(self):
         """Post Collection to Elasticsearch.
         """
+        from DDR import docstore
         return docstore.Docstore().post(
             document=self,
             public_fields=docstore._public_fields().get(self.identifier.model, []),
@@ -971,6 +1056,7 @@ class Collection( object ):
     def reindex(self):
         """Reindex Collection objects to Elasticsearch
         """
+        from DDR import docstore
         ds = docstore.Docstore(config.DOCSTORE_HOST, config.DOCSTORE_INDEX)
         
         # check for ES connection before going to all the trouble
@@ -1504,6 +1590,7 @@ class Entity( object ):
         modified_ids,modified_files = self.update_inheritables(inheritables, cleaned_data)
         if modified_files:
             updated_files = updated_files + modified_files
+        manifest.update(collection.path, updated_files)
 
         exit,status = commands.entity_update(
             git_name, git_mail,
@@ -1515,14 +1602,15 @@ class Entity( object ):
         return exit,status,updated_files
     
     @staticmethod
-    def from_json(path_abs, identifier=None):
+    def from_json(path_abs, identifier=None, json_data=None):
         """Instantiates an Entity object from specified entity.json.
         
         @param path_abs: Absolute path to .json file.
         @param identifier: [optional] Identifier
+        @param json_data: [optional] Contents of .json file if already read.
         @returns: Entity
         """
-        return from_json(Entity, path_abs, identifier)
+        return from_json(Entity, path_abs, identifier, json_data)
     
     @staticmethod
     def from_csv(identifier, rowd):
@@ -1703,6 +1791,7 @@ class Entity( object ):
         """Post Entity to Elasticsearch.
         """
         # NOTE: this is same basic code as docstore.index
+        from DDR import docstore
         return docstore.Docstore().post(
             document=self,
             public_fields=docstore._public_fields().get(self.identifier.model, []),
@@ -2283,6 +2372,7 @@ class File( object ):
             parent.children(force_read=True)
             parent.write_json()
             updated_files.append(parent.json_path)
+        manifest.update(collection.path, updated_files)
         
         exit,status = commands.entity_update(
             git_name, git_mail,
@@ -2337,17 +2427,18 @@ class File( object ):
     # create(path)
     
     @staticmethod
-    def from_json(path_abs, identifier=None):
+    def from_json(path_abs, identifier=None, json_data=None):
         """Instantiates a File object from specified *.json.
         
         @param path_abs: Absolute path to .json file.
         @param identifier: [optional] Identifier
+        @param json_data: [optional] Contents of .json file if already read.
         @returns: DDRFile
         """
         #file_ = File(path_abs=path_abs)
         #file_.load_json(fileio.read_text(file_.json_path))
         #return file_
-        return from_json(File, path_abs, identifier)
+        return from_json(File, path_abs, identifier, json_data)
     
     @staticmethod
     def from_csv(identifier, rowd):
@@ -2493,6 +2584,7 @@ class File( object ):
     def post_json(self, public=False):
         """Post File to Elasticsearch.
         """
+        from DDR import docstore
         return docstore.Docstore().post(
             document=self,
             public_fields=docstore._public_fields().get(self.identifier.model, []),
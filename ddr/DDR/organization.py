@@ -5,7 +5,6 @@ import os
 import re
 
 import envoy
-import git
 
 from DDR import fileio
 
@@ -115,6 +114,7 @@ def repo_level( repo_path, level=None ):
     @returns level
     """
     logging.debug('repo_level(%s, %s)' % (repo_path,level))
+    import git  # GitPython, slow to import
     repo = git.Repo(repo_path, search_parent_directories=True)
     if level:
         logging.debug('level -> %s' % level)
@@ -180,6 +180,7 @@ def repo_annex_get(repo_path, level):
     ACCESS_SUFFIX = '-a.jpg'
     #level = repo_level(repo_path)
     logger.debug('level: %s' % level)
+    import git  # GitPython, slow to import
     repo = git.Repo(repo_path, search_parent_directories=True)
     if level == 'access':
         r = envoy.run('find . -name "*%s" -print' % ACCESS_SUFFIX)
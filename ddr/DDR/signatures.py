@@ -14,6 +14,7 @@ identifiers = signatures.signatures(paths, basepath)
 
 """
 
+from collections import OrderedDict
 from datetime import datetime
 import logging
 logger = logging.getLogger(__name__)
@@ -54,7 +55,9 @@ class SigIdentifier(identifier.Identifier):
     """Subclass of Identifier used for finding/assigning object signature files
     
     NOTE: Reads object JSON file during construction.
+    Not interned since signature fields are modified after construction.
     """
+    interned = False
     model = None
     public = None
     status = None
@@ -89,7 +92,7 @@ class SigIdentifier(identifier.Identifier):
         
         # prep sorting key
         # TODO refactor - knows too much about model definitions!
-        sort_key = self.parts
+        sort_key = OrderedDict(self.parts)
         if self.model == 'file':
             # insert file sort before sha1
             sort_key['role'] = ROLE_NUMBERS[self.parts['role']]
@@ -1,5 +1,7 @@
 from datetime import datetime
 import json
+import os
+import shutil
 
 from nose.tools import assert_raises
 from nose.plugins.attrib import attr
@@ -26,6 +28,42 @@ HOSTS = [{'host':'127.0.0.1', 'port':9200}]
 #    assert d.es
 #    assert d.es.cat.client.ping() == True
 
+def test_get_client():
+    c0 = docstore.get_client('127.0.0.1:9200', timeout=5)
+    c1 = docstore.get_client('127.0.0.1:9200', timeout=5)
+    c2 = docstore.get_client('127.0.0.1:9201', timeout=5)
+    assert c0 is c1
+    assert c0 is not c2
+    assert docstore.Docstore('127.0.0.1:9201', 'testing').es is not None
+
+def test_task_progress():
+    assert docstore._task_progress({}) == '0/0 (0%)'
+    status = {'total': 200, 'created': 40, 'updated': 10, 'deleted': 0}
+    assert docstore._task_progress(status) == '50/200 (25%)'
+
+def test_percentile():
+    values = [1,2,3,4,5,6,7,8,9,10]
+    assert docstore._percentile([], 50) == 0
+    assert docstore._percentile(values, 50) == 5
+    assert docstore._percentile(values, 95) == 10
+    assert docstore._percentile([0.5], 99) == 0.5
+
+def test_publish_metrics():
+    metrics = docstore.PublishMetrics(num=3)
+    metrics.add('parse', 0.25)
+    metrics.add('parse', 0.25)
+    metrics.request(0.1)
+    metrics.request(0.3)
+    metrics.document()
+    summary = metrics.summary()
+    assert summary['documents'] == 1
+    assert summary['total'] == 3
+    assert summary['phases']['parse'] == 0.5
+    assert summary['phases']['send'] == 0.4
+    assert summary['requests']['count'] == 2
+    assert summary['requests']['p50'] == 0.1
+    assert summary['requests']['p99'] == 0.3
+
 def test_make_index_name():
     assert docstore.make_index_name('abc-def_ghi.jkl/mno\\pqr stu') == 'abc-def_ghi.jkl-mno-pqrstu'
     assert docstore.make_index_name('qnfs/kinkura/gold') == 'qnfs-kinkura-gold'
@@ -64,6 +102,253 @@ def test_parse_cataliases():
 # list_facets
 # facet_terms
 
+def test_facet_results():
+    terms = {
+        'sum_other_doc_count': 0,
+        'buckets': [
+            {'key': 'photograph', 'doc_count': 14},
+            {'key': 'ephemera', 'doc_count': 6},
+        ]
+    }
+    missing = {'doc_count': 203}
+    expected = {
+        '_type': 'terms',
+        'missing': 203,
+        'total': 20,
+        'other': 0,
+        'terms': [
+            {'term': 'photograph', 'count': 14},
+            {'term': 'ephemera', 'count': 6},
+        ]
+    }
+    assert docstore._facet_results(terms, missing) == expected
+    # sample from facet_terms docstring
+    counts = [
+        ('photograph', 14), ('ephemera', 6), ('advertisement', 6), ('book', 5),
+        ('architecture', 3), ('illustration', 2), ('fieldnotes', 2),
+        ('cityscape', 2), ('blank_form', 2), ('portrait', 1),
+    ]
+    terms = {
+        'sum_other_doc_count': 6,
+        'buckets': [{'key': key, 'doc_count': count} for key,count in counts],
+    }
+    results = docstore._facet_results(terms, missing)
+    assert results['total'] == 49
+    assert results['other'] == 6
+    assert len(results['terms']) == 10
+
+class FakeES(object):
+    searches = 0
+    def search(self, **kwargs):
+        self.searches += 1
+        aggs = {}
+        for name in kwargs['body']['aggs'].keys():
+            aggs[name] = {'buckets': [], 'doc_count': 0}
+        return {'aggregations': aggs}
+
+def test_facets_terms_cache():
+    es = FakeES()
+    ds = docstore.Docstore('fakehost:9200', 'testing', connection=es)
+    ds.invalidate_facets()
+    r0 = ds.facets_terms(['genre', 'format'])
+    r1 = ds.facets_terms(['genre', 'format'])
+    assert es.searches == 1
+    assert r0 == r1
+    assert sorted(r0.keys()) == ['format', 'genre']
+    # modifying results does not change the cache
+    r0.pop('genre')
+    r1['format'] = None
+    assert sorted(ds.facets_terms(['genre', 'format']).keys()) == ['format', 'genre']
+    assert ds.facets_terms(['genre', 'format'])['format'] != None
+    assert es.searches == 1
+    ds.invalidate_facets()
+    ds.facets_terms(['genre', 'format'])
+    assert es.searches == 2
+
+class FakeDocType(object):
+    @staticmethod
+    def init(index, using):
+        using.indices.mappings[index]['entity'] = {'properties': {}}
+
+class FakeIndices(object):
+    def __init__(self):
+        self.mappings = {'ddrtest-old': {'entity': {'properties': {}}}}
+        self.index_aliases = {'ddrtest-old': 'ddrtest'}
+    def create(self, index, body):
+        self.mappings[index] = {}
+    def exists(self, index):
+        return index in self.mappings
+    def get_mapping(self, index):
+        return {index: {'mappings': self.mappings[index]}}
+    def refresh(self, index):
+        pass
+    def update_aliases(self, body):
+        for action in body['actions']:
+            if action.get('remove'):
+                self.index_aliases.pop(action['remove']['index'])
+            if action.get('add'):
+                self.index_aliases[action['add']['index']] = action['add']['alias']
+
+class FakeRebuildES(object):
+    def __init__(self):
+        self.indices = FakeIndices()
+        self.cat = self
+    def aliases(self, h):
+        return '\n'.join([
+            '%s %s' % (i,a) for i,a in self.indices.index_aliases.iteritems()
+        ])
+    def info(self):
+        return {'version': {'number': '5.6.0'}}
+    def reindex(self, **kwargs):
+        return {'took': 1}
+    def count(self, index, doc_type):
+        return {'count': 3}
+
+def test_rebuild_mappings():
+    es = FakeRebuildES()
+    classes = docstore.ELASTICSEARCH_CLASSES
+    docstore.ELASTICSEARCH_CLASSES = {'all': [{'doctype': 'entity', 'class': FakeDocType}]}
+    try:
+        ds = docstore.Docstore('fakehost:9200', 'ddrtest', connection=es)
+        dest = ds.rebuild('ddrtest')
+    finally:
+        docstore.ELASTICSEARCH_CLASSES = classes
+    assert dest != 'ddrtest-old'
+    assert ds.target_index('ddrtest') == dest
+    # mappings went into the new index, not the alias
+    mappings = docstore.Docstore('fakehost:9200', dest, connection=es).get_mappings(raw=True)
+    assert mappings[dest]['mappings'].keys() == ['entity']
+
+def test_doc_counts():
+    es = FakeRebuildES()
+    classes = docstore.ELASTICSEARCH_CLASSES
+    docstore.ELASTICSEARCH_CLASSES = {'all': [
+        {'doctype': 'entity', 'class': FakeDocType},
+        {'doctype': 'narrator', 'class': FakeDocType},
+    ]}
+    try:
+        counts = docstore.Docstore('fakehost:9200', 'ddrtest', connection=es).doc_counts()
+    finally:
+        docstore.ELASTICSEARCH_CLASSES = classes
+    assert counts == {'entity': 3, 'narrator': 3}
+
+class FakeNarratorES(object):
+    def __init__(self):
+        self.documents = {}
+    def index(self, index, doc_type, id, body):
+        self.documents[id] = body
+        failed = 1 if id == 'bad' else 0
+        return {'_id': id, '_shards': {'total': 1, 'successful': 1 - failed, 'failed': failed}}
+
+def test_narrators():
+    path = '/tmp/test-ddr-docstore-narrators.json'
+    with open(path, 'w') as f:
+        f.write(json.dumps({'narrators': [
+            {'id': 'fred', 'has_published': '1'},
+            {'id': 'bad', 'has_published': '1'},
+        ]}))
+    es = FakeNarratorES()
+    results = docstore.Docstore('fakehost:9200', 'ddrtest', connection=es).narrators(path)
+    os.remove(path)
+    assert results == {'total': 2, 'successful': 1, 'bad': ['bad']}
+    assert sorted(es.documents.keys()) == ['bad', 'fred']
+
+class FakeFieldIndices(object):
+    def __init__(self, mapping):
+        self.mapping = mapping
+    def get_field_mapping(self, index, doc_type, fields):
+        return {'ddrtest-1': {'mappings': {
+            'entity': {fields: {'full_name': fields, 'mapping': {fields: self.mapping}}},
+            'narrator': {},
+        }}}
+
+class FakeStaleES(object):
+    def __init__(self, mapping, hits):
+        self.indices = FakeFieldIndices(mapping)
+        self.hits = hits
+
+def test_stale_ids():
+    hits = [
+        {'_id': 'ddr-test-123', '_type': 'collection'},
+        {'_id': 'ddr-test-123-1', '_type': 'entity'},
+        {'_id': 'ddr-test-123-2', '_type': 'entity'},
+        {'_id': 'ddr-test-123-2-master-abc123', '_type': 'file'},
+    ]
+    publish_ids = set(['ddr-test-123', 'ddr-test-123-1'])
+    queries = []
+    def scan(es, **kwargs):
+        queries.append(kwargs['query'])
+        return es.hits
+    scan_ = docstore.helpers.scan
+    docstore.helpers.scan = scan
+    try:
+        es = FakeStaleES({'type': 'string', 'index': 'not_analyzed'}, hits)
+        ds = docstore.Docstore('fakehost:9200', 'ddrtest-stale', connection=es)
+        stale = ds._stale_ids('ddr-test-123', publish_ids)
+        # analyzed field would match nothing
+        es = FakeStaleES({'type': 'string'}, hits)
+        ds = docstore.Docstore('fakehost:9200', 'ddrtest-analyzed', connection=es)
+        assert_raises(Exception, ds._stale_ids, 'ddr-test-123', publish_ids)
+    finally:
+        docstore.helpers.scan = scan_
+    assert stale == {
+        'ddr-test-123-2': 'entity',
+        'ddr-test-123-2-master-abc123': 'file',
+    }
+    assert queries[0]['query'] == {'term': {'collection_id': 'ddr-test-123'}}
+    assert len(queries) == 1
+
+def test_repo_org_paths():
+    basedir = '/tmp/test-ddr-docstore-repoorg'
+    if os.path.exists(basedir):
+        shutil.rmtree(basedir)
+    cpath = os.path.join(basedir, 'ddr-testing-123')
+    os.makedirs(os.path.join(basedir, 'ddr'))
+    os.makedirs(os.path.join(basedir, 'ddr-testing'))
+    os.makedirs(cpath)
+    repo_path = os.path.join(basedir, 'ddr', 'repository.json')
+    org_path = os.path.join(basedir, 'ddr-testing', 'organization.json')
+    open(repo_path, 'w').close()
+    assert_raises(Exception, docstore._repo_org_paths, [cpath])
+    open(org_path, 'w').close()
+    assert docstore._repo_org_paths([cpath, cpath]) == [
+        ('repository', repo_path),
+        ('organization', org_path),
+    ]
+
+class FakeStateIndices(object):
+    def __init__(self):
+        self.mappings = {}
+    def create(self, index, body):
+        self.mappings[index] = body['mappings']
+    def exists(self, index):
+        return index in self.mappings
+
+class FakeStateES(object):
+    def __init__(self):
+        self.indices = FakeStateIndices()
+        self.documents = {}
+    def get(self, index, doc_type, id):
+        if (index,doc_type,id) not in self.documents:
+            raise docstore.TransportError(404, 'not found')
+        return {'_source': self.documents[(index,doc_type,id)]}
+    def index(self, index, doc_type, id, body):
+        assert self.indices.exists(index)
+        self.documents[(index,doc_type,id)] = body
+        return {'created': True}
+
+def test_published_commit():
+    es = FakeStateES()
+    ds = docstore.Docstore('fakehost:9200', 'ddrtest', connection=es)
+    assert ds.published_commit('ddr-testing-123') == None
+    ds.set_published_commit('ddr-testing-123', 'abc123')
+    ds.set_published_commit('ddr-testing-123', 'def456')
+    assert ds.published_commit('ddr-testing-123') == 'def456'
+    # own index with explicit mappings, not the ddrtest index
+    assert es.indices.mappings == {
+        'ddrtest-publishstate': docstore.PUBLISH_STATE_MAPPINGS
+    }
+
 def test_is_publishable():
     data0 = [{'id': 'ddr-testing-123-1'}]
     data1 = [{'id': 'ddr-testing-123-1'}, {'public':0}, {'status':'inprogress'}]
@@ -132,6 +417,45 @@ def test_clean_payload():
 # exists
 # get
 
+def test_payload_hash():
+    a = {'id': 'ddr-test-123', 'title': 'Title', 'topics': ['1', '2']}
+    b = {'topics': ['1', '2'], 'title': 'Title', 'id': 'ddr-test-123'}
+    c = {'id': 'ddr-test-123', 'title': 'Title changed', 'topics': ['1', '2']}
+    assert docstore._payload_hash(a) == docstore._payload_hash(b)
+    assert docstore._payload_hash(a) != docstore._payload_hash(c)
+
+def test_payload_hashes():
+    path = '/tmp/DDR_test_docstore/hashes/ddr-test-123.json'
+    if os.path.exists(path):
+        os.remove(path)
+    hashes = docstore.PayloadHashes(path)
+    assert not hashes.unchanged('ddr-test-123', 'abc')
+    hashes.set('ddr-test-123', 'abc')
+    hashes.set('ddr-test-123-1', 'def')
+    hashes.remove('ddr-test-123-1')
+    hashes.save()
+    hashes = docstore.PayloadHashes(path)
+    assert hashes.unchanged('ddr-test-123', 'abc')
+    assert not hashes.unchanged('ddr-test-123', 'xyz')
+    assert not hashes.unchanged('ddr-test-123-1', 'def')
+
+def test_bulk_status():
+    assert docstore._bulk_status(
+        {'index': {'_id': 'ddr-test-123', 'status': 201}}
+    ) == ('index', 'ddr-test-123', 'created')
+    assert docstore._bulk_status(
+        {'index': {'_id': 'ddr-test-123', 'status': 200}}
+    ) == ('index', 'ddr-test-123', 'updated')
+    assert docstore._bulk_status(
+        {'index': {'_id': 'ddr-test-123', 'status': 400, 'error': 'MapperParsingException'}}
+    ) == ('index', 'ddr-test-123', 'error')
+    assert docstore._bulk_status(
+        {'delete': {'_id': 'ddr-test-123', 'status': 200, 'found': True}}
+    ) == ('delete', 'ddr-test-123', 'deleted')
+    assert docstore._bulk_status(
+        {'delete': {'_id': 'ddr-test-123', 'status': 404, 'found': False}}
+    ) == ('delete', 'ddr-test-123', 'notfound')
+
 def test_all_list_fields():
     expected = [
         'id', 'title', 'description', 'url',
@@ -242,6 +566,20 @@ def test_massage_query_results():
     assert objects0 == MASSAGE_EXPECTED0
     assert objects1 == MASSAGE_EXPECTED1
 
+def test_paginated_results():
+    objects = [{'id': 'ddr-test-3'}, {'id': 'ddr-test-4'}]
+    results = docstore.PaginatedResults(objects, total=5, bottom=2)
+    assert len(results) == 5
+    assert results.count() == 5
+    assert results[2:4] == objects
+    assert results[-1] == {'n': 4, 'id': None, 'placeholder': True}
+    assert results[0:2] == [
+        {'n': 0, 'id': None, 'placeholder': True},
+        {'n': 1, 'id': None, 'placeholder': True},
+    ]
+    assert len(list(results)) == 5
+    assert_raises(IndexError, results.__getitem__, 5)
+
 def test_clean_sort():
     data0 = 'whatever'
     data1 = [['a', 'asc'], ['b', 'asc'], 'whatever']
@@ -341,6 +679,98 @@ def test_publishable_or_not():
     assert successful_paths == EXPECTED_SUCCESSFUL
     assert bad_paths == EXPECTED_BAD
 
+def test_ancestor_paths():
+    basedir = '/tmp/DDR_test_docstore/ddr-test-123'
+    if os.path.exists(basedir):
+        shutil.rmtree(basedir, ignore_errors=1)
+    os.makedirs(os.path.join(basedir, 'files/ddr-test-123-1/files'))
+    for fn in [
+            'collection.json',
+            'files/ddr-test-123-1/entity.json',
+            'files/ddr-test-123-1/files/ddr-test-123-1-master-abc123.json',
+    ]:
+        with open(os.path.join(basedir, fn), 'w') as f:
+            f.write('testing')
+    paths = [
+        os.path.join(basedir, 'files/ddr-test-123-1/files/ddr-test-123-1-master-abc123.json'),
+    ]
+    expected = [
+        os.path.join(basedir, 'files/ddr-test-123-1/entity.json'),
+        os.path.join(basedir, 'collection.json'),
+    ]
+    assert docstore._ancestor_paths(basedir, paths) == expected
+    # ancestors already in list are not repeated
+    paths.append(os.path.join(basedir, 'collection.json'))
+    assert docstore._ancestor_paths(basedir, paths) == expected[:1]
+
+def test_scan_publishable_errors():
+    basedir = '/tmp/DDR_test_docstore_scan/ddr-test-123'
+    if os.path.exists(basedir):
+        shutil.rmtree(basedir, ignore_errors=1)
+    os.makedirs(os.path.join(basedir, 'files/ddr-test-123-1/files'))
+    data = json.dumps([{'public': 1}, {'status': 'completed'}])
+    for fn,text in [
+            ('collection.json', data),
+            ('files/ddr-test-123-1/entity.json', '[{"public": 1}, '),
+            ('files/ddr-test-123-1/files/ddr-test-123-1-master-abc123.json', data),
+    ]:
+        with open(os.path.join(basedir, fn), 'w') as f:
+            f.write(text)
+    paths = [
+        os.path.join(basedir, 'collection.json'),
+        os.path.join(basedir, 'files/ddr-test-123-1/entity.json'),
+        os.path.join(basedir, 'files/ddr-test-123-1/files/ddr-test-123-1-master-abc123.json'),
+        os.path.join(basedir, 'files/ddr-test-123-2/entity.json'),
+        os.path.join(basedir, 'not-an-object.json'),
+    ]
+    out = list(docstore._scan_publishable(paths, force=True))
+    assert [path['path'] for path in out] == paths
+    # corrupt JSON, missing file, unidentifiable path
+    assert [path['action'] for path in out] == ['POST', 'ERROR', 'POST', 'ERROR', 'ERROR']
+    assert out[1]['identifier'].id == 'ddr-test-123-1'
+    assert out[1]['note'].startswith('Could not read metadata')
+    assert out[4]['identifier'] == None
+    assert docstore._prepare_bulk_action((out[1], 'testing')) == (out[1], None)
+
+def test_indexer_plan():
+    oi = identifier.Identifier('ddr-testing-123-1')
+    ES_Class,plan = docstore._indexer_plan(oi)
+    assert ES_Class == identifier.ELASTICSEARCH_CLASSES_BY_MODEL['entity']
+    assert [fieldname for fieldname,function in plan] == docstore.doctype_fields(ES_Class)
+    for fieldname,function in plan:
+        assert (function is None) or callable(function)
+    # cached
+    assert docstore._indexer_plan(oi)[1] is plan
+
+def test_parents_first():
+    paths = [
+        '/tmp/ddr/ddr-test-123/files/ddr-test-123-1/files/ddr-test-123-1-master-96c.json',
+        '/tmp/ddr/ddr-test-123/files/ddr-test-123-1/entity.json',
+        '/tmp/ddr/ddr-test-123/files/ddr-test-123-1/files/ddr-test-123-1-1/entity.json',
+        '/tmp/ddr/ddr-test-123/collection.json',
+    ]
+    expected = [
+        '/tmp/ddr/ddr-test-123/collection.json',
+        '/tmp/ddr/ddr-test-123/files/ddr-test-123-1/entity.json',
+        '/tmp/ddr/ddr-test-123/files/ddr-test-123-1/files/ddr-test-123-1-1/entity.json',
+        '/tmp/ddr/ddr-test-123/files/ddr-test-123-1/files/ddr-test-123-1-master-96c.json',
+    ]
+    assert docstore._parents_first(paths) == expected
+
+def test_note_ids():
+    paths = [
+        {'identifier': identifier.Identifier('ddr-test-123-1'), 'action': 'POST'},
+        {'identifier': identifier.Identifier('ddr-test-123-2'), 'action': 'SKIP'},
+        {'identifier': None, 'action': 'UNSPECIFIED'},
+        {'identifier': identifier.Identifier('ddr-test-123-3'), 'action': 'ERROR'},
+    ]
+    publish_ids = set()
+    skip_ids = {}
+    out = list(docstore._note_ids(paths, publish_ids, skip_ids))
+    assert out == paths
+    assert publish_ids == set(['ddr-test-123-1', 'ddr-test-123-3'])
+    assert skip_ids == {'ddr-test-123-2': 'entity'}
+
 # _has_access_file
 # _store_signature_file
 # _choose_signatures
@@ -320,6 +320,47 @@ def test_parse_list_staged():
 
 # TODO list_staged
 
+GIT_DIFF_NAME_STATUS = """M\tcollection.json
+A\tfiles/ddr-densho-10-2/entity.json
+D\tfiles/ddr-densho-10-1/files/ddr-densho-10-1-master-c85f8d0f91.json
+"""
+GIT_DIFF_NAME_STATUS_EXPECTED = [
+    ('M', 'collection.json'),
+    ('A', 'files/ddr-densho-10-2/entity.json'),
+    ('D', 'files/ddr-densho-10-1/files/ddr-densho-10-1-master-c85f8d0f91.json'),
+]
+
+def test_parse_diff_name_status():
+    assert dvcs._parse_diff_name_status(GIT_DIFF_NAME_STATUS) == GIT_DIFF_NAME_STATUS_EXPECTED
+    assert dvcs._parse_diff_name_status('') == []
+
+def test_list_changed_since():
+    path = '/tmp/test-ddr-dvcs/test-list-changed-since'
+    cleanup_repo(path)
+    repo = make_repo(path, ['committed', 'uncommitted', 'deleted', 'renamed', 'unchanged'])
+    commit = repo.head.commit.hexsha
+    # committed changes
+    with open(os.path.join(path, 'committed'), 'w') as f:
+        f.write('testing')
+    repo.git.add('committed')
+    repo.git.rm('deleted')
+    repo.git.mv('renamed', 'renamed-new')
+    repo.index.commit('changes')
+    # working tree changes
+    with open(os.path.join(path, 'uncommitted'), 'w') as f:
+        f.write('testing')
+    open(os.path.join(path, 'untracked'), 'w').close()
+    out = dvcs.list_changed_since(repo, commit)
+    cleanup_repo(path)
+    assert sorted(out) == [
+        ('A', 'renamed-new'),
+        ('A', 'untracked'),
+        ('D', 'deleted'),
+        ('D', 'renamed'),
+        ('M', 'committed'),
+        ('M', 'uncommitted'),
+    ]
+
 SAMPLE_COMMIT_LOG = """
 commit 4df7877f43a10873ced2c484cc9f65605ee4ca68
 Author: DDRAdmin <kinkura@hq.densho.org>
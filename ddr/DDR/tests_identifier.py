@@ -1,5 +1,6 @@
 # coding: utf-8
 
+from collections import OrderedDict
 import json
 import os
 import re
@@ -344,6 +345,32 @@ def test_identify_object():
     assert identifier.identify_object(id0, patterns) == (id0_expected_model,id0_expected_memo,id0_expected_gd)
     assert identifier.identify_object(id1, patterns) == (id1_expected_model,id1_expected_memo,id1_expected_gd)
     assert identifier.identify_object(id2, patterns) == (id2_expected_model,id2_expected_memo,id2_expected_gd)
+    matcher = identifier.PatternMatcher(patterns)
+    assert identifier.identify_object(id0, matcher) == (id0_expected_model,id0_expected_memo,id0_expected_gd)
+    assert identifier.identify_object(id1, matcher) == (id1_expected_model,id1_expected_memo,id1_expected_gd)
+    assert identifier.identify_object(id2, matcher) == (id2_expected_model,id2_expected_memo,id2_expected_gd)
+
+def test_pattern_matcher():
+    texts = [
+        'ddr',
+        'ddr-test',
+        'ddr-test-123',
+        'ddr-test-123-456',
+        'ddr-test-123-456-master',
+        'ddr-test-123-456-master-a1b2c3d4e5',
+        '/tmp/ddr-test-123/collection.json',
+        '/tmp/ddr-test-123/files/ddr-test-123-456/entity.json',
+        '/tmp/ddr-test-123/files/ddr-test-123-456/files/ddr-test-123-456-master-a1b2c3d4e5.json',
+        '/ui/ddr-test-123-456',
+        '/ddr/test/123',
+        'ddr.test.123',
+    ]
+    for patterns in [identifier.ID_PATTERNS, identifier.PATH_PATTERNS, identifier.URL_PATTERNS]:
+        # small max_groups splits patterns across several regexes
+        for max_groups in [identifier.PATTERN_MATCHER_MAX_GROUPS, 10]:
+            matcher = identifier.PatternMatcher(patterns, max_groups=max_groups)
+            for text in texts:
+                assert matcher.match(text) == identifier.identify_object(text, patterns)
 
 def test_identify_filepath():
     assert identifier.identify_filepath('something-a.jpg') == 'access'
@@ -1323,3 +1350,135 @@ def test_urlpath():
     assert i4.urlpath('public') == FILE_PUBLIC_URL
 
 
+
+
+def test_identifier_cache():
+    cache = identifier.IdentifierCache(maxsize=2)
+    assert cache.get('a') == None
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)  # evicts least-recently used 'b'
+    assert cache.get('b') == None
+    assert cache.get('c') == 3
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'size': 2, 'maxsize': 2}
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 2}
+
+def test_identifier_interned():
+    identifier.IDENTIFIER_CACHE.clear()
+    i0 = identifier.Identifier('ddr-test-123', '/tmp')
+    i1 = identifier.Identifier('ddr-test-123', '/tmp')
+    i2 = identifier.Identifier('ddr-test-123', '/var/www')
+    assert i0 is i1
+    assert i0 is not i2
+    stats = identifier.IDENTIFIER_CACHE.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+    assert_raises(AttributeError, setattr, i0, 'id', 'ddr-test-456')
+
+def test_idparts():
+    items = [('repo','ddr'), ('org','test'), ('cid',123)]
+    parts = identifier.IdParts(items)
+    assert parts['cid'] == 123
+    assert parts.get('eid') == None
+    assert parts.keys() == ['repo','org','cid']
+    assert parts.values() == ['ddr','test',123]
+    assert parts.items() == items
+    assert 'org' in parts
+    assert len(parts) == 3
+    assert parts == OrderedDict(items)
+    assert parts == dict(items)
+    assert parts != OrderedDict(reversed(items))
+    assert identifier.IdParts(parts) == parts
+    assert_raises(KeyError, parts.__getitem__, 'eid')
+    assert_raises(TypeError, parts.__setitem__, 'cid', 456)
+    # same keys are shared between instances
+    assert identifier.IdParts([('repo','ddr'), ('org','foo'), ('cid',1)])._keys is parts._keys
+
+def test_identifier_slots():
+    i = identifier.Identifier('ddr-test-123-456', '/tmp')
+    assert not hasattr(i, '__dict__')
+    assert isinstance(i.parts, identifier.IdParts)
+    assert i.idparts == OrderedDict([
+        ('model','entity'), ('repo','ddr'), ('org','test'), ('cid',123), ('eid',456)
+    ])
+
+def test_identifier_cached_parent():
+    i = identifier.Identifier('ddr-test-123-456-master-a1b2c3d4e5', '/tmp')
+    parent = i.parent()
+    assert parent.id == 'ddr-test-123-456'
+    assert i.parent() is parent
+    assert i.parent(stubs=True).id == 'ddr-test-123-456-master'
+    assert i.parent() is parent
+    lineage = i.lineage()
+    assert [x.id for x in lineage] == [
+        'ddr-test-123-456-master-a1b2c3d4e5', 'ddr-test-123-456', 'ddr-test-123'
+    ]
+    # returns a new list each time
+    lineage.pop()
+    assert len(i.lineage()) == 3
+    assert i.collection_id() == 'ddr-test-123'
+    assert i.collection_id() is i.collection_id()
+    # no parent is cached too
+    repo = identifier.Identifier('ddr')
+    assert repo.parent() == None
+    assert repo._parent == (None,)
+
+def test_template_formatter():
+    formatter = identifier.TemplateFormatter([
+        '{repo}-{org}-{cid}-{eid}',
+        '{repo}-{org}-{cid}',
+    ])
+    i0 = identifier.Identifier('ddr-test-123')
+    i1 = identifier.Identifier('ddr-test-123-456')
+    assert formatter.format(i0.parts) == 'ddr-test-123'
+    assert formatter.format(i1.parts) == 'ddr-test-123-456'
+    assert formatter.format({'repo':'ddr', 'org':'test', 'cid':123}) == 'ddr-test-123'
+    assert formatter.format(identifier.Identifier('ddr').parts) == None
+    # template choice is remembered per set of keys
+    assert formatter.chosen[i0.parts._keys] == '{repo}-{org}-{cid}'
+    path = identifier.TemplateFormatter(['{basepath}/{repo}-{org}-{cid}'])
+    assert path.format(i0.parts, basepath='/tmp') == '/tmp/ddr-test-123'
+
+def test_path_abs_cached():
+    i = identifier.Identifier('ddr-test-123-456', '/tmp')
+    path = i.path_abs('json')
+    assert path == '/tmp/ddr-test-123/files/ddr-test-123-456/entity.json'
+    assert i.path_abs('json') is path
+    assert i.path_abs() == '/tmp/ddr-test-123/files/ddr-test-123-456'
+    assert_raises(
+        identifier.MissingBasepathException,
+        identifier.Identifier('ddr-test-123-456').path_abs
+    )
+
+def test_parse_many():
+    texts = [
+        '/tmp/ddr-test-123/collection.json',
+        '/tmp/ddr-test-123/files/ddr-test-123-456/entity.json',
+        'ddr-test-123-457',
+        '/tmp/ddr-test-123/files/ddr-test-123-456/files/ddr-test-123-456-master-a1b2c3d4e5.json',
+        'http://192.168.56.101/ui/ddr-test-123-458',
+    ]
+    grouped = identifier.parse_many(texts, '/tmp/')
+    assert grouped.keys() == ['collection', 'entity', 'file']
+    assert [i.id for i in grouped['entity']] == [
+        'ddr-test-123-456', 'ddr-test-123-457', 'ddr-test-123-458'
+    ]
+    assert grouped['file'][0].id == 'ddr-test-123-456-master-a1b2c3d4e5'
+    assert grouped['entity'][1].basepath == '/tmp'
+    assert grouped['collection'][0] is identifier.Identifier(path=texts[0], base_path='/tmp')
+    # in order of texts
+    assert [i.id for i in identifier.parse_many(texts, '/tmp/', by_model=False)] == [
+        'ddr-test-123',
+        'ddr-test-123-456',
+        'ddr-test-123-457',
+        'ddr-test-123-456-master-a1b2c3d4e5',
+        'ddr-test-123-458',
+    ]
+    assert_raises(identifier.BadPathException, identifier.parse_many, texts, 'tmp')
+    assert_raises(identifier.MalformedURLException, identifier.parse_many, ['ddr.test.123'])
+
+def test_normalize_basepath():
+    assert identifier.normalize_basepath('/tmp/../var/www/') == '/var/www'
+    assert identifier.normalize_basepath('/var/www/') is identifier.normalize_basepath('/var/www')
@@ -0,0 +1,150 @@
+import os
+import shutil
+
+import manifest
+
+
+SAMPLE_DIRS = [
+    '.git',
+    'files',
+    'files/ddr-test-123-1',
+    'files/ddr-test-123-2',
+    'files/ddr-test-123-2/files',
+]
+SAMPLE_FILES = [
+    'collection.json',
+    '.git/config',
+    '.gitignore',
+    'files/ddr-test-123-1/entity.json',
+    'files/ddr-test-123-1/changelog',
+    'files/ddr-test-123-2/entity.json',
+    'files/ddr-test-123-2/control',
+    'files/ddr-test-123-2/files/ddr-test-123-2-master-abc123.jpg',
+    'files/ddr-test-123-2/files/ddr-test-123-2-master-abc123.json',
+]
+META_ALL = [
+    'collection.json',
+    'files/ddr-test-123-1/entity.json',
+    'files/ddr-test-123-2/entity.json',
+    'files/ddr-test-123-2/files/ddr-test-123-2-master-abc123.json',
+]
+
+def test_git_blob_sha1():
+    # git hash-object of a file containing 'testing'
+    assert manifest.git_blob_sha1('testing') == '9a2c7732fab5bcd73ea3ed52d2d9599a4cc47666'
+
+def test_manifest():
+    basedir = '/tmp/DDR_test_manifest'
+    if os.path.exists(basedir):
+        shutil.rmtree(basedir, ignore_errors=1)
+    sampledir = os.path.join(basedir, 'ddr-test-123')
+    for d in SAMPLE_DIRS:
+        os.makedirs(os.path.join(sampledir, d))
+    for fn in SAMPLE_FILES:
+        with open(os.path.join(sampledir, fn), 'w') as f:
+            f.write('testing')
+
+    def clean(paths):
+        return [path.replace('%s/' % sampledir, '') for path in paths]
+
+    # built on first refresh, stored in .git
+    m = manifest.Manifest(sampledir, testing=True)
+    assert m.path == os.path.join(sampledir, '.git', manifest.MANIFEST_FILENAME)
+    assert not m.exists()
+    assert clean(m.refresh().paths()) == META_ALL
+    assert m.exists()
+    assert clean(m.paths(model='file')) == META_ALL[3:]
+    entry = m.entries['files/ddr-test-123-1/entity.json']
+    assert entry.model == 'entity'
+    assert entry.id == 'ddr-test-123-1'
+    assert entry.size == 7
+    assert entry.sha1 == manifest.git_blob_sha1('testing')
+    assert [i.id for i in m.identifiers(model='entity')] == [
+        'ddr-test-123-1', 'ddr-test-123-2'
+    ]
+    # walk order, not grouped by model
+    assert [i.id for i in m.identifiers()] == [
+        'ddr-test-123', 'ddr-test-123-1', 'ddr-test-123-2',
+        'ddr-test-123-2-master-abc123',
+    ]
+
+    # new and removed files are found by refresh
+    os.makedirs(os.path.join(sampledir, 'files/ddr-test-123-3'))
+    with open(os.path.join(sampledir, 'files/ddr-test-123-3/entity.json'), 'w') as f:
+        f.write('testing')
+    shutil.rmtree(os.path.join(sampledir, 'files/ddr-test-123-1'))
+    m2 = manifest.Manifest(sampledir, testing=True).refresh()
+    assert clean(m2.paths()) == [
+        'collection.json',
+        'files/ddr-test-123-2/entity.json',
+        'files/ddr-test-123-2/files/ddr-test-123-2-master-abc123.json',
+        'files/ddr-test-123-3/entity.json',
+    ]
+    assert 'files/ddr-test-123-1' not in m2.dirs
+
+    # changed files are recorded by update
+    path = os.path.join(sampledir, 'files/ddr-test-123-2/entity.json')
+    with open(path, 'w') as f:
+        f.write('testing 123')
+    manifest.update(sampledir, [path])
+    m3 = manifest.Manifest(sampledir, testing=True)
+    assert m3.load()
+    assert m3.entries['files/ddr-test-123-2/entity.json'].size == 11
+    assert clean(m3.refresh().paths()) == clean(m2.paths())
+
+    # files edited in place are re-hashed by refresh
+    with open(path, 'w') as f:
+        f.write('testing 12345')
+    m4 = manifest.Manifest(sampledir, testing=True).refresh()
+    entry = m4.entries['files/ddr-test-123-2/entity.json']
+    assert entry.size == 13
+    assert entry.sha1 == manifest.git_blob_sha1('testing 12345')
+    assert manifest.Manifest(sampledir, testing=True).load()
+    assert manifest.Manifest(sampledir, testing=True).refresh().entries == m4.entries
+
+    # journal truncated by an interrupted write
+    with open(m4.path, 'a') as f:
+        f.write('F\tfiles/ddr-test-123-2/entity.json\tentity\n')
+        f.write('D\n')
+        f.write('X')
+    m6 = manifest.Manifest(sampledir, testing=True)
+    assert m6.load()
+    assert m6.entries == m4.entries
+
+    # manifest that can't be written is still usable
+    m5 = manifest.Manifest(sampledir, testing=True)
+    m5.path = os.path.join(sampledir, 'missing', manifest.MANIFEST_FILENAME)
+    assert not m5.save()
+    assert clean(m5.refresh().paths()) == clean(m4.paths())
+    m5.update([path])
+    assert not os.path.exists(os.path.dirname(m5.path))
+
+def test_git_dir():
+    basedir = '/tmp/DDR_test_manifest_gitdir'
+    if os.path.exists(basedir):
+        shutil.rmtree(basedir, ignore_errors=1)
+    repo = os.path.join(basedir, 'ddr-test-123')
+    worktree = os.path.join(basedir, 'ddr-test-124')
+    plain = os.path.join(basedir, 'ddr-test-125')
+    os.makedirs(os.path.join(repo, '.git', 'worktrees', 'ddr-test-124'))
+    os.makedirs(worktree)
+    os.makedirs(plain)
+    with open(os.path.join(worktree, '.git'), 'w') as f:
+        f.write('gitdir: ../ddr-test-123/.git/worktrees/ddr-test-124\n')
+    with open(os.path.join(plain, 'collection.json'), 'w') as f:
+        f.write('testing')
+    assert manifest.git_dir(repo) == os.path.join(repo, '.git')
+    assert manifest.git_dir(worktree) == os.path.join(
+        repo, '.git', 'worktrees', 'ddr-test-124'
+    )
+    assert manifest.git_dir(plain) == None
+    # .git file is followed, manifest not written into working tree
+    m = manifest.Manifest(worktree, testing=True)
+    assert m.path == os.path.join(
+        repo, '.git', 'worktrees', 'ddr-test-124', manifest.MANIFEST_FILENAME
+    )
+    # not a repository: built in memory, not saved
+    m = manifest.Manifest(plain, testing=True)
+    assert m.path == None
+    assert [p.replace(plain, '') for p in m.refresh().paths()] == ['/collection.json']
+    assert os.listdir(plain) == ['collection.json']
@@ -91,6 +91,55 @@ def test_load_json():
     assert document.title == 'TITLE'
     assert document.description == 'DESCRIPTION'
 
+class TestModuleJsonload(TestModule):
+    @staticmethod
+    def jsonload_title(text):
+        return '  %s  ' % text.lower()
+
+def test_load_json_jsonload():
+    class Document(object):
+        pass
+    
+    document = Document()
+    module = TestModuleJsonload()
+    json_data = models.load_json(document, module, json.dumps([
+        {'id': 'ddr-test-123'},
+        {'title': 'TITLE'},
+        {'title': 'TITLE 2'},
+    ]))
+    assert len(json_data) == 3
+    # jsonload_* applied and stripped, last value wins
+    assert document.title == 'title 2'
+    # missing fields get defaults
+    assert document.status == ''
+    assert document.description == ''
+    assert module in models.JSONLOAD_TABLES
+    assert models._jsonload_table(module)[3] == ('title', module.jsonload_title, '')
+
+def test_json_fields():
+    data = json.loads(TEST_DOCUMENT) + [{'title': 'TITLE 2'}]
+    fields = models.json_fields(data)
+    assert fields.keys()[1:] == ['id', 'timestamp', 'status', 'title', 'description']
+    assert fields['title'] == 'TITLE 2'
+    assert fields['status'] == 1
+
+class FakeOldUjson(object):
+    @staticmethod
+    def loads(text, **kwargs):
+        if kwargs:
+            raise TypeError("'precise_float' is an invalid keyword argument")
+        return []
+
+def test_json_loads():
+    assert models.json_loads(TEST_DOCUMENT) == json.loads(TEST_DOCUMENT)
+    # ujson release without precise_float
+    ujson = models.ujson
+    models.ujson = FakeOldUjson
+    try:
+        assert models.json_loads(TEST_DOCUMENT) == json.loads(TEST_DOCUMENT)
+    finally:
+        models.ujson = ujson
+
 # TODO prep_json
 # TODO from_json
 # TODO load_xml
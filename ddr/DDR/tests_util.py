@@ -1,6 +1,7 @@
 from datetime import datetime
 import os
 import shutil
+import subprocess
 
 import config
 import util
@@ -87,6 +88,79 @@ def test_find_meta_files():
     paths5 = clean(util.find_meta_files(sampledir, recursive=True, force_read=False, testing=1))
     assert paths5 == META_ALL
 
+def test_iter_meta_files():
+    basedir = '/tmp/DDR_test_utils_iter'
+    if os.path.exists(basedir):
+        shutil.rmtree(basedir, ignore_errors=1)
+    sampledir = os.path.join(basedir, 'ddr-test-123')
+    for d in SAMPLE_DIRS:
+        os.makedirs(os.path.join(sampledir, d))
+    for fn in SAMPLE_FILES:
+        with open(os.path.join(sampledir, fn), 'w') as f:
+            f.write('testing')
+    
+    paths0 = util.iter_meta_files(sampledir, recursive=True, testing=1)
+    assert not isinstance(paths0, list)
+    assert list(paths0) == util.find_meta_files(sampledir, recursive=True, force_read=True, testing=1)
+    for model in ['collection', 'entity', 'file']:
+        paths1 = list(util.iter_meta_files(sampledir, model=model, recursive=True, testing=1))
+        assert paths1 == [os.path.join(sampledir, path) for path in META_MODEL[model]]
+    paths2 = list(util.iter_meta_files(sampledir, recursive=False, testing=1))
+    assert paths2 == [os.path.join(sampledir, 'collection.json')]
+    paths3 = list(util.iter_meta_files(sampledir, recursive=True, files_first=True, testing=1))
+    assert paths3 == util.find_meta_files(sampledir, recursive=True, files_first=True, force_read=True, testing=1)
+    assert [p.replace('%s/' % sampledir, '') for p in paths3] == [
+        'files/ddr-test-123-2/files/ddr-test-123-2-master-abc123.json',
+        'files/ddr-test-123-1/entity.json',
+        'files/ddr-test-123-2/entity.json',
+        'collection.json',
+    ]
+    # 'tmp' excluded unless testing
+    assert list(util.iter_meta_files(sampledir, recursive=True)) == []
+
+def test_find_meta_files_git():
+    basedir = '/tmp/DDR_test_utils_git'
+    if os.path.exists(basedir):
+        shutil.rmtree(basedir, ignore_errors=1)
+    sampledir = os.path.join(basedir, 'ddr-test-123')
+    for d in SAMPLE_DIRS:
+        if d != '.git':
+            os.makedirs(os.path.join(sampledir, d))
+    subprocess.check_call(['git', 'init', '-q', sampledir])
+    for fn in SAMPLE_FILES:
+        path = os.path.join(sampledir, fn)
+        if not os.path.exists(path):
+            with open(path, 'w') as f:
+                f.write('testing')
+    subprocess.check_call(['git', 'add', '.'], cwd=sampledir)
+    # untracked
+    untracked = 'files/ddr-test-123-3/entity.json'
+    os.makedirs(os.path.join(sampledir, os.path.dirname(untracked)))
+    with open(os.path.join(sampledir, untracked), 'w') as f:
+        f.write('testing')
+    
+    def clean(paths):
+        return [path.replace('%s/' % sampledir, '') for path in paths]
+    
+    paths0 = clean(util.find_meta_files(sampledir, recursive=True, force_read=True, testing=1, source='git'))
+    assert paths0 == META_ALL
+    for model in ['collection', 'entity', 'file']:
+        paths1 = clean(util.find_meta_files(sampledir, model=model, recursive=True, force_read=True, testing=1, source='git'))
+        assert paths1 == META_MODEL[model]
+    paths2 = clean(util.find_meta_files(sampledir, recursive=False, force_read=True, testing=1, source='git'))
+    assert paths2 == META_MODEL['collection']
+    paths3 = clean(util.find_meta_files(sampledir, recursive=True, force_read=True, testing=1, source='git', untracked=True))
+    assert paths3 == META_ALL + [untracked]
+    # same order as walking the directories
+    paths4 = clean(util.find_meta_files(sampledir, recursive=True, force_read=True, testing=1))
+    assert paths3 == paths4
+
+def test_walk_sort_key():
+    paths = ['files/a/files/b.json', 'z.json', 'files/a/entity.json', 'collection.json']
+    assert sorted(paths, key=util.walk_sort_key) == [
+        'collection.json', 'z.json', 'files/a/entity.json', 'files/a/files/b.json'
+    ]
+
 
 def test_natural_sort():
     l = ['11', '1', '12', '2', '13', '3']
@@ -1,23 +1,43 @@
 import hashlib
+from multiprocessing.pool import ThreadPool
 import os
 import re
+import stat
+import subprocess
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
 
 from DDR import config
 from DDR import identifier
 
 
-def find_meta_files(basedir, recursive=False, model=None, files_first=False, force_read=False, testing=False):
+def find_meta_files(basedir, recursive=False, model=None, files_first=False, force_read=False, testing=False, workers=1, source='fs', untracked=False):
     """Lists absolute paths to .json files in basedir; saves copy if requested.
     
     Skips/excludes .git directories.
     TODO depth (go down N levels from basedir)
     
+    With source='git' paths are listed from the git index instead of
+    walking the directory tree, which for a committed collection avoids
+    a stat() per directory entry.  Files not yet added to the index are
+    only listed if untracked is True.  Paths are in the same order as
+    with source='fs'.
+    
     @param basedir: Absolute path
     @param recursive: Whether or not to recurse into subdirectories.
     @param model: list Restrict to the named model ('collection','entity','file').
     @param files_first: If True, list files,entities,collections; otherwise sort.
     @param force_read: If True, always searches for files instead of using cache.
     @param testing: boolean Allow 'tmp' in paths.
+    @param workers: int Number of threads scanning directories (recursive only).
+    @param source: str 'fs' (walk directories) or 'git' (git ls-files).
+    @param untracked: boolean Include untracked files (source='git' only).
     @returns: list of paths
     """
     CACHE_FILENAME = '.metadata_files'
@@ -29,44 +49,231 @@ def find_meta_files(basedir, recursive=False, model=None, files_first=False, for
     if os.path.exists(CACHE_PATH) and not force_read:
         with open(CACHE_PATH, 'r') as f:
             paths = [line.strip() for line in f.readlines() if '#' not in line]
+    elif source == 'git':
+        paths = _search_git(basedir, recursive, model, EXCLUDES, untracked)
     else:
         if recursive:
-            paths = _search_recursive(basedir, model, EXCLUDES)
+            paths = _search_recursive(basedir, model, EXCLUDES, workers)
         else:
             paths = _search_directory(basedir, EXCLUDES)
     # files_first is useful for docstore.index
     if files_first:
-        return [path for path in paths if path_matches_model(path, 'file')] \
-            + [path for path in paths if path_matches_model(path, 'entity')] \
-            + [path for path in paths if path_matches_model(path, 'collection')]
+        return _files_first(paths)
     return paths
 
-def _search_recursive(basedir, model, excludes):
+# files_first order
+FILES_FIRST_MODELS = ['file', 'entity', 'collection']
+
+def _files_first(paths, models=FILES_FIRST_MODELS):
+    """Sorts paths into files,entities,collections in one pass.
+    
+    Paths that match none of the models are dropped.
+    """
+    regexes = [identifier.META_FILENAME_REGEX[model] for model in models]
+    ordered = [[] for model in models]
+    for path in paths:
+        for n,regex in enumerate(regexes):
+            if regex.search(path):
+                ordered[n].append(path)
+    return [path for paths in ordered for path in paths]
+
+def iter_meta_files(basedir, recursive=False, model=None, files_first=False, testing=False):
+    """Yields absolute paths to .json files in basedir as they are found.
+    
+    Like find_meta_files(force_read=True) but callers can start work
+    before the whole tree has been scanned.  Directories are scanned
+    one at a time as the walk reaches them, and paths come out in the
+    same top-down order (so collections and entities come before their
+    children).  With files_first, file paths are yielded as they are
+    found and entities and collections, which are much less numerous,
+    are held until the end.
+    
+    @param basedir: Absolute path
+    @param recursive: Whether or not to recurse into subdirectories.
+    @param model: str Restrict to the named model ('collection','entity','file').
+    @param files_first: If True, yield files,entities,collections.
+    @param testing: boolean Allow 'tmp' in paths.
+    @returns: generator of paths
+    """
+    excludes = ['.git', '*~']
+    if not testing:
+        excludes.append('tmp')
+    if _excluded(basedir, excludes):
+        return
+    regex = None
+    if model:
+        regex = identifier.META_FILENAME_REGEX[model]
+    paths = _iter_search(basedir, recursive, excludes, regex)
+    if files_first:
+        paths = _iter_files_first(paths)
+    for path in paths:
+        yield path
+
+def _iter_search(basedir, recursive, excludes, regex=None):
+    """Depth-first walk that yields each directory's files when scanned
+    """
+    stack = [basedir]
+    while stack:
+        files,dirs = _scan_directory(stack.pop(), excludes, regex)
+        for path in files:
+            yield path
+        if recursive:
+            stack.extend(reversed(dirs))
+
+def _iter_files_first(paths, models=FILES_FIRST_MODELS):
+    """Streaming version of _files_first; holds back all but the first model
+    """
+    regexes = [identifier.META_FILENAME_REGEX[model] for model in models]
+    held = [[] for model in models]
+    for path in paths:
+        for n,regex in enumerate(regexes):
+            if regex.search(path):
+                if n == 0:
+                    yield path
+                else:
+                    held[n].append(path)
+    for paths in held:
+        for path in paths:
+            yield path
+
+def _scan_directory(path, excludes, regex=None):
+    """Lists .json files and subdirectories in a directory, sorted by name.
+    
+    Names containing one of excludes are skipped, so excluded directories
+    (e.g. .git) are pruned without being listed.  Symlinked directories
+    are not returned, as os.walk does not follow them.  Uses scandir if
+    available, which gets file types from the directory listing and
+    avoids a stat() per entry on most filesystems.
+    
+    @param path: str Absolute path to directory
+    @param excludes: list of str
+    @param regex: compiled regex Only return files that match (optional)
+    @returns: (list of file paths, list of directory paths)
+    """
+    files = []
+    dirs = []
+    if scandir:
+        entries = [
+            (entry.name, entry.is_dir() and not entry.is_symlink())
+            for entry in scandir(path)
+        ]
+    else:
+        # one lstat per entry (os.path.isdir + islink would be two)
+        entries = [
+            (name, stat.S_ISDIR(os.lstat(os.path.join(path, name)).st_mode))
+            for name in os.listdir(path)
+        ]
+    entries.sort()
+    for name,is_dir in entries:
+        if _excluded(name, excludes):
+            continue
+        if is_dir:
+            dirs.append(os.path.join(path, name))
+        elif name.endswith('.json'):
+            filepath = os.path.join(path, name)
+            if (regex is None) or regex.search(filepath):
+                files.append(filepath)
+    return files,dirs
+
+def _search_recursive(basedir, model, excludes, workers=1):
     """Recursively search directory.
+    
+    Directories are scanned a level at a time; with workers > 1 each
+    level (e.g. all the entity directories) is divided among a pool of
+    threads.  Paths are returned in top-down order as from os.walk,
+    with each directory's entries sorted by name.
     """
+    # all paths would contain the excluded string
+    if _excluded(basedir, excludes):
+        return []
+    regex = None
+    if model:
+        regex = identifier.META_FILENAME_REGEX[model]
+    scan = lambda path: _scan_directory(path, excludes, regex)
+    pool = None
+    if workers > 1:
+        pool = ThreadPool(workers)
+    scanned = {}
+    try:
+        level = [basedir]
+        while level:
+            if pool:
+                results = pool.map(scan, level)
+            else:
+                results = [scan(path) for path in level]
+            scanned.update(zip(level, results))
+            level = [d for files,dirs in results for d in dirs]
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
     paths = []
-    for root, dirs, files in os.walk(basedir):
-        # don't go down into .git directory
-        if '.git' in dirs:
-            dirs.remove('.git')
-        for f in files:
-            if f.endswith('.json'):
-                path = os.path.join(root, f)
-                if (not _excluded(path, excludes)) and path_matches_model(path, model):
-                    paths.append(path)
+    stack = [basedir]
+    while stack:
+        files,dirs = scanned[stack.pop()]
+        paths.extend(files)
+        stack.extend(reversed(dirs))
     return paths
 
 def _search_directory(basedir, excludes):
     """Search only the specified directory.
     """
-    paths = []
-    for f in os.listdir(basedir):
-        if f.endswith('.json'):
-            path = os.path.join(basedir, f)
-            if (not _excluded(path, excludes)):
-                paths.append(path)
+    if _excluded(basedir, excludes):
+        return []
+    files,dirs = _scan_directory(basedir, excludes)
+    return files
+
+def _search_git(basedir, recursive, model, excludes, untracked=False):
+    """List files in git index, and optionally untracked files.
+    
+    Untracked files exclude those ignored by .gitignore etc.
+    Raises subprocess.CalledProcessError if basedir is not in a repository.
+    """
+    if _excluded(basedir, excludes):
+        return []
+    relpaths = git_ls_files(basedir)
+    if untracked:
+        relpaths = relpaths + git_ls_files(basedir, '--others', '--exclude-standard')
+    relpaths = [
+        p for p in set(relpaths)
+        if p.endswith('.json') and not _excluded(p, excludes)
+    ]
+    if not recursive:
+        relpaths = [p for p in relpaths if '/' not in p]
+    relpaths.sort(key=walk_sort_key)
+    base = '%s/' % os.path.normpath(basedir)
+    paths = [base + relpath for relpath in relpaths]
+    if model:
+        regex = identifier.META_FILENAME_REGEX[model]
+        paths = [path for path in paths if regex.search(path)]
     return paths
 
+def git_ls_files(path, *args):
+    """Runs git ls-files -z in path and returns list of output lines
+    
+    Paths are relative to path.  git's error messages are discarded.
+    
+    @param path: str Absolute path to directory in a git repository
+    @param args: Additional arguments to git ls-files
+    @returns: list of str
+    """
+    cmd = ['git', 'ls-files', '-z'] + list(args)
+    with open(os.devnull, 'w') as devnull:
+        output = subprocess.check_output(cmd, cwd=path, stderr=devnull)
+    return [line for line in output.split('\0') if line]
+
+def walk_sort_key(relpath):
+    """Sorts relative paths in os.walk top-down order
+    
+    Each directory's files come before its subdirectories.  Components
+    are prefixed with control characters that sort filenames before
+    directory names, so a plain string comparison gives the order.
+    """
+    head,sep,tail = relpath.rpartition('/')
+    if head:
+        return '\x02%s\x00\x01%s' % (head.replace('/', '\x00\x02'), tail)
+    return '\x01%s' % tail
+
 def _excluded(path, excludes):
     """True if path contains one excluded strings
     """
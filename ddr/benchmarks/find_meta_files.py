@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+#
+# find_meta_files.py
+#
+
+description = """Compares util.find_meta_files with the os.walk implementation it replaced, and with git ls-files."""
+
+epilog = """
+Builds a fake collection with NUM file metadata files (plus entities) in a
+temp directory, or uses an existing collection, then times the previous
+os.walk-based search and util.find_meta_files with 1 and WORKERS threads.
+With --git the collection's files are listed from the git index as well
+(a fake collection is made into a git repository and its files staged).
+Checks that all of them return the same paths.
+
+Run it twice or on a collection that was recently read to compare warm
+caches; on a cold cache (e.g. an NFS mount) the difference in stat calls
+matters more.
+
+EXAMPLE
+
+    $ python benchmarks/find_meta_files.py --num 100000
+    $ python benchmarks/find_meta_files.py --collection /var/www/media/ddr/ddr-densho-10 --git
+"""
+
+import argparse
+from datetime import datetime
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from DDR import identifier
+from DDR import util
+
+FILES_PER_ENTITY = 10
+
+
+def make_collection(basedir, num, git=False):
+    """Writes empty collection, entity, and file .json files plus binaries
+    
+    @param basedir: str
+    @param num: int Number of file .json files
+    @param git: boolean Make a git repository and stage the files.
+    @returns: str collection path
+    """
+    cid = 'ddr-test-123'
+    cpath = os.path.join(basedir, cid)
+    if git:
+        subprocess.check_call(['git', 'init', '-q', cpath])
+    else:
+        os.makedirs(os.path.join(cpath, '.git'))
+    open(os.path.join(cpath, 'collection.json'), 'w').close()
+    for e in range(1, (num / FILES_PER_ENTITY) + 2):
+        eid = '%s-%s' % (cid, e)
+        files_dir = os.path.join(cpath, 'files', eid, 'files')
+        os.makedirs(files_dir)
+        for name in ['entity.json', 'changelog', 'control']:
+            open(os.path.join(cpath, 'files', eid, name), 'w').close()
+        for f in range(FILES_PER_ENTITY):
+            fid = '%s-master-%010x' % (eid, e * FILES_PER_ENTITY + f)
+            for name in ['%s.json' % fid, '%s.jpg' % fid, '%s-a.jpg' % fid]:
+                open(os.path.join(files_dir, name), 'w').close()
+    if git:
+        subprocess.check_call(['git', 'add', '.'], cwd=cpath)
+    return cpath
+
+def walk_find_meta_files(basedir, model=None, testing=False):
+    """find_meta_files(recursive=True, force_read=True) before the scandir walker
+    """
+    excludes = ['.git', '*~']
+    if not testing:
+        excludes.append('tmp')
+    paths = []
+    for root, dirs, files in os.walk(basedir):
+        if '.git' in dirs:
+            dirs.remove('.git')
+        for f in files:
+            if f.endswith('.json'):
+                path = os.path.join(root, f)
+                if (not util._excluded(path, excludes)) \
+                and ((not model) or re.search(identifier.META_FILENAME_REGEX[model], path)):
+                    paths.append(path)
+    return paths
+
+def timeit(function, *args, **kwargs):
+    start = datetime.now()
+    result = function(*args, **kwargs)
+    return result, (datetime.now() - start).total_seconds()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=description, epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('-n', '--num', type=int, default=100000, help='Number of file .json files.')
+    parser.add_argument('-c', '--collection', help='Use existing collection instead.')
+    parser.add_argument('-m', '--model', help='Restrict to model.')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='Threads for parallel scan.')
+    parser.add_argument('-g', '--git', action='store_true', help='Also list files with git ls-files.')
+    args = parser.parse_args()
+    
+    tmpdir = None
+    if args.collection:
+        cpath = args.collection
+    else:
+        tmpdir = tempfile.mkdtemp(prefix='ddr-benchmark-')
+        print('Making %s files in %s' % (args.num, tmpdir))
+        cpath = make_collection(tmpdir, args.num, git=args.git)
+    print('scandir: %s' % bool(util.scandir))
+    try:
+        expected,walk_secs = timeit(walk_find_meta_files, cpath, args.model, testing=True)
+        print('%-24s %8.3f s  %s paths' % ('os.walk', walk_secs, len(expected)))
+        runs = [
+            ('find_meta_files w=1', dict(workers=1)),
+            ('find_meta_files w=%s' % args.workers, dict(workers=args.workers)),
+        ]
+        if args.git:
+            runs.append(('find_meta_files git', dict(source='git')))
+        for label,kwargs in runs:
+            paths,secs = timeit(
+                util.find_meta_files, cpath, recursive=True, model=args.model,
+                force_read=True, testing=True, **kwargs
+            )
+            if sorted(paths) != sorted(expected):
+                print('%s paths differ from os.walk!' % label)
+                sys.exit(1)
+            print('%-24s %8.3f s  %.1fx' % (
+                label, secs, walk_secs / max(secs, 0.000001)
+            ))
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+#
+# identifier_memory.py
+#
+
+description = """Compares memory used by slotted Identifiers and dict/OrderedDict ones."""
+
+epilog = """
+Makes NUM file Identifiers and measures the memory they hold, compared to
+the same data laid out like the older Identifier: attributes in an instance
+__dict__ and parts/idparts as OrderedDicts.
+
+Sizes are totals of sys.getsizeof for all objects reachable from the
+Identifiers, counting objects shared between them (e.g. strings) once.
+
+EXAMPLE
+
+    $ python benchmarks/identifier_memory.py
+    $ python benchmarks/identifier_memory.py --num 200000
+"""
+
+import argparse
+from collections import OrderedDict
+import gc
+import sys
+import types
+
+from DDR import identifier
+
+COLLECTION_ID = 'ddr-test-123'
+BASEPATH = '/var/www/media/ddr'
+FILES_PER_ENTITY = 10
+
+
+class DictIdentifier(object):
+    """Identifier data as held by the pre-__slots__ Identifier class
+    """
+    
+    def __init__(self, i):
+        self.raw = i.raw
+        self.method = i.method
+        self.model = i.model
+        self.basepath = i.basepath
+        self.id = i.id
+        self.parts = OrderedDict(i.parts)
+        self.idparts = i.idparts
+
+
+def make_identifiers(num, collection_id=COLLECTION_ID, basepath=BASEPATH):
+    """Make num file Identifiers from paths, as when walking a collection
+    """
+    collection = identifier.Identifier(collection_id, basepath)
+    identifiers = []
+    eid = 0
+    while len(identifiers) < num:
+        eid += 1
+        entity = collection.child('entity', {'eid': eid}, basepath)
+        for n in range(FILES_PER_ENTITY):
+            sha1 = '%010x' % (eid * FILES_PER_ENTITY + n)
+            file_ = entity.child('file', {'role': 'master', 'sha1': sha1}, basepath)
+            identifiers.append(
+                identifier.Identifier(file_.path_abs('json'), base_path=basepath)
+            )
+    return identifiers[:num]
+
+SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.ClassType)
+
+def deep_sizeof(objects):
+    """Total size of objects and everything they reference, counted once
+    """
+    seen = set()
+    total = 0
+    stack = list(objects)
+    while stack:
+        o = stack.pop()
+        if (id(o) in seen) or isinstance(o, SKIP_TYPES):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        stack.extend(gc.get_referents(o))
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=description, epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('-n', '--num', type=int, default=100000, help='Number of Identifiers.')
+    parser.add_argument('-c', '--collection', default=COLLECTION_ID, help='Collection ID.')
+    parser.add_argument('-b', '--basepath', default=BASEPATH, help='Base path.')
+    args = parser.parse_args()
+    
+    slotted = make_identifiers(args.num, args.collection, args.basepath)
+    dicts = [DictIdentifier(i) for i in slotted]
+    slotted_size = deep_sizeof(slotted)
+    dicts_size = deep_sizeof(dicts)
+    print('%-16s %12s %10s' % ('layout', 'total (MB)', 'per ID (B)'))
+    for name,size in [('dict/OrderedDict', dicts_size), ('__slots__', slotted_size)]:
+        print('%-16s %12.1f %10d' % (name, size / 1048576.0, size / args.num))
+    print('%.1fx smaller' % (float(dicts_size) / slotted_size))
+
+
+if __name__ == '__main__':
+    main()
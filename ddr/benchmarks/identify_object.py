@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+#
+# identify_object.py
+#
+
+description = """Compares identify_object using pattern lists and PatternMatchers."""
+
+epilog = """
+Classifies NUM generated IDs, paths, and URLs with the PATTERNS lists
+(one regex match per pattern until a match) and with the PatternMatchers
+(one combined regex), and checks that the results are the same.
+
+EXAMPLE
+
+    $ python benchmarks/identify_object.py
+    $ python benchmarks/identify_object.py --num 100000 --basepath /var/www/media/ddr
+"""
+
+import argparse
+from datetime import datetime
+import sys
+
+from DDR import identifier
+
+COLLECTION_ID = 'ddr-test-123'
+BASEPATH = '/var/www/media/ddr'
+
+
+def sample_texts(num, collection_id=COLLECTION_ID, basepath=BASEPATH):
+    """Make lists of IDs, paths, URLs for a collection's objects
+    
+    @param num: int Number of texts of each kind
+    @param collection_id: str
+    @param basepath: str
+    @returns: dict {'id': [...], 'path': [...], 'url': [...]}
+    """
+    collection = identifier.Identifier(collection_id, basepath)
+    identifiers = [collection]
+    for n in range(1, 11):
+        entity = collection.child('entity', {'eid': n}, basepath)
+        identifiers.append(entity)
+        for sha1 in ['a1b2c3d4e5', 'f6a7b8c9d0']:
+            identifiers.append(
+                entity.child('file', {'role': 'master', 'sha1': sha1}, basepath)
+            )
+    samples = {'id': [], 'path': [], 'url': []}
+    for i in identifiers:
+        samples['id'].append(i.id)
+        samples['path'].append(i.path_abs('json'))
+        samples['url'].append(i.urlpath('editor'))
+    return {
+        kind: [texts[n % len(texts)] for n in xrange(num)]
+        for kind,texts in samples.iteritems()
+    }
+
+def timeit(texts, patterns):
+    start = datetime.now()
+    results = [identifier.identify_object(text, patterns) for text in texts]
+    return results, (datetime.now() - start).total_seconds()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=description, epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('-n', '--num', type=int, default=1000000, help='Number of texts of each kind.')
+    parser.add_argument('-c', '--collection', default=COLLECTION_ID, help='Collection ID.')
+    parser.add_argument('-b', '--basepath', default=BASEPATH, help='Base path.')
+    args = parser.parse_args()
+    
+    samples = sample_texts(args.num, args.collection, args.basepath)
+    tables = [
+        ('id', identifier.ID_PATTERNS, identifier.ID_MATCHER),
+        ('path', identifier.PATH_PATTERNS, identifier.PATH_MATCHER),
+        ('url', identifier.URL_PATTERNS, identifier.URL_MATCHER),
+    ]
+    print('%-6s %10s %10s %8s' % ('kind', 'list (s)', 'match (s)', 'speedup'))
+    for kind,patterns,matcher in tables:
+        texts = samples[kind]
+        expected,list_secs = timeit(texts, patterns)
+        results,matcher_secs = timeit(texts, matcher)
+        if results != expected:
+            print('%s: PatternMatcher results differ from patterns list!' % kind)
+            sys.exit(1)
+        print('%-6s %10.3f %10.3f %7.1fx' % (
+            kind, list_secs, matcher_secs, list_secs / max(matcher_secs, 0.000001)
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+#
+# import_time.py
+#
+
+description = """Measures time taken by the imports of each bin/ script and ddrindex/ddrcheck."""
+
+epilog = """
+For each script in bin/ (and the DDR.cli console scripts), runs the
+script's top-level import statements in a fresh Python process and
+reports the fastest of NUM runs along with the number of modules loaded
+and which of the slow optional imports (GitPython, elasticsearch,
+libxmp) were pulled in.
+Scripts are not run, so no config or repositories are needed beyond what
+the imports themselves require.
+
+EXAMPLE
+
+    $ python benchmarks/import_time.py
+    $ python benchmarks/import_time.py --num 10 ddr-info ddrindex
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BIN_DIR = os.path.join(BASE_DIR, 'bin')
+CONSOLE_SCRIPTS = {
+    'ddrindex': os.path.join(BASE_DIR, 'DDR', 'cli', 'ddrindex.py'),
+    'ddrcheck': os.path.join(BASE_DIR, 'DDR', 'cli', 'ddrcheck.py'),
+}
+
+# Packages that are slow to import and that DDR imports only when needed
+HEAVY_MODULES = ['git', 'elasticsearch', 'elasticsearch_dsl', 'libxmp']
+
+TIMER = """
+import sys, time
+before = len(sys.modules)
+start = time.time()
+%s
+heavy = [name for name in %r if name in sys.modules]
+print('%%s %%s %%s' %% (
+    time.time() - start, len(sys.modules) - before, ','.join(heavy) or '-'
+))
+"""
+
+
+def scripts(names=[]):
+    """Python scripts in bin/ plus console scripts
+    
+    @param names: list Only these scripts (optional)
+    @returns: list of (name, path)
+    """
+    found = []
+    for name in sorted(os.listdir(BIN_DIR)):
+        path = os.path.join(BIN_DIR, name)
+        with open(path, 'r') as f:
+            if 'python' not in f.readline():
+                continue
+        found.append((name, path))
+    found += sorted(CONSOLE_SCRIPTS.items())
+    if names:
+        found = [(name,path) for name,path in found if name in names]
+    return found
+
+def import_statements(path):
+    """Source of a module's top-level import statements
+    
+    @param path: str
+    @returns: str
+    """
+    with open(path, 'r') as f:
+        source = f.read()
+    lines = source.splitlines()
+    statements = []
+    for node in ast.parse(source, path).body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if isinstance(node, ast.ImportFrom) and (node.module == '__future__'):
+                continue
+            # statements may span lines e.g. parenthesized names
+            end = node.lineno
+            while not _complete('\n'.join(lines[node.lineno-1:end])):
+                end += 1
+            statements.append('\n'.join(lines[node.lineno-1:end]).strip())
+    return '\n'.join(statements)
+
+def _complete(text):
+    try:
+        ast.parse(text.strip())
+        return True
+    except SyntaxError:
+        return False
+
+def time_imports(statements, num):
+    """Runs import statements in num new processes
+    
+    @returns: (fastest seconds, num modules, heavy modules) or (None, error message, None)
+    """
+    times = []
+    modules = 0
+    heavy = ''
+    for n in range(num):
+        proc = subprocess.Popen(
+            [sys.executable, '-c', TIMER % (statements, HEAVY_MODULES)],
+            cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        out,err = proc.communicate()
+        if proc.returncode:
+            return None, err.strip().splitlines()[-1], None
+        seconds,modules,heavy = out.strip().splitlines()[-1].split()
+        times.append(float(seconds))
+    return min(times), int(modules), heavy
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=description, epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('-n', '--num', type=int, default=5, help='Runs per script.')
+    parser.add_argument('scripts', nargs='*', help='Script names (default: all).')
+    args = parser.parse_args()
+    
+    print('%-20s %10s %8s  %s' % ('script', 'import (s)', 'modules', 'slow imports'))
+    for name,path in scripts(args.scripts):
+        seconds,modules,heavy = time_imports(import_statements(path), args.num)
+        if seconds is None:
+            print('%-20s ERROR %s' % (name, modules))
+        else:
+            print('%-20s %10.3f %8s  %s' % (name, seconds, modules, heavy))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+#
+# load_json.py
+#
+
+description = """Compares models.load_json with the implementation it replaced."""
+
+epilog = """
+Reads every metadata file in a collection (or in a fake collection of NUM
+entities written to a temp directory using the repo_models field
+definitions) and loads each one into a bare object with the previous
+load_json, which searched the whole list of fields for each of
+module.FIELDS, and with models.load_json.  Files are read before timing
+starts so only parsing and loading are compared.  Checks that both give
+objects the same attributes.
+
+The JSON decoder used by models.load_json (ujson if json_backend=ujson
+is configured) is printed first.
+
+EXAMPLE
+
+    $ python benchmarks/load_json.py --num 1000
+    $ python benchmarks/load_json.py --collection /var/www/media/ddr/ddr-densho-10
+"""
+
+import argparse
+from datetime import datetime
+import os
+import shutil
+import sys
+import tempfile
+
+import simplejson as json
+
+from DDR import identifier
+from DDR import models
+from DDR import modules
+from DDR import util
+
+COLLECTION_ID = 'ddr-test-123'
+FILES_PER_ENTITY = 2
+
+
+class Document(object):
+    def __init__(self, oi):
+        self.identifier = oi
+
+
+def make_collection(basedir, num):
+    """Writes collection, entity, and file .json files with every field
+
+    @param basedir: str
+    @param num: int Number of entities
+    @returns: str collection path
+    """
+    collection = identifier.Identifier(COLLECTION_ID, basedir)
+    identifiers = [collection]
+    for e in range(1, num + 1):
+        entity = collection.child('entity', {'eid': e}, basedir)
+        identifiers.append(entity)
+        for f in range(FILES_PER_ENTITY):
+            identifiers.append(entity.child(
+                'file', {'role': 'master', 'sha1': '%010x' % (e * 100 + f)}, basedir
+            ))
+    for oi in identifiers:
+        data = [{'app_commit': 'abc123', 'application': 'benchmark'}]
+        for mf in oi.fields_module().FIELDS:
+            data.append({mf['name']: 'Sample %s for %s ' % (mf['name'], oi.id)})
+        path = oi.path_abs('json')
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(json.dumps(data, indent=4))
+    return collection.path_abs()
+
+def previous_load_json(document, module, json_text):
+    """models.load_json before the field mapping and dispatch table
+    """
+    if isinstance(json_text, basestring):
+        json_data = json.loads(json_text)
+    else:
+        json_data = json_text
+    for field in json_data:
+        if models.is_object_metadata(field):
+            setattr(document, 'object_metadata', field)
+            break
+    for mf in module.FIELDS:
+        for f in json_data:
+            if hasattr(f, 'keys') and (f.keys()[0] == mf['name']):
+                fieldname = f.keys()[0]
+                field_data = modules.Module(module).function(
+                    'jsonload_%s' % fieldname,
+                    f.values()[0]
+                )
+                if isinstance(field_data, basestring):
+                    field_data = field_data.strip()
+                setattr(document, fieldname, field_data)
+    for mf in module.FIELDS:
+        if not hasattr(document, mf['name']):
+            setattr(document, mf['name'], mf.get('default',None))
+    models.apply_timezone(document, module)
+    return json_data
+
+def timeit(function, objects):
+    """Loads each (Identifier, module, json text) into a new Document
+    """
+    documents = []
+    start = datetime.now()
+    for oi,module,text in objects:
+        document = Document(oi)
+        function(document, module, text)
+        documents.append(document)
+    return documents, (datetime.now() - start).total_seconds()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=description, epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('-n', '--num', type=int, default=1000, help='Number of entities.')
+    parser.add_argument('-c', '--collection', help='Use existing collection instead.')
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.collection:
+        cpath = args.collection
+    else:
+        tmpdir = tempfile.mkdtemp(prefix='ddr-benchmark-')
+        print('Making %s entities in %s' % (args.num, tmpdir))
+        cpath = make_collection(tmpdir, args.num)
+    print('decoder: %s' % ('ujson' if models.ujson else 'simplejson'))
+    try:
+        objects = []
+        for path in util.find_meta_files(cpath, recursive=True, force_read=True, testing=True):
+            oi = identifier.Identifier(path=path)
+            with open(path, 'r') as f:
+                objects.append((oi, oi.fields_module(), f.read()))
+        expected,previous_secs = timeit(previous_load_json, objects)
+        print('%-24s %8.3f s  %s objects' % ('previous', previous_secs, len(objects)))
+        documents,secs = timeit(models.load_json, objects)
+        for a,b in zip(expected, documents):
+            if a.__dict__ != b.__dict__:
+                print('%s loaded differently!' % a.identifier.id)
+                sys.exit(1)
+        print('%-24s %8.3f s  %.1fx' % (
+            'models.load_json', secs, previous_secs / max(secs, 0.000001)
+        ))
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()